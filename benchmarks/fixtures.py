@@ -0,0 +1,125 @@
+import datetime
+import glob
+import itertools
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+HOURS_PER_YEAR = 24 * 365
+END = datetime.datetime(2025, 2, 21, 23, 59, 59)
+
+# Singapore island extent, for synthetic taxi positions
+LON_RANGE = (103.62, 104.03)
+LAT_RANGE = (1.24, 1.47)
+
+WEATHER_RANGES = {
+    "air_temperature": (23.0, 34.0),
+    "relative_humidity": (50.0, 100.0),
+    "rainfall": (0.0, 5.0),
+}
+
+
+def hourly_timestamps(years, end=END):
+    """
+    years * 8760 hourly timestamps ending at `end`, newest first like the API backfills.
+    """
+    return [end - datetime.timedelta(hours=h) for h in range(int(years * HOURS_PER_YEAR))]
+
+
+def weather_payloads(years, data_type="air_temperature", stations=10, seed=0):
+    """
+    One data.gov.sg weather response per day, with hourly readings for `stations` stations
+    (S107 among them), shaped like the v2 real-time API.
+    """
+    rng = np.random.default_rng(seed)
+    low, high = WEATHER_RANGES[data_type]
+    station_ids = ["S107"] + [f"S{100 + i}" for i in range(1, stations)]
+    timestamps = hourly_timestamps(years)
+    payloads = []
+    for day in range(0, len(timestamps), 24):
+        readings = []
+        for ts in timestamps[day:day + 24]:
+            values = np.round(low + (high - low) * rng.random(stations), 1)
+            readings.append({
+                "timestamp": ts.strftime("%Y-%m-%dT%H:%M:%S+08:00"),
+                "data": [{"stationId": s, "value": float(v)} for s, v in zip(station_ids, values)],
+            })
+        payloads.append({"code": 0, "data": {"readings": readings, "stations": []}})
+    return payloads
+
+
+def taxi_payload(taxis=2500, seed=0):
+    """
+    One taxi-availability GeoJSON response with `taxis` positions spread over the island.
+    """
+    rng = np.random.default_rng(seed)
+    lon = LON_RANGE[0] + (LON_RANGE[1] - LON_RANGE[0]) * rng.random(taxis)
+    lat = LAT_RANGE[0] + (LAT_RANGE[1] - LAT_RANGE[0]) * rng.random(taxis)
+    coordinates = np.round(np.stack([lon, lat], axis=1), 5).tolist()
+    return {
+        "type": "FeatureCollection",
+        "features": [{
+            "type": "Feature",
+            "geometry": {"type": "MultiPoint", "coordinates": coordinates},
+            "properties": {"timestamp": END.strftime("%Y-%m-%dT%H:%M:%S+08:00"), "taxi_count": taxis},
+        }],
+    }
+
+
+def taxi_payloads(count, variants=24, seed=0):
+    """
+    `count` taxi responses cycling over a few distinct snapshots (generating every hour of
+    ten years up front would dominate the benchmark).
+    """
+    distinct = [taxi_payload(seed=seed + i) for i in range(min(variants, count))]
+    return list(itertools.islice(itertools.cycle(distinct), count))
+
+
+def load_recorded(directory, pattern, count):
+    """
+    Recorded API responses (one JSON document per file), repeated to `count` items.
+    """
+    paths = sorted(glob.glob(os.path.join(directory, pattern)))
+    if not paths:
+        raise FileNotFoundError(f"No {pattern} payloads in {directory}")
+    recorded = []
+    for path in paths:
+        with open(path) as f:
+            recorded.append(json.load(f))
+    return list(itertools.islice(itertools.cycle(recorded), count))
+
+
+def readings_from_payloads(payloads, station_id="S107"):
+    from data_retrieval_and_cleaning.WeatherAPIs.get_weather_data import filter_station_data
+    readings = []
+    for payload in payloads:
+        readings.extend(filter_station_data(payload, station_id))
+    return readings
+
+
+def feature_frame(years, seed=0):
+    """
+    Merged taxi/weather table like merged_file_with_mean.csv (newest first), years * 8760 rows.
+    """
+    from forecasting.service import STAND_IN_RANGES
+    rng = np.random.default_rng(seed)
+    rows = int(years * HOURS_PER_YEAR)
+    df = pd.DataFrame({"DateTime": pd.to_datetime(hourly_timestamps(years))})
+    for column, (low, high) in STAND_IN_RANGES.items():
+        if column not in ("IsWeekend", "Hour"):
+            df[column] = (low + (high - low) * rng.random(rows)).astype(np.float32)
+    df["peak_period"] = np.round(df["peak_period"])
+    df["IsWeekend"] = (df["DateTime"].dt.weekday >= 5).astype(np.float32)
+    df["Hour"] = (df["DateTime"].dt.hour + 1).astype(np.float32)
+    return df
+
+
+def feature_matrix(years, seed=0):
+    """
+    (rows, 8) float32 model inputs in FEATURE_COLUMNS order, C-contiguous so that the windows
+    share its storage and in-place normalisation reaches them.
+    """
+    from forecasting.datasets import FEATURE_COLUMNS
+    return np.ascontiguousarray(feature_frame(years, seed)[FEATURE_COLUMNS].to_numpy(dtype=np.float32))
@@ -0,0 +1,327 @@
+import argparse
+import asyncio
+import contextlib
+import cProfile
+import datetime
+import fnmatch
+import io
+import json
+import os
+import platform
+import pstats
+import subprocess
+import sys
+import time
+
+import numpy as np
+import torch
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks import fixtures
+from data_retrieval_and_cleaning.TaxiAvailabilityScript import fetch_taxi_data
+from data_retrieval_and_cleaning.WeatherAPIs.get_weather_data import filter_station_data, process_and_merge_datasets
+from data_retrieval_and_cleaning.instrumentation import add_trace_arguments, trace_from_args
+from forecasting.datasets import SlidingWindowDataset, chronological_split
+from forecasting.evaluation import evaluate_models
+from forecasting.models import BiLSTM_pt
+from forecasting.normalization import MinMaxNormalizer
+from forecasting.service import stand_in_forecasters, synthetic_windows
+from forecasting.specs import MODEL_SPECS
+from forecasting.training import default_forward, fit, make_loader, seq2seq_forward, shifted_teacher_forcing_forward
+
+# Notebooks 1-5: model, training forward function and the notebook's batch size
+TRAINING_MODELS = {
+    "lstm": (MODEL_SPECS["lstm"][0], default_forward),
+    "bi_lstm": (lambda: BiLSTM_pt(8, 256, 2, 3), default_forward),
+    "ed_lstm": (MODEL_SPECS["ed_lstm"][0], seq2seq_forward),
+    "bi_ed_lstm": (MODEL_SPECS["bi_ed_lstm"][0], seq2seq_forward),
+    "transformer": (MODEL_SPECS["transformer"][0], shifted_teacher_forcing_forward),
+}
+
+
+class RecordedClient:
+    """
+    Stands in for AsyncAPIClient: every get_json returns the next recorded payload.
+    """
+
+    def __init__(self, payloads):
+        self.payloads = iter(payloads)
+
+    async def get_json(self, url, params=None):
+        return next(self.payloads)
+
+
+def bench_filter_station_data(years, args):
+    if args.payload_dir:
+        payloads = fixtures.load_recorded(args.payload_dir, "weather*.json", int(years * 365))
+    else:
+        payloads = fixtures.weather_payloads(years)
+
+    def run():
+        for payload in payloads:
+            filter_station_data(payload, "S107")
+    return run, len(payloads), "daily pages"
+
+
+def bench_fetch_taxi_data(years, args):
+    hours = int(years * fixtures.HOURS_PER_YEAR)
+    if args.payload_dir:
+        payloads = fixtures.load_recorded(args.payload_dir, "taxi*.json", hours)
+    else:
+        payloads = fixtures.taxi_payloads(hours)
+    timestamps = [ts.strftime("%Y-%m-%dT%H:%M:%S") for ts in fixtures.hourly_timestamps(years)]
+
+    async def fetch_all():
+        client = RecordedClient(payloads)
+        return await asyncio.gather(*(fetch_taxi_data(client, ts) for ts in timestamps))
+
+    def run():
+        asyncio.run(fetch_all())
+    return run, hours, "hourly snapshots"
+
+
+def bench_process_and_merge(years, args):
+    readings = [fixtures.readings_from_payloads(fixtures.weather_payloads(years, data_type, stations=1, seed=i))
+                for i, data_type in enumerate(fixtures.WEATHER_RANGES)]
+
+    def run():
+        process_and_merge_datasets(*readings)
+    return run, sum(len(r) for r in readings), "readings"
+
+
+def bench_windows(years, args):
+    """
+    The notebooks' data preparation (formerly create_sequences): windowing, chronological split,
+    training-range normalisation and one pass over the training batches.
+    """
+    source = fixtures.feature_matrix(years)
+
+    def run():
+        data = source.copy()
+        dataset = SlidingWindowDataset(data, 24, 3, args.stride)
+        train_dataset, _, _ = chronological_split(dataset)
+        normalizer = MinMaxNormalizer().fit(data[:train_dataset.stop])
+        normalizer.transform(data, out=data)
+        for _ in make_loader(train_dataset, 17, shuffle=True):
+            pass
+    return run, len(source), "rows"
+
+
+def training_bench(name):
+    def bench(years, args):
+        data = fixtures.feature_matrix(years)
+        dataset = SlidingWindowDataset(data, 24, 3, args.stride)
+        train_dataset, _, _ = chronological_split(dataset)
+        MinMaxNormalizer().fit(data[:train_dataset.stop]).transform(data, out=data)
+        loader = make_loader(train_dataset, 17, shuffle=True, generator=torch.Generator().manual_seed(0))
+        build, forward_fn = TRAINING_MODELS[name]
+        torch.manual_seed(0)
+        model = build()
+
+        def run():
+            with contextlib.redirect_stdout(io.StringIO()):
+                fit(model, loader, num_epochs=1, forward_fn=forward_fn, log_every=10 ** 9)
+        return run, len(train_dataset), "training windows"
+    return bench
+
+
+def bench_ensemble_fit(years, args):
+    from forecasting.ensemble import fit_stacked_ensemble
+    from forecasting.features import build_lag_features
+    from forecasting.splitters import ExpandingWindowSplit
+    lag_columns = ["Average Taxi Availability", "Taxi Available throughout SG", "temp_value", "humidity_value"]
+    df = build_lag_features(fixtures.feature_frame(years).drop(columns=["IsWeekend", "Hour"]), lag_columns)
+    target_cols = ["target_t1", "target_t2", "target_t3"]
+    X = df.drop(columns=target_cols).to_numpy()
+    y = df[target_cols].to_numpy()
+    estimators = {"n_estimators": args.ensemble_estimators}
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            fit_stacked_ensemble(X, y, ExpandingWindowSplit(5, gap=3).split(X), args.workers,
+                                 rf_params=estimators, xgb_params=estimators, meta_params=estimators)
+    return run, len(X), "rows"
+
+
+def bench_evaluation(years, args):
+    """
+    Notebook 7's test-split evaluation of all five neural models.
+    """
+    data = fixtures.feature_matrix(years)
+    dataset = SlidingWindowDataset(data, 24, 3, args.stride)
+    train_dataset, _, test_dataset = chronological_split(dataset)
+    normalizer = MinMaxNormalizer().fit(data[:train_dataset.stop])
+    normalizer.transform(data, out=data)
+    models = {name: build() for name, (build, _) in TRAINING_MODELS.items()}
+
+    def run():
+        evaluate_models(models, test_dataset, normalizer)
+    return run, len(test_dataset) * len(models), "model windows"
+
+
+def inference_bench(name):
+    def bench(years, args):
+        forecaster = stand_in_forecasters()[name]
+        windows = synthetic_windows(args.batch_size * 50, seed=0)
+        day_of_week = np.arange(len(windows)) % 7
+        batches = [(windows[i:i + args.batch_size], day_of_week[i:i + args.batch_size])
+                   for i in range(0, len(windows), args.batch_size)]
+        latencies = []
+
+        def run():
+            latencies.clear()
+            for batch, days in batches:
+                started = time.perf_counter()
+                forecaster.predict(batch, days)
+                latencies.append(time.perf_counter() - started)
+            return {"batch_size": args.batch_size,
+                    "p50_ms": float(np.percentile(latencies, 50) * 1000),
+                    "p99_ms": float(np.percentile(latencies, 99) * 1000)}
+        return run, len(batches), "batches"
+    return bench
+
+
+# name: (benchmark setup, depends on the data scale)
+BENCHMARKS = {
+    "ingestion.filter_station_data": (bench_filter_station_data, True),
+    "ingestion.fetch_taxi_data": (bench_fetch_taxi_data, True),
+    "ingestion.process_and_merge_datasets": (bench_process_and_merge, True),
+    "prep.windows": (bench_windows, True),
+    **{f"train.{name}": (training_bench(name), True) for name in TRAINING_MODELS},
+    "train.ensemble": (bench_ensemble_fit, True),
+    "eval.models": (bench_evaluation, True),
+    **{f"inference.{name}": (inference_bench(name), False) for name in list(MODEL_SPECS) + ["ensemble"]},
+}
+
+
+def top_functions(profiler, limit=15):
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, function), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({"function": f"{os.path.relpath(filename, REPO_ROOT) if filename.startswith(REPO_ROOT) else filename}"
+                                 f":{line}({function})",
+                     "calls": calls, "tottime_s": tottime, "cumtime_s": cumtime})
+    rows.sort(key=lambda row: row["cumtime_s"], reverse=True)
+    return rows[:limit]
+
+
+def run_benchmark(name, years, args):
+    setup, _ = BENCHMARKS[name]
+    run, items, unit = setup(years, args)
+    extra = run()  # Warm-up: imports, allocator, TorchScript/JIT caches
+    times = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        extra = run()
+        times.append(time.perf_counter() - started)
+    result = {
+        "stage": name,
+        "years": years,
+        "items": items,
+        "unit": unit,
+        "repeat": args.repeat,
+        "best_s": min(times),
+        "mean_s": float(np.mean(times)),
+        "items_per_s": items / min(times),
+    }
+    if isinstance(extra, dict):
+        result.update(extra)
+    if args.profile:
+        profiler = cProfile.Profile()
+        profiler.runcall(run)
+        result["profile"] = top_functions(profiler)
+    return result
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Print the best-time ratio of every stage against a baseline run and return the regressions.
+    """
+    previous = {(r["stage"], r["years"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = previous.get((result["stage"], result["years"]))
+        if old is None:
+            continue
+        ratio = result["best_s"] / old["best_s"]
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  REGRESSION"
+            regressions.append(result["stage"])
+        elif ratio < 1 - tolerance:
+            flag = "  faster"
+        print(f"{result['stage']:<40} {str(result['years']):>5}y  {old['best_s']:9.3f}s -> {result['best_s']:9.3f}s "
+              f"({ratio:5.2f}x){flag}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Time and profile every stage of the pipeline on recorded or synthetic data.")
+    parser.add_argument("--years", type=float, nargs="+", default=[1], help="Data scales to run, e.g. 1 3 10")
+    parser.add_argument("--stages", nargs="+", default=["*"], help="Glob patterns of stages, e.g. 'ingestion.*' train.lstm")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage (the best is reported)")
+    parser.add_argument("--profile", action="store_true", help="Add the top functions of a cProfile run")
+    parser.add_argument("--payload-dir", help="Recorded API responses (weather*.json, taxi*.json) instead of generated ones")
+    parser.add_argument("--stride", type=int, default=24, help="Window stride of the training stages")
+    parser.add_argument("--batch-size", type=int, default=17, help="Inference batch size")
+    parser.add_argument("--ensemble-estimators", type=int, default=100)
+    parser.add_argument("--workers", type=int, help="Ensemble fold processes")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Slowdown that counts as a regression")
+    parser.add_argument("--list", action="store_true", help="List the stages and exit")
+    add_trace_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    trace_from_args(args)
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return
+    torch.manual_seed(0)
+    selected = [name for name in BENCHMARKS if any(fnmatch.fnmatch(name, p) for p in args.stages)]
+    results = []
+    for name in selected:
+        scales = args.years if BENCHMARKS[name][1] else [None]
+        for years in scales:
+            result = run_benchmark(name, years, args)
+            results.append(result)
+            scale = f"{years:g}y" if years is not None else "-"
+            print(f"{name:<40} {scale:>5}  best {result['best_s']:9.3f}s  {result['items_per_s']:12.1f} {result['unit']}/s")
+
+    report = {"environment": environment(), "arguments": vars(args), "results": results}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            sys.exit(f"{len(regressions)} stages regressed by more than {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,65 +1,148 @@
-import requests
-import csv
+import argparse
+import asyncio
 import datetime
-import concurrent.futures
+import json
+import os
+import sys
 from tqdm import tqdm
 
-def fetch_taxi_data(timestamp):
-    url = "https://api.data.gov.sg/v1/transport/taxi-availability"
-    params = {"date_time": timestamp}
-    response = requests.get(url, params=params)
-    if response.status_code == 200:
-        data = response.json()
-        features = data.get("features", [])
-        if features:
-            properties = features[0].get("properties", {})
-            geometry = features[0].get("geometry", {})
-            taxi_count_singapore = properties.get("taxi_count", 0)
+if __name__ == "__main__":
+    # Run as a script: make the repository's packages importable
+    REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
 
-            # If coordinates are within this following square area, add to results
-            north = 1.35106
-            south = 1.32206
-            east = 103.97839
-            west = 103.92805
+from data_retrieval_and_cleaning.api_client import DEFAULT_RATE, TAXI_AVAILABILITY_URL, AsyncAPIClient
+from data_retrieval_and_cleaning.checkpoint_store import TaxiCheckpointStore
+from data_retrieval_and_cleaning.instrumentation import add_trace_arguments, timed, trace_from_args
+from data_retrieval_and_cleaning.response_cache import add_cache_arguments, cache_from_args
+from data_retrieval_and_cleaning.taxi_geometry import DEFAULT_REGIONS, CoordinateStore, count_in_regions, load_regions, parse_coordinates
 
-            coordinates = []
-            for coord in geometry.get("coordinates", []):
-                if coord[0] >= west and coord[0] <= east and coord[1] >= south and coord[1] <= north:
-                    coordinates.append(coord)
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
 
-            # taxi_count in coordinate based on numbers in coordinates
-            taxi_count_in_space = len(coordinates)
+@timed("parse_taxi_response", "fetch")
+def parse_taxi_response(data, regions=DEFAULT_REGIONS):
+    """
+    Parse a taxi-availability response into (islandwide count, {region: count}, points).
+    Returns None if the response carries no features.
+    """
+    features = data.get("features", [])
+    if not features:
+        return None
+    properties = features[0].get("properties", {})
+    taxi_count_singapore = properties.get("taxi_count", 0)
+    points = parse_coordinates(features[0].get("geometry", {}))
+    return taxi_count_singapore, count_in_regions(points, regions), points
 
-            return [timestamp, taxi_count_singapore, taxi_count_in_space, coordinates]
-    return [timestamp, 0, []]
+@timed("fetch_taxi_data", "fetch")
+async def fetch_taxi_data(client: AsyncAPIClient, timestamp: str, regions=DEFAULT_REGIONS):
+    """
+    Fetch one taxi-availability snapshot through the shared client.
+    Returns [timestamp, islandwide count, {region: count}, points] or None on failure.
+    """
+    params = {"date_time": timestamp}
+    data = await client.get_json(TAXI_AVAILABILITY_URL, params)
+    if data is not None:
+        parsed = parse_taxi_response(data, regions)
+        if parsed is not None:
+            taxi_count_singapore, region_counts, points = parsed
+            return [timestamp, taxi_count_singapore, region_counts, points]
+    # Failed fetch: let the caller record it for a retry instead of writing a placeholder row
+    return None
 
-def generate_timestamps():
-    # Set end date as 21 Feb 2025 23:59:59
-    last_date = datetime.datetime(2025, 2, 21, 23, 59, 59)
+def generate_timestamps(since=None, until=None):
+    """
+    Generate hourly timestamps (at HH:59:59), latest first.
+    Defaults to the 365 days ending 21 Feb 2025 23:59:59; since/until narrow the range.
+    """
+    last_date = datetime.datetime(2025, 2, 21, 23, 59, 59) if until is None else until
+    last_date = last_date.replace(minute=59, second=59, microsecond=0)
+    if since is None:
+        first_date = last_date - datetime.timedelta(hours=365 * 24 - 1)
+    else:
+        first_date = since.replace(minute=59, second=59, microsecond=0)
     timestamps = []
-    for i in range(365 * 24):  # Past 1 month, every hour
-        time_point = last_date - datetime.timedelta(hours=i)
-        timestamps.append(time_point.strftime("%Y-%m-%dT%H:%M:%S"))
+    time_point = last_date
+    while time_point >= first_date:
+        timestamps.append(time_point.strftime(TIMESTAMP_FORMAT))
+        time_point -= datetime.timedelta(hours=1)
     return timestamps
 
-def save_to_csv(data, filename="taxi_availability.csv"):
-    data.sort(key=lambda x: x[0], reverse=True)  # Sort latest to earliest
-    with open(filename, "w", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(["DateTime", "Taxi Available throughout SG", "Taxi Available in Selected Box Area","Coordinates[]"])
-        writer.writerows(data)
+async def fetch_into_store(client: AsyncAPIClient, timestamps, store, regions=DEFAULT_REGIONS, point_store=None):
+    """
+    Fetch the given timestamps and commit each result to the checkpoint store as it arrives.
+    Raw taxi positions go to point_store (a CoordinateStore) when one is given.
+    Returns the number of failed fetches.
+    """
+    async def fetch(ts):
+        return ts, await fetch_taxi_data(client, ts, regions)
+
+    failures = 0
+    tasks = [asyncio.create_task(fetch(ts)) for ts in timestamps]
+    for task in tqdm(asyncio.as_completed(tasks), total=len(tasks)):
+        ts, result = await task
+        if result is None:
+            store.record_failure(ts)
+            failures += 1
+        else:
+            timestamp, taxi_count_singapore, region_counts, points = result
+            if point_store is not None:
+                point_store.append(timestamp, points)
+            store.record(timestamp, taxi_count_singapore, region_counts)
+    return failures
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch hourly taxi availability from data.gov.sg.")
+    parser.add_argument("--since", type=datetime.datetime.fromisoformat, help="First hour to fetch, e.g. 2025-01-01T00:00")
+    parser.add_argument("--until", type=datetime.datetime.fromisoformat, help="Last hour to fetch, e.g. 2025-02-21T23:00")
+    parser.add_argument("--store", default="taxi_availability.sqlite", help="Checkpoint store of already fetched hours")
+    parser.add_argument("--output", default="taxi_availability.csv")
+    parser.add_argument("--regions", help="JSON file of named bounding boxes/polygons (default: the S107 box)")
+    parser.add_argument("--points-dir", default="taxi_points", help="Binary store for raw taxi positions")
+    parser.add_argument("--no-points", action="store_true", help="Do not keep raw taxi positions")
+    parser.add_argument("--full", action="store_true", help="Re-fetch every hour in the range, ignoring the store "
+                                                            "(with --offline: recount new regions from cached responses)")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Maximum requests per second")
+    parser.add_argument("--connections", type=int, default=10, help="Size of the keep-alive connection pool")
+    parser.add_argument("--refetch", help="Re-fetch plan from data_quality.py: its taxi hours are fetched again, "
+                                          "bypassing the store and the response cache")
+    add_cache_arguments(parser)
+    add_trace_arguments(parser)
+    return parser.parse_args(argv)
+
+async def run(args):
+    timestamps = generate_timestamps(args.since, args.until)
+    regions = load_regions(args.regions) if args.regions else DEFAULT_REGIONS
+    point_store = None if args.no_points else CoordinateStore(args.points_dir)
+    cache = cache_from_args(args)
+    refetch = []
+    with TaxiCheckpointStore(args.store) as store:
+        if args.refetch:
+            with open(args.refetch) as f:
+                refetch = json.load(f)["taxi"]
+            # Zero-count snapshots were stored (and cached) as successes; forget them before fetching
+            print(f"{store.invalidate(refetch)} stored hours invalidated for re-fetch")
+            if cache is not None:
+                for ts in refetch:
+                    cache.discard(TAXI_AVAILABILITY_URL, {"date_time": ts})
+        pending = timestamps if args.full else store.missing(timestamps)
+        # Re-fetch hours outside --since/--until were just deleted from the store: fetch them too
+        outside = sorted(set(refetch) - set(timestamps), reverse=True)
+        pending = pending + outside
+        print(f"{len(pending)} of {len(timestamps) + len(outside)} hours to fetch")
+        async with AsyncAPIClient(rate=args.rate, max_connections=args.connections, cache=cache,
+                                  offline=args.offline) as client:
+            failures = await fetch_into_store(client, pending, store, regions, point_store)
+        client.print_report()
+        if failures:
+            print(f"{failures} hours failed and will be retried on the next run")
+        count = store.export_csv(list(regions), args.output, since=timestamps[-1], until=timestamps[0])
+    print(f"{count} rows saved to {args.output}")
 
-def main():
-    timestamps = generate_timestamps()
-    results = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        with tqdm(total=len(timestamps)) as pbar:
-            futures = {executor.submit(fetch_taxi_data, ts): ts for ts in timestamps}
-            for future in concurrent.futures.as_completed(futures):
-                results.append(future.result())
-                pbar.update(1)
-    save_to_csv(results)
-    print("Data saved to taxi_availability.csv")
+def main(argv=None):
+    args = parse_args(argv)
+    trace_from_args(args)
+    asyncio.run(run(args))
 
 if __name__ == "__main__":
     main()
@@ -1,41 +1,32 @@
-import pandas as pd
-
-air_df = pd.read_csv("air_temperature_S107.csv", parse_dates=["timestamp"])
-humidity_df = pd.read_csv("relative_humidity_S107.csv", parse_dates=["timestamp"])
-rainfall_df = pd.read_csv("rainfall_S107.csv", parse_dates=["timestamp"])
+import os
+import sys
 
-# Rename the 'value' columns to reflect the sensor reading
-air_df.rename(columns={"value": "temp_value"}, inplace=True)
-humidity_df.rename(columns={"value": "humidity_value"}, inplace=True)
-rainfall_df.rename(columns={"value": "rainfall_value"}, inplace=True)
+import pandas as pd
 
-air_df.sort_values("timestamp", inplace=True)
-humidity_df.sort_values("timestamp", inplace=True)
-rainfall_df.sort_values("timestamp", inplace=True)
+if __name__ == "__main__":
+    # Run as a script: make the repository's packages importable
+    REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
 
-tolerance = pd.Timedelta("5min")
+from data_retrieval_and_cleaning.alignment import format_datetime, hourly_table
 
-merged_df = pd.merge_asof(
-    air_df,
-    humidity_df,
-    on="timestamp",
-    by="stationId",
-    tolerance=tolerance,
-    direction="nearest",
-    suffixes=("", "_humidity")
-)
+readings = {
+    "temp_value": "air_temperature_S107.csv",
+    "humidity_value": "relative_humidity_S107.csv",
+    "rainfall_value": "rainfall_S107.csv",
+}
 
-merged_df = pd.merge_asof(
-    merged_df,
-    rainfall_df,
-    on="timestamp",
-    by="stationId",
-    tolerance=tolerance,
-    direction="nearest",
-    suffixes=("", "_rainfall")
+# Stack the three sensor files into one long table of readings
+long_df = pd.concat(
+    [pd.read_csv(path).assign(variable=variable) for variable, path in readings.items()],
+    ignore_index=True,
 )
 
-final_df = merged_df[["timestamp", "stationId", "temp_value", "humidity_value", "rainfall_value"]]
+# Same hourly alignment as get_weather_data.process_and_merge_datasets:
+# readings are bucketed into the hour ending at HH:59:59, temperature and humidity
+# averaged, rainfall summed
+final_df = format_datetime(hourly_table(long_df, method="floor"))
 
 # Save the final merged data to a CSV file
 final_df.to_csv("merged_weather.csv", index=False)
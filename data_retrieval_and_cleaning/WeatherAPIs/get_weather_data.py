@@ -1,94 +1,79 @@
+import argparse
 import asyncio
-import aiohttp
 import csv
 import datetime
-import time
-import pandas as pd
-from aiohttp import ClientSession
-import backoff
+import json
+import os
+import sys
 from tqdm import tqdm
-import random
 
-def generate_timestamps():
-    """
-    Generate hourly timestamps for the past 1 year (365 days)
-    ending on February 21, 2025, at 23:59:59.
-    """
-    last_date = datetime.datetime(2025, 2, 21, 23, 59, 59) # Modify this to set last date
-    timestamps = []
-    for i in range(1095 * 24): # Modify this to get time period
-        time_point = last_date - datetime.timedelta(hours=i)
-        timestamps.append(time_point.strftime("%Y-%m-%dT%H:%M:%S"))
-    return timestamps
+if __name__ == "__main__":
+    # Run as a script: make the repository's packages importable
+    REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+
+from data_retrieval_and_cleaning.alignment import format_datetime, hourly_table, to_local_time
+from data_retrieval_and_cleaning.api_client import DEFAULT_RATE, WEATHER_BASE_URL, AsyncAPIClient
+from data_retrieval_and_cleaning.instrumentation import add_trace_arguments, timed, trace_from_args
+from data_retrieval_and_cleaning.request_planner import dedupe_readings, fetch_all_pages, plan_requests
+from data_retrieval_and_cleaning.response_cache import add_cache_arguments, cache_from_args
+from data_retrieval_and_cleaning.weather_store import STATIONS_FILE, to_long_frame, update_station_registry, write_long_format, write_station_metadata
 
+# Default backfill window: 1095 days ending 21 Feb 2025 23:59:59
+DEFAULT_UNTIL = datetime.datetime(2025, 2, 21, 23, 59, 59)
+DEFAULT_DAYS = 1095
+
+@timed("filter_station_data", "fetch")
 def filter_station_data(api_data, station_id="S107"):
     """
-    Filter the API response to keep only the readings for the specified station.
+    Filter the API response to keep only the readings for the specified station(s).
+    station_id may be a single ID, a collection of IDs, or None to keep every station;
+    all of them are extracted in a single pass over the response.
     """
     filtered = []
+    if station_id is None:
+        wanted = None
+    elif isinstance(station_id, str):
+        wanted = {station_id}
+    else:
+        wanted = set(station_id)
     readings = api_data.get("data", {}).get("readings", [])
     for record in readings:
         timestamp = record.get("timestamp")
         for item in record.get("data", []):
-            if item.get("stationId") == station_id:
+            item_station = item.get("stationId")
+            if wanted is None or item_station in wanted:
                 filtered.append({
                     "timestamp": timestamp,
-                    "stationId": station_id,
+                    "stationId": item_station,
                     "value": item.get("value")
                 })
     return filtered
 
-@backoff.on_exception(backoff.expo, 
-                     (aiohttp.ClientError, asyncio.TimeoutError), 
-                     max_tries=3, 
-                     max_time=60)
-async def fetch_weather_data(session: ClientSession, endpoint: str, date_str: str, semaphore: asyncio.Semaphore):
-    """
-    Asynchronously fetch weather data from the API with improved rate limit handling.
-    """
-    base_url = "https://api-open.data.gov.sg/v2/real-time/api"
-    params = {"date": date_str}
-    url = base_url + endpoint
-
-    async with semaphore:  # Limit concurrent access
-        max_retries = 3
-        retry_count = 0
-        retry_delay = 5
-        
-        while retry_count < max_retries:
-            try:
-                async with session.get(url, params=params, timeout=15) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    elif response.status == 429:  # Rate limit exceeded
-                        retry_count += 1
-                        # Exponential backoff with jitter
-                        jitter = random.uniform(0.5, 1.5)
-                        wait_time = retry_delay * (2 ** retry_count) * jitter
-                        print(f"Rate limit exceeded for {endpoint} at {date_str}, waiting {wait_time:.2f}s... (Attempt {retry_count}/{max_retries})")
-                        await asyncio.sleep(wait_time)
-                        continue  # Try again
-                    else:
-                        text = await response.text()
-                        print(f"Error {response.status} for {endpoint} at {date_str}: {text}")
-                        return None
-            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-                print(f"Request error for {endpoint} at {date_str}: {e}")
-                raise  # Let backoff handle the retry
-        
-        # If we've exhausted all retries
-        print(f"Failed after {max_retries} attempts for {endpoint} at {date_str}")
-        return None
-    
+@timed("fetch_weather_data", "fetch")
+async def fetch_weather_data(client: AsyncAPIClient, endpoint: str, date_str: str):
+    """
+    Fetch every page of weather data for one date (YYYY-MM-DD) or timestamp through the
+    shared rate-limited client. Returns a list of pages, or None if the fetch failed.
+    """
+    return await fetch_all_pages(client, endpoint, {"date": date_str})
 
-async def fetch_and_filter(session: ClientSession, endpoint: str, ts: str, semaphore: asyncio.Semaphore, station_id="S107"):
+async def fetch_and_filter(client: AsyncAPIClient, endpoint: str, ts: str, station_id="S107", station_registry=None):
     """
-    Fetch weather data for a specific endpoint and timestamp, then filter for the specified station.
+    Fetch weather data for a specific endpoint and date/timestamp, then filter for the specified station(s).
+    Station metadata seen in the responses is added to station_registry when one is given.
+    Returns (ts, readings), with readings None if the fetch failed.
     """
-    api_data = await fetch_weather_data(session, endpoint, ts, semaphore)
-    if api_data is not None:
-        return filter_station_data(api_data, station_id)
-    return []
+    pages = await fetch_weather_data(client, endpoint, ts)
+    if pages is None:
+        return ts, None
+    filtered = []
+    for api_data in pages:
+        filtered.extend(filter_station_data(api_data, station_id))
+        if station_registry is not None:
+            update_station_registry(station_registry, api_data)
+    return ts, filtered
 
 def save_to_csv(data, filename):
     """
@@ -105,121 +90,141 @@ def save_to_csv(data, filename):
         writer.writerows(data)
     print(f"Data saved to {filename}")
 
-async def process_data_for_endpoint(timestamps, endpoint, station_id="S107", concurrent_requests=3):
+def trim_to_window(records, since, until):
+    """
+    Keep readings whose local (SGT) timestamp lies within [since, until].
+    """
+    if not records:
+        return []
+    local = to_local_time([r["timestamp"] for r in records])
+    keep = (local >= since) & (local <= until)
+    return [r for r, k in zip(records, keep) if k]
+
+async def process_data_for_endpoint(client: AsyncAPIClient, dates, endpoint, station_id="S107", station_registry=None):
     """
-    Process all timestamps for a specific endpoint with improved rate limiting.
+    Fetch and filter all planned dates for one endpoint, then drop duplicate readings.
+    Pacing is left to the client's shared rate limiter.
     """
     results = []
+    failed = []
+    tasks = [asyncio.create_task(fetch_and_filter(client, endpoint, ts, station_id, station_registry)) for ts in dates]
+    for task in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc=f"Fetching {endpoint.strip('/')}"):
+        ts, filtered_result = await task
+        if filtered_result is None:
+            failed.append(ts)
+        else:
+            results.extend(filtered_result)
+    if failed:
+        print(f"{endpoint}: {len(failed)} requests failed: {sorted(failed)[:10]}{' ...' if len(failed) > 10 else ''}")
+    return dedupe_readings(results)
+
+@timed("merge.process_and_merge_datasets", "merge")
+def process_and_merge_datasets(temp_data, humidity_data, rainfall_data, method="floor", tolerance=None):
+    """
+    Align the three datasets to the hourly HH:59:59 grid and merge them per station.
+    Temperature and humidity are averaged within each hour and rainfall is summed
+    (see alignment.hourly_table for the method/tolerance options).
+    """
+    long_df = to_long_frame({
+        "air_temperature": temp_data,
+        "relative_humidity": humidity_data,
+        "rainfall": rainfall_data,
+    })
+    merged_df = hourly_table(long_df, method=method, tolerance=tolerance)
     
-    # Reduce concurrent requests to avoid overwhelming the API
-    semaphore = asyncio.Semaphore(concurrent_requests)
-    
-    # Add a global rate limiter
-    global_limiter = asyncio.Semaphore(10)  # Maximum 10 tasks in flight at once
-    
-    async with ClientSession() as session:
-        # Process in smaller batches to avoid creating too many tasks at once
-        batch_size = 400
-        for i in range(0, len(timestamps), batch_size):
-            batch = timestamps[i:i+batch_size]
-            
-            # Create tasks for current batch
-            tasks = []
-            for ts in batch:
-                task = asyncio.create_task(
-                    rate_limited_fetch(session, endpoint, ts, semaphore, global_limiter, station_id)
-                )
-                tasks.append(task)
-            
-            # Process tasks with a progress bar
-            for task in tqdm(asyncio.as_completed(tasks), total=len(tasks), 
-                          desc=f"Fetching {endpoint.strip('/')} batch {i//batch_size+1}/{len(timestamps)//batch_size+1}"):
-                filtered_result = await task
-                if filtered_result:
-                    results.extend(filtered_result)
+    # Sort by DateTime
+    merged_df = merged_df.sort_values('DateTime', ascending=False, ignore_index=True)
     
-    return results
+    return format_datetime(merged_df)
 
-async def rate_limited_fetch(session, endpoint, ts, semaphore, global_limiter, station_id):
-    """Helper function to add global rate limiting"""
-    async with global_limiter:
-        # Add a small random delay to avoid synchronized requests
-        await asyncio.sleep(random.uniform(0.1, 0.5))
-        return await fetch_and_filter(session, endpoint, ts, semaphore, station_id)
+def add_fetch_arguments(parser, days=DEFAULT_DAYS, granularity="day"):
+    """
+    The window, request and response-cache options shared by the weather fetch scripts.
+    """
+    parser.add_argument("--since", type=datetime.datetime.fromisoformat,
+                        help=f"Start of the window (default: {days} days before --until)")
+    parser.add_argument("--until", type=datetime.datetime.fromisoformat, default=DEFAULT_UNTIL)
+    parser.add_argument("--granularity", choices=["day", "hour"], default=granularity,
+                        help="One paginated request per day or one request per hour (default: %(default)s)")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Shared request budget per second")
+    parser.add_argument("--refetch", help="Re-fetch plan from data_quality.py: its weather days are dropped from the "
+                                          "response cache, so only they are requested again")
+    parser.set_defaults(days=days)
+    add_cache_arguments(parser)
+    add_trace_arguments(parser)
 
-def adjust_to_59(dt_str):
+def drop_refetch_days(cache, refetch_path, endpoints, granularity):
     """
-    Function to adjust minute to 59 for consistent datetime matching.
+    Drop every cached page (follow-up pages are cached under their paginationToken as well) of the
+    weather days listed in a data_quality.py re-fetch plan.
     """
-    dt = pd.to_datetime(dt_str)
-    return dt.replace(minute=59, second=59).strftime("%Y-%m-%dT%H:%M:%S")
+    with open(refetch_path) as f:
+        refetch = json.load(f)["weather"]
+    if cache is None:
+        print("--refetch without the response cache fetches the whole window again")
+        return
+    removed = 0
+    for day in refetch:
+        keys = [day] if granularity == "day" else [f"{day}T{hour:02d}:59:59" for hour in range(24)]
+        for endpoint in endpoints:
+            for key in keys:
+                removed += cache.discard_matching(WEATHER_BASE_URL + endpoint, {"date": key})
+    print(f"{len(refetch)} days ({removed} cached pages) dropped from the response cache for re-fetch")
 
-def process_and_merge_datasets(temp_data, humidity_data, rainfall_data):
-    """
-    Process and merge the three datasets based on standardized DateTime.
-    """
-    # Convert to DataFrames
-    if temp_data:
-        temp_df = pd.DataFrame(temp_data)
-        temp_df['DateTime'] = temp_df['timestamp'].apply(lambda x: adjust_to_59(x))
-        temp_df = temp_df.rename(columns={'value': 'temp_value'})
-        temp_df = temp_df[['DateTime', 'stationId', 'temp_value']]
-    else:
-        temp_df = pd.DataFrame(columns=['DateTime', 'stationId', 'temp_value'])
-    
-    if humidity_data:
-        humidity_df = pd.DataFrame(humidity_data)
-        humidity_df['DateTime'] = humidity_df['timestamp'].apply(lambda x: adjust_to_59(x))
-        humidity_df = humidity_df.rename(columns={'value': 'humidity_value'})
-        humidity_df = humidity_df[['DateTime', 'stationId', 'humidity_value']]
-    else:
-        humidity_df = pd.DataFrame(columns=['DateTime', 'stationId', 'humidity_value'])
-    
-    if rainfall_data:
-        rainfall_df = pd.DataFrame(rainfall_data)
-        rainfall_df['DateTime'] = rainfall_df['timestamp'].apply(lambda x: adjust_to_59(x))
-        rainfall_df = rainfall_df.rename(columns={'value': 'rainfall_value'})
-        rainfall_df = rainfall_df[['DateTime', 'stationId', 'rainfall_value']]
-    else:
-        rainfall_df = pd.DataFrame(columns=['DateTime', 'stationId', 'rainfall_value'])
-    
-    # Merge datasets on DateTime and stationId
-    merged_df = pd.merge(temp_df, humidity_df, on=['DateTime', 'stationId'], how='outer')
-    merged_df = pd.merge(merged_df, rainfall_df, on=['DateTime', 'stationId'], how='outer')
-    
-    # Sort by DateTime
-    merged_df = merged_df.sort_values('DateTime', ascending=False)
-    
-    return merged_df
+async def fetch_endpoints_from_args(args, endpoints, station_id="S107", station_registry=None):
+    """
+    Fetch the readings of every endpoint over the window given by add_fetch_arguments' options,
+    all through one client sharing the rate budget. Returns one list of readings per endpoint.
+    """
+    until = args.until
+    since = args.since or until - datetime.timedelta(days=args.days) + datetime.timedelta(seconds=1)
+    dates = plan_requests(since, until, args.granularity)
+    print(f"Fetching {len(dates)} {args.granularity} requests per endpoint for {len(endpoints)} endpoints")
+    cache = cache_from_args(args)
+    if args.refetch:
+        drop_refetch_days(cache, args.refetch, endpoints, args.granularity)
+    async with AsyncAPIClient(WEATHER_BASE_URL, rate=args.rate, cache=cache, offline=args.offline) as client:
+        # All endpoints run concurrently and share the client's rate budget
+        endpoint_results = await asyncio.gather(*(
+            process_data_for_endpoint(client, dates, endpoint, station_id, station_registry)
+            for endpoint in endpoints
+        ))
+    client.print_report()
+    # Day requests cover whole days; trim to the requested window
+    return [trim_to_window(readings, since, until) for readings in endpoint_results]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch weather station readings from data.gov.sg.")
+    parser.add_argument("--stations", nargs="+", default=["S107"],
+                        help="Station IDs to extract, or 'all' (default: S107, East Coast Parkway)")
+    parser.add_argument("--output-dir", default="weather_readings", help="Parquet dataset partitioned by station")
+    add_fetch_arguments(parser)
+    return parser.parse_args(argv)
 
-async def main():
+async def main(argv=None):
+    args = parse_args(argv)
+    trace_from_args(args)
     # Configuration
-    station_id = "S107" # Station ID for East Coast Parkway
-    timestamps = generate_timestamps()
+    station_id = None if args.stations == ["all"] else args.stations
+    suffix = args.stations[0] if len(args.stations) == 1 and station_id else "stations"
+    station_registry = {}
     
-    # Define endpoints and their concurrent request limits
     endpoints = {
-        "air_temperature": ("/air-temperature", 5),
-        "relative_humidity": ("/relative-humidity", 5),
-        "rainfall": ("/rainfall", 5)
+        "air_temperature": "/air-temperature",
+        "relative_humidity": "/relative-humidity",
+        "rainfall": "/rainfall"
     }
     
+    endpoint_results = await fetch_endpoints_from_args(args, list(endpoints.values()), station_id, station_registry)
+    
     results = {}
+    for data_type, readings in zip(endpoints, endpoint_results):
+        results[data_type] = readings
+        save_to_csv(readings, f"{data_type}_{suffix}.csv")
     
-    # Process each endpoint separately
-    for data_type, (endpoint, concurrent_limit) in endpoints.items():
-        print(f"\nProcessing {endpoint} data...")
-        endpoint_results = await process_data_for_endpoint(
-            timestamps, 
-            endpoint, 
-            station_id, 
-            concurrent_limit
-        )
-        
-        results[data_type] = endpoint_results
-        
-
-        save_to_csv(endpoint_results, f"{data_type}_S107.csv")
+    write_long_format(to_long_frame(results), args.output_dir)
+    write_station_metadata(station_registry, os.path.join(args.output_dir, STATIONS_FILE))
+    print(f"Long-format readings for {len(station_registry) if station_id is None else len(station_id)} stations saved to {args.output_dir}")
     
     print("\nMerging datasets...")
     merged_df = process_and_merge_datasets(
@@ -229,8 +234,8 @@ async def main():
     )
     
     if not merged_df.empty:
-        merged_df.to_csv("weather_data_merged_S107.csv", index=False)
-        print("Merged data saved to weather_data_merged_S107.csv")
+        merged_df.to_csv(f"weather_data_merged_{suffix}.csv", index=False)
+        print(f"Merged data saved to weather_data_merged_{suffix}.csv")
     else:
         print("No merged data to save.")
 
@@ -0,0 +1,94 @@
+import pandas as pd
+
+from data_retrieval_and_cleaning.instrumentation import timed
+
+LOCAL_TZ = "Asia/Singapore"
+DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+# How readings that fall into the same hour are combined
+DEFAULT_AGGREGATIONS = {
+    "temp_value": "mean",
+    "humidity_value": "mean",
+    "rainfall_value": "sum",  # rainfall readings are 5-minute totals
+}
+
+# Hourly rows are labelled one second before the hour they close (HH:59:59),
+# the instant at which the taxi snapshots are requested
+DEFAULT_LABEL_OFFSET = pd.Timedelta(seconds=-1)
+
+
+def to_local_time(values):
+    """
+    Parse timestamps into naive datetime64 in Singapore local time.
+    Timezone-aware inputs (e.g. "...+08:00") are converted first; naive ones are assumed local.
+    """
+    parsed = pd.to_datetime(pd.Series(values), format="ISO8601")
+    if parsed.dt.tz is not None:
+        parsed = parsed.dt.tz_convert(LOCAL_TZ).dt.tz_localize(None)
+    return parsed
+
+
+def align_to_hour(timestamps, method="floor", tolerance=None):
+    """
+    Snap local timestamps to the hour boundary that closes their hourly slot.
+
+    floor:   readings in [H:00, H+1:00) belong to the slot closing at H+1:00
+    ceil:    readings in (H:00, H+1:00] belong to the slot closing at H+1:00
+    nearest: readings in [H:30, H+1:30) belong to the slot closing at H+1:00
+
+    With a tolerance, readings further than that from their slot's closing boundary become NaT.
+    """
+    if method == "floor":
+        boundary = timestamps.dt.floor("h") + pd.Timedelta(hours=1)
+    elif method == "ceil":
+        boundary = timestamps.dt.ceil("h")
+    elif method == "nearest":
+        boundary = timestamps.dt.round("h")
+    else:
+        raise ValueError(f"Unknown alignment method {method!r}; expected 'floor', 'ceil' or 'nearest'")
+    if tolerance is not None:
+        boundary = boundary.where((timestamps - boundary).abs() <= pd.Timedelta(tolerance))
+    return boundary
+
+
+@timed("merge.hourly_table", "merge")
+def hourly_table(long_df, method="floor", tolerance=None, aggregations=None, label_offset=DEFAULT_LABEL_OFFSET):
+    """
+    Build the wide hourly weather table from long readings (timestamp, stationId, variable, value).
+
+    Returns one row per (DateTime, stationId) with one column per variable, where DateTime is a
+    datetime64 label (HH:59:59 by default). Every step is a vectorised pandas operation, so the
+    cost grows linearly with the number of readings.
+    """
+    aggregations = {**DEFAULT_AGGREGATIONS, **(aggregations or {})}
+    if long_df.empty:
+        return pd.DataFrame(columns=["DateTime", "stationId"] + list(DEFAULT_AGGREGATIONS))
+    timestamps = long_df["timestamp"]
+    if not pd.api.types.is_datetime64_dtype(timestamps):
+        timestamps = to_local_time(timestamps.to_numpy())
+    aligned = align_to_hour(timestamps.reset_index(drop=True), method, tolerance) + label_offset
+    frame = pd.DataFrame({
+        "DateTime": aligned.to_numpy(),
+        "stationId": long_df["stationId"].to_numpy(),
+        "variable": long_df["variable"].to_numpy(),
+        "value": pd.to_numeric(long_df["value"], errors="coerce").to_numpy(),
+    }).dropna(subset=["DateTime"])
+
+    columns = {}
+    for variable, group in frame.groupby("variable", sort=False):
+        how = aggregations.get(variable, "mean")
+        # min_count=1 keeps an hour with no valid rainfall reading as NaN instead of 0
+        grouped = group.groupby(["DateTime", "stationId"])["value"]
+        columns[variable] = grouped.sum(min_count=1) if how == "sum" else grouped.agg(how)
+    wide = pd.concat(columns, axis=1).sort_index()
+    ordered = [c for c in aggregations if c in wide.columns] + [c for c in wide.columns if c not in aggregations]
+    return wide[ordered].astype("float32").reset_index()
+
+
+def format_datetime(table, column="DateTime"):
+    """
+    Return a copy of the table with its datetime column rendered as the repo's CSV strings.
+    """
+    table = table.copy()
+    table[column] = table[column].dt.strftime(DATETIME_FORMAT)
+    return table
@@ -0,0 +1,244 @@
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from data_retrieval_and_cleaning.instrumentation import count, span
+
+WEATHER_BASE_URL = "https://api-open.data.gov.sg/v2/real-time/api"
+TAXI_AVAILABILITY_URL = "https://api.data.gov.sg/v1/transport/taxi-availability"
+
+# data.gov.sg does not publish a hard number for anonymous clients; this is the highest steady
+# rate we have sustained without 429s. The limiter backs off on its own if the API disagrees.
+DEFAULT_RATE = 5.0
+DEFAULT_BURST = 10
+
+
+class TokenBucket:
+    """
+    Async token-bucket limiter shared by every request made through one client.
+
+    On a 429 the rate is halved (down to min_rate) and all callers are paused for the
+    server's Retry-After; each success then nudges the rate back towards max_rate.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, min_rate=0.5):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        """
+        Stop handing out tokens for the given number of seconds and slow the refill rate.
+        """
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+        self.rate = max(self.min_rate, self.rate / 2)
+
+    def reward(self):
+        self.rate = min(self.max_rate, self.rate + 0.05 * self.max_rate)
+
+
+class EndpointMetrics:
+    """
+    Latency, retry and rate-limit counters for a single endpoint.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.cache_hits = 0
+        self.latencies = []
+
+    def summary(self):
+        latencies = sorted(self.latencies)
+        def pct(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else 0.0
+        return {
+            "requests": self.requests,
+            "successes": self.successes,
+            "failures": self.failures,
+            "retries": self.retries,
+            "429s": self.rate_limited,
+            "cache_hits": self.cache_hits,
+            "mean_latency_s": sum(latencies) / len(latencies) if latencies else 0.0,
+            "p50_latency_s": pct(0.50),
+            "p99_latency_s": pct(0.99),
+        }
+
+
+def parse_retry_after(value, default):
+    """
+    Parse a Retry-After header given either as seconds or as an HTTP date.
+    """
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class AsyncAPIClient:
+    """
+    Shared aiohttp client for the data.gov.sg fetchers.
+
+    Provides a keep-alive connection pool, a token-bucket rate limiter, bounded retries
+    (no recursion) that honour Retry-After, and per-endpoint metrics. Use as:
+
+        async with AsyncAPIClient(WEATHER_BASE_URL) as client:
+            data = await client.get_json("/rainfall", {"date": "2025-02-21"})
+
+    With a ResponseCache, successful responses are stored raw and later requests for the same
+    URL and params are answered from disk without touching the rate limiter. offline=True
+    serves only from the cache: a miss fails like an exhausted request.
+    """
+
+    def __init__(self, base_url="", rate=DEFAULT_RATE, burst=DEFAULT_BURST, max_connections=10,
+                 max_retries=5, timeout=15, backoff_base=1.0, default_retry_after=5.0, cache=None, offline=False):
+        if offline and cache is None:
+            raise ValueError("offline mode needs a response cache")
+        self.base_url = base_url
+        self.cache = cache
+        self.offline = offline
+        self.limiter = TokenBucket(rate, burst)
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.backoff_base = backoff_base
+        self.default_retry_after = default_retry_after
+        self.metrics = defaultdict(EndpointMetrics)
+        self.session = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+        if self.cache is not None:
+            self.cache.flush()
+
+    async def get_json(self, endpoint, params=None, use_cache=True):
+        """
+        GET base_url + endpoint and return the decoded JSON, or None once retries are exhausted
+        or the server answers with a non-retryable error. use_cache=False always asks the API
+        (for "latest" requests whose answer changes) and does not store the response.
+        """
+        url = self.base_url + endpoint
+        metrics = self.metrics[urlsplit(url).path]
+        use_cache = use_cache and self.cache is not None
+        if use_cache:
+            body = self.cache.get(url, params)
+            if body is not None:
+                try:
+                    data = json.loads(body)
+                except ValueError:
+                    # Corrupted entry: forget it and fetch the request again
+                    self.cache.discard(url, params)
+                else:
+                    metrics.cache_hits += 1
+                    count("api.cache_hits")
+                    return data
+            if self.offline:
+                metrics.failures += 1
+                return None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                metrics.retries += 1
+            with span("api.rate_limit_wait", "fetch"):
+                await self.limiter.acquire()
+            metrics.requests += 1
+            count("api.requests")
+            start = time.perf_counter()
+            try:
+                async with self.session.get(url, params=params) as response:
+                    if response.status == 200:
+                        with span("api.read_body", "fetch"):
+                            body = await response.read()
+                        count("api.bytes", len(body))
+                        metrics.latencies.append(time.perf_counter() - start)
+                        try:
+                            data = json.loads(body)
+                        except ValueError as e:
+                            # Truncated body or an HTML error page: retried like a 5xx, never cached
+                            if attempt == self.max_retries:
+                                print(f"Invalid JSON for {endpoint} {params}: {e}")
+                        else:
+                            metrics.successes += 1
+                            self.limiter.reward()
+                            if use_cache:
+                                self.cache.put(url, params, body)
+                            return data
+                    else:
+                        metrics.latencies.append(time.perf_counter() - start)
+                        if response.status == 429:
+                            metrics.rate_limited += 1
+                            count("api.429s")
+                            delay = parse_retry_after(response.headers.get("Retry-After"), self.default_retry_after)
+                            self.limiter.pause(delay)
+                            continue
+                        if response.status < 500:
+                            text = await response.text()
+                            print(f"Error {response.status} for {endpoint} {params}: {text[:200]}")
+                            break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.max_retries:
+                    print(f"Request error for {endpoint} {params}: {e!r}")
+            # 5xx, invalid body or network error: exponential backoff with jitter before the next attempt
+            if attempt < self.max_retries:
+                await asyncio.sleep(self.backoff_base * (2 ** attempt) * random.uniform(0.5, 1.5))
+        metrics.failures += 1
+        return None
+
+    def report(self):
+        """
+        Return {endpoint path: metrics summary}.
+        """
+        return {endpoint: m.summary() for endpoint, m in self.metrics.items()}
+
+    def print_report(self):
+        for endpoint, summary in self.report().items():
+            print(
+                f"{endpoint}: {summary['requests']} requests, {summary['successes']} ok, "
+                f"{summary['failures']} failed, {summary['retries']} retries, {summary['429s']} x 429, "
+                f"{summary['cache_hits']} cached, "
+                f"latency mean {summary['mean_latency_s']:.3f}s p99 {summary['p99_latency_s']:.3f}s"
+            )
+        if self.cache is not None:
+            self.cache.print_report()
@@ -0,0 +1,127 @@
+import csv
+import datetime
+import json
+import sqlite3
+
+
+class TaxiCheckpointStore:
+    """
+    SQLite store of taxi-availability snapshots keyed by the requested timestamp.
+
+    Every fetch result (successful or failed) is committed as soon as it arrives, so an
+    interrupted run loses nothing and the next run only requests missing or failed hours.
+    """
+
+    def __init__(self, path="taxi_availability.sqlite"):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        # WAL keeps each commit cheap and the file readable if the process is killed mid-run
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS snapshots (
+                timestamp TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                taxi_count INTEGER,
+                region_counts TEXT,
+                fetched_at TEXT NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def fetched_timestamps(self):
+        """
+        Return the set of timestamps that were fetched successfully.
+        """
+        rows = self.conn.execute("SELECT timestamp FROM snapshots WHERE status = 'ok'")
+        return {row[0] for row in rows}
+
+    def failed_timestamps(self):
+        """
+        Return the set of timestamps whose last fetch attempt failed.
+        """
+        rows = self.conn.execute("SELECT timestamp FROM snapshots WHERE status = 'failed'")
+        return {row[0] for row in rows}
+
+    def missing(self, timestamps):
+        """
+        Return the timestamps (in the given order) that still need to be fetched.
+        """
+        done = self.fetched_timestamps()
+        return [ts for ts in timestamps if ts not in done]
+
+    def record(self, timestamp, taxi_count, region_counts):
+        """
+        Store a successful snapshot ({region name: taxi count}) and commit immediately.
+        """
+        self.conn.execute(
+            "INSERT OR REPLACE INTO snapshots VALUES (?, 'ok', ?, ?, ?)",
+            (timestamp, taxi_count, json.dumps(region_counts), _now()),
+        )
+        self.conn.commit()
+
+    def record_failure(self, timestamp):
+        """
+        Mark a timestamp as failed so the next run retries it; never overwrites a good row.
+        """
+        self.conn.execute(
+            "INSERT OR IGNORE INTO snapshots VALUES (?, 'failed', NULL, NULL, ?)",
+            (timestamp, _now()),
+        )
+        self.conn.commit()
+
+    def invalidate(self, timestamps):
+        """
+        Forget the given timestamps (e.g. hours the data-quality stage found missing or zero),
+        so missing() returns them again. Returns the number of rows removed.
+        """
+        removed = 0
+        for timestamp in timestamps:
+            removed += self.conn.execute("DELETE FROM snapshots WHERE timestamp = ?", (timestamp,)).rowcount
+        self.conn.commit()
+        return removed
+
+    def rows(self, since=None, until=None):
+        """
+        Yield successful snapshots as [timestamp, taxi_count, region_counts], latest first,
+        optionally restricted to an inclusive timestamp range.
+        """
+        query = "SELECT timestamp, taxi_count, region_counts FROM snapshots WHERE status = 'ok'"
+        params = []
+        if since is not None:
+            query += " AND timestamp >= ?"
+            params.append(since)
+        if until is not None:
+            query += " AND timestamp <= ?"
+            params.append(until)
+        query += " ORDER BY timestamp DESC"
+        for timestamp, taxi_count, region_counts in self.conn.execute(query, params):
+            yield [timestamp, taxi_count, json.loads(region_counts)]
+
+    def export_csv(self, region_names, filename="taxi_availability.csv", since=None, until=None):
+        """
+        Write the stored snapshots as CSV with one "Taxi Available in <region>" column per region.
+        """
+        count = 0
+        with open(filename, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["DateTime", "Taxi Available throughout SG"] + [f"Taxi Available in {name}" for name in region_names])
+            for timestamp, taxi_count, region_counts in self.rows(since, until):
+                writer.writerow([timestamp, taxi_count] + [region_counts.get(name) for name in region_names])
+                count += 1
+        return count
+
+
+def _now():
+    return datetime.datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
@@ -0,0 +1,265 @@
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+if __name__ == "__main__":
+    # Run as a script: make the repository's packages importable
+    REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+
+from data_retrieval_and_cleaning.alignment import DATETIME_FORMAT, to_local_time
+from data_retrieval_and_cleaning.instrumentation import add_trace_arguments, timed, trace_from_args
+from data_retrieval_and_cleaning.weather_store import VARIABLE_COLUMNS
+
+HOURS_PER_WEEK = 24 * 7
+
+# An islandwide count of zero is a failed snapshot, never a real hour; a box can legitimately be empty
+ZERO_OUTLIER_COLUMNS = ("Taxi Available throughout SG",)
+
+# Calendar features are recomputed from the hourly grid instead of imputed
+CALENDAR_COLUMNS = ("IsWeekend", "Hour")
+
+# Strategies are tried in order; whatever one leaves missing goes to the next
+TAXI_STRATEGIES = ("seasonal", "interpolate")
+WEATHER_STRATEGIES = ("interpolate",)
+# 0/1 flags must stay 0/1: copy the same hour of an earlier week, else the previous hour
+FLAG_STRATEGIES = ("seasonal", "ffill")
+FLAG_COLUMNS = ("peak_period",)
+
+
+def is_taxi_column(column):
+    return column.startswith("Taxi Available") or column == "Average Taxi Availability"
+
+
+def default_strategies(columns):
+    """
+    Taxi counts follow a strong weekly cycle, so their gaps are filled from the same hour of
+    earlier weeks first; weather (and anything else) is interpolated in time.
+    """
+    strategies = {}
+    for c in columns:
+        if c in CALENDAR_COLUMNS:
+            continue
+        if c in FLAG_COLUMNS:
+            strategies[c] = FLAG_STRATEGIES
+        else:
+            strategies[c] = TAXI_STRATEGIES if is_taxi_column(c) else WEATHER_STRATEGIES
+    return strategies
+
+
+def complete_hourly_index(df, datetime_column="DateTime", since=None, until=None):
+    """
+    Reindex a table onto every hour between its first and last label (or since/until), oldest first.
+    Hours that were never fetched or were dropped by a merge become rows of NaN; repeated labels
+    keep their first row. Returns the table with a naive datetime64 DateTime column.
+    """
+    df = df.copy()
+    df[datetime_column] = to_local_time(df[datetime_column]).to_numpy()
+    df = df.drop_duplicates(datetime_column).set_index(datetime_column).sort_index()
+    start = pd.Timestamp(since) if since is not None else df.index[0]
+    end = pd.Timestamp(until) if until is not None else df.index[-1]
+    # The labels are HH:59:59, so an hourly range from the first label stays on the grid
+    grid = pd.date_range(start, end, freq="h", name=datetime_column)
+    return df.reindex(grid).reset_index()
+
+
+def flag_zero_outliers(df, columns=ZERO_OUTLIER_COLUMNS):
+    """
+    Return a boolean frame marking zero counts (failed fetches written as 0) in `columns`.
+    """
+    columns = [c for c in columns if c in df.columns]
+    return df[columns].eq(0)
+
+
+def find_gaps(missing, datetimes):
+    """
+    Turn a boolean (hours, columns) frame of missing values into one row per run of consecutive
+    missing hours: column, start, end and length in hours.
+    """
+    runs = []
+    times = np.asarray(datetimes)
+    for column in missing.columns:
+        flags = missing[column].to_numpy().astype(np.int8)
+        edges = np.diff(np.concatenate([[0], flags, [0]]))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)  # Exclusive
+        if len(starts):
+            runs.append(pd.DataFrame({"column": column, "start": times[starts], "end": times[ends - 1],
+                                      "hours": ends - starts}))
+    if not runs:
+        return pd.DataFrame(columns=["column", "start", "end", "hours"])
+    return pd.concat(runs, ignore_index=True).sort_values(["start", "column"], ignore_index=True)
+
+
+def _fill(series, strategy, limit, season, max_seasons):
+    if strategy == "ffill":
+        return series.ffill(limit=limit)
+    if strategy == "seasonal":
+        # Same hour k weeks earlier, nearest week first; never looks into the future
+        filled = series
+        for k in range(1, max_seasons + 1):
+            if not filled.isna().any():
+                break
+            filled = filled.fillna(series.shift(k * season))
+        return filled
+    if strategy == "interpolate":
+        return series.interpolate(method="linear", limit=limit, limit_area="inside")
+    raise ValueError(f"Unknown imputation strategy {strategy!r}; expected 'ffill', 'seasonal' or 'interpolate'")
+
+
+def impute(df, strategies=None, limit=None, season=HOURS_PER_WEEK, max_seasons=4):
+    """
+    Fill the NaNs of every column with its strategies (see default_strategies), one vectorised
+    pandas operation per column and strategy. `limit` caps how many consecutive hours ffill and
+    interpolate may fill. Returns (filled copy, boolean frame of the values that were filled).
+    """
+    strategies = strategies or default_strategies([c for c in df.columns if c != "DateTime"])
+    filled = df.copy()
+    for column, column_strategies in strategies.items():
+        if column not in filled.columns:
+            continue
+        if isinstance(column_strategies, str):
+            column_strategies = (column_strategies,)
+        for strategy in column_strategies:
+            filled[column] = _fill(filled[column], strategy, limit, season, max_seasons)
+    columns = list(strategies)
+    columns = [c for c in columns if c in df.columns]
+    return filled, df[columns].isna() & filled[columns].notna()
+
+
+def add_calendar_columns(df, datetime_column="DateTime"):
+    if "IsWeekend" in df.columns:
+        df["IsWeekend"] = (df[datetime_column].dt.weekday >= 5).astype(df["IsWeekend"].dtype)
+    if "Hour" in df.columns:
+        df["Hour"] = (df[datetime_column].dt.hour + 1).astype(df["Hour"].dtype)
+    return df
+
+
+def coverage_report(missing, outliers, imputed, remaining, gaps):
+    """
+    Per-column hours, observed values, missing hours, zero outliers, imputed values, values still
+    missing, coverage of real observations and the longest gap.
+    """
+    hours = len(missing)
+    report = pd.DataFrame(index=missing.columns)
+    report["hours"] = hours
+    report["missing"] = missing.sum()
+    report["zero_outliers"] = outliers.reindex(columns=missing.columns, fill_value=False).sum()
+    report["observed"] = hours - report["missing"] - report["zero_outliers"]
+    report["imputed"] = imputed.reindex(columns=missing.columns, fill_value=False).sum()
+    report["still_missing"] = remaining.reindex(columns=missing.columns, fill_value=False).sum()
+    report["coverage_pct"] = 100 * report["observed"] / max(hours, 1)
+    longest = gaps.groupby("column")["hours"].max() if len(gaps) else pd.Series(dtype=int)
+    report["longest_gap_hours"] = longest.reindex(missing.columns, fill_value=0).astype(int)
+    return report
+
+
+def refetch_plan(unobserved, datetimes):
+    """
+    Requests that would repair the gaps: the hourly taxi timestamps (TaxiAvailabilityScript format)
+    where any taxi column is unobserved, and the days (YYYY-MM-DD, one day request of the v2 weather
+    API) where any weather column is.
+    """
+    times = pd.Series(pd.to_datetime(np.asarray(datetimes)))
+    taxi_columns = [c for c in unobserved.columns if is_taxi_column(c)]
+    weather_columns = [c for c in unobserved.columns if c in VARIABLE_COLUMNS.values()]
+    taxi = times[unobserved[taxi_columns].any(axis=1).to_numpy()] if taxi_columns else times.iloc[:0]
+    weather = times[unobserved[weather_columns].any(axis=1).to_numpy()] if weather_columns else times.iloc[:0]
+    return {
+        "taxi": taxi.dt.strftime(DATETIME_FORMAT).tolist(),
+        # Readings of the slot HH:59:59 are taken during hour HH, so they belong to that label's day
+        "weather": sorted(set(weather.dt.strftime("%Y-%m-%d"))),
+    }
+
+
+@timed("merge.clean_features", "merge")
+def clean_features(df, strategies=None, limit=None, zero_columns=ZERO_OUTLIER_COLUMNS, since=None, until=None):
+    """
+    The whole data-quality stage: complete hourly index, zero outliers treated as missing, gap
+    detection, imputation and recomputed calendar columns.
+
+    Returns (cleaned table oldest first, coverage report, gaps, re-fetch plan). The cleaned table
+    has exactly one row per hour, so every 24-hour window really spans 24 consecutive hours.
+    """
+    table = complete_hourly_index(df, since=since, until=until)
+    value_columns = [c for c in table.columns if c != "DateTime" and c not in CALENDAR_COLUMNS
+                     and pd.api.types.is_numeric_dtype(table[c])]
+    missing = table[value_columns].isna()
+    outliers = flag_zero_outliers(table, zero_columns)
+    for column in outliers.columns:
+        table.loc[outliers[column].to_numpy(), column] = np.nan
+    unobserved = table[value_columns].isna()
+    gaps = find_gaps(unobserved, table["DateTime"])
+    strategies = strategies or default_strategies(value_columns)
+    cleaned, imputed = impute(table, strategies, limit)
+    cleaned = add_calendar_columns(cleaned)
+    for column in cleaned.columns:
+        if column != "DateTime" and column not in value_columns and column not in CALENDAR_COLUMNS:
+            # Labels such as stationId: carry them into the added hours
+            cleaned[column] = cleaned[column].ffill().bfill()
+    remaining = cleaned[value_columns].isna()
+    report = coverage_report(missing, outliers, imputed, remaining, gaps)
+    return cleaned, report, gaps, refetch_plan(unobserved, table["DateTime"])
+
+
+def read_table(path):
+    if path.endswith((".arrow", ".parquet")):
+        from data_retrieval_and_cleaning.feature_table import load_feature_table
+        return load_feature_table(path).to_pandas()
+    return pd.read_csv(path)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Find and fill missing hours in a merged taxi/weather table.")
+    parser.add_argument("--input", required=True, help="Merged CSV (e.g. merged_file_with_mean.csv) or feature table")
+    parser.add_argument("--output", required=True, help="Cleaned CSV, one row per hour in the input's time order")
+    parser.add_argument("--report", help="Per-column coverage report (CSV)")
+    parser.add_argument("--gaps", help="Every run of missing hours (CSV)")
+    parser.add_argument("--refetch", help="JSON list of taxi hours and weather days to fetch again "
+                                          "(pass to the fetch scripts' --refetch)")
+    parser.add_argument("--strategy", nargs="+", help="Override every column's strategies, e.g. seasonal interpolate")
+    parser.add_argument("--limit", type=int, help="Longest run of hours ffill/interpolate may fill")
+    add_trace_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    trace_from_args(args)
+    df = read_table(args.input)
+    times = to_local_time(df["DateTime"])
+    newest_first = len(times) > 1 and times.iloc[0] > times.iloc[-1]
+    strategies = None
+    if args.strategy:
+        strategies = {c: tuple(args.strategy) for c in df.columns if c != "DateTime" and c not in CALENDAR_COLUMNS}
+    cleaned, report, gaps, plan = clean_features(df, strategies, args.limit)
+
+    print(report.to_string(float_format=lambda v: f"{v:.1f}"))
+    print(f"{len(df)} rows in, {len(cleaned)} hours out; {len(gaps)} gaps, "
+          f"{len(plan['taxi'])} taxi hours and {len(plan['weather'])} weather days to re-fetch")
+    if report["still_missing"].any():
+        print("Some values could not be imputed (gaps at the edges or longer than --limit)")
+
+    if newest_first:
+        # Keep the input's row order; the notebooks and forecasting/ sort by DateTime when reading
+        cleaned = cleaned.iloc[::-1]
+    cleaned = cleaned.assign(DateTime=cleaned["DateTime"].dt.strftime(DATETIME_FORMAT))
+    cleaned[[c for c in df.columns if c in cleaned.columns]].to_csv(args.output, index=False)
+    print(f"Cleaned table saved to {args.output}")
+    if args.report:
+        report.to_csv(args.report, index_label="column")
+    if args.gaps:
+        gaps.to_csv(args.gaps, index=False)
+    if args.refetch:
+        with open(args.refetch, "w") as f:
+            json.dump(plan, f, indent=1)
+        print(f"Re-fetch plan saved to {args.refetch}")
+
+
+if __name__ == "__main__":
+    main()
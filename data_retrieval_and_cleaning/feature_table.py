@@ -0,0 +1,231 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+if __name__ == "__main__":
+    # Run as a script: make the repository's packages importable
+    REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+
+from data_retrieval_and_cleaning.alignment import hourly_table, to_local_time
+from data_retrieval_and_cleaning.instrumentation import add_trace_arguments, timed, trace_from_args
+
+# Columns that never become model features
+NON_FEATURE_COLUMNS = ["DateTime", "stationId", "Coordinates[]", "Group", "timestamp"]
+
+
+def taxi_chunks_from_store(path, chunksize=50_000):
+    """
+    Stream successful snapshots from a TaxiCheckpointStore database in ascending time order.
+    """
+    conn = sqlite3.connect(path)
+    try:
+        cursor = conn.execute(
+            "SELECT timestamp, taxi_count, region_counts FROM snapshots WHERE status = 'ok' ORDER BY timestamp"
+        )
+        while True:
+            rows = cursor.fetchmany(chunksize)
+            if not rows:
+                break
+            counts = pd.DataFrame([json.loads(r[2]) for r in rows])
+            counts.columns = [f"Taxi Available in {name}" for name in counts.columns]
+            chunk = pd.DataFrame({
+                "DateTime": [r[0] for r in rows],
+                "Taxi Available throughout SG": [r[1] for r in rows],
+            })
+            yield pd.concat([chunk, counts], axis=1)
+    finally:
+        conn.close()
+
+
+def taxi_chunks_from_csv(path, chunksize=50_000):
+    """
+    Stream a taxi CSV (or an already merged CSV) in chunks of ascending time.
+
+    The fetchers write newest-first; such files cannot be streamed forwards, so they are
+    read once and sorted before being chunked.
+    """
+    reader = pd.read_csv(path, chunksize=chunksize)
+    first = next(reader, None)
+    if first is None:
+        return
+    times = pd.to_datetime(first["DateTime"])
+    if times.is_monotonic_increasing:
+        yield first
+        yield from reader
+        return
+    df = pd.concat([first, *reader], ignore_index=True)
+    df = df.iloc[np.argsort(pd.to_datetime(df["DateTime"]).to_numpy(), kind="stable")]
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+
+def weather_lookup_from_dataset(directory, station_id, method="floor", tolerance=None):
+    """
+    Return lookup(start, end) -> hourly weather for one station between two datetime64 labels,
+    reading only the matching rows of the station's Parquet partition.
+    """
+    dataset = ds.dataset(os.path.join(directory, f"stationId={station_id}"), format="parquet")
+
+    def lookup(start, end):
+        # Widen by two hours so slots straddling the chunk edges are aggregated completely
+        lo = pd.Timestamp(start) - pd.Timedelta(hours=2)
+        hi = pd.Timestamp(end) + pd.Timedelta(hours=2)
+        table = dataset.to_table(filter=(ds.field("timestamp") >= lo) & (ds.field("timestamp") <= hi))
+        long_df = table.to_pandas()
+        long_df["stationId"] = station_id
+        hourly = hourly_table(long_df, method=method, tolerance=tolerance).drop(columns="stationId")
+        return hourly[(hourly["DateTime"] >= start) & (hourly["DateTime"] <= end)]
+
+    return lookup
+
+
+def weather_lookup_from_csv(path):
+    """
+    Return lookup(start, end) over an hourly weather CSV (weather_data_merged_*.csv / merged_weather.csv).
+    The hourly table is small (about 9k rows per station-year), so it is held sorted in memory.
+    """
+    weather = pd.read_csv(path)
+    weather["DateTime"] = to_local_time(weather["DateTime"]).to_numpy()
+    weather = weather.drop(columns=["stationId"], errors="ignore").sort_values("DateTime", ignore_index=True)
+    keys = weather["DateTime"].to_numpy()
+
+    def lookup(start, end):
+        lo = np.searchsorted(keys, np.datetime64(start), side="left")
+        hi = np.searchsorted(keys, np.datetime64(end), side="right")
+        return weather.iloc[lo:hi]
+
+    return lookup
+
+
+def add_calendar_features(df):
+    """
+    Derive the calendar features used by every model: IsWeekend (0/1) and Hour (1-24).
+    """
+    df["IsWeekend"] = (df["DateTime"].dt.weekday >= 5).astype("float32")
+    df["Hour"] = (df["DateTime"].dt.hour + 1).astype("float32")  # Convert 0-23 to 1-24
+    return df
+
+
+@timed("merge.build_features", "merge")
+def build_features(taxi_chunk, weather_lookup=None):
+    """
+    Join one taxi chunk to the weather on a real timestamp and return DateTime plus float32 features.
+    Without a weather lookup the chunk is expected to carry the weather columns already.
+    """
+    taxi_chunk = taxi_chunk.copy()
+    taxi_chunk["DateTime"] = to_local_time(taxi_chunk["DateTime"]).to_numpy()
+    merged = taxi_chunk
+    if weather_lookup is not None:
+        # A merged CSV already carries the weather columns; only join what is missing
+        weather = weather_lookup(taxi_chunk["DateTime"].min(), taxi_chunk["DateTime"].max())
+        weather = weather[["DateTime"] + [c for c in weather.columns if c != "DateTime" and c not in taxi_chunk.columns]]
+        if len(weather.columns) > 1:
+            merged = taxi_chunk.merge(weather, on="DateTime", how="inner")
+    merged = merged.drop(columns=[c for c in NON_FEATURE_COLUMNS if c != "DateTime" and c in merged.columns])
+    merged = add_calendar_features(merged)
+    features = merged.drop(columns="DateTime").apply(pd.to_numeric, errors="coerce").astype("float32")
+    features.insert(0, "DateTime", merged["DateTime"].to_numpy())
+    return features
+
+
+def open_writer(path, schema):
+    if path.endswith(".parquet"):
+        return pq.ParquetWriter(path, schema)
+    # Uncompressed Arrow IPC file: can be memory-mapped without decoding
+    return pa.ipc.new_file(path, schema)
+
+
+def build_feature_table(taxi_chunks, weather_lookup, output="features.arrow"):
+    """
+    Stream taxi chunks through the weather join and append each result to a typed
+    Arrow (.arrow) or Parquet (.parquet) feature table. Returns the number of rows written.
+    """
+    writer = None
+    schema = None
+    rows = 0
+    last_time = None
+    try:
+        for chunk in taxi_chunks:
+            features = build_features(chunk, weather_lookup)
+            if features.empty:
+                continue
+            if last_time is not None and features["DateTime"].iloc[0] <= last_time:
+                raise ValueError("Taxi chunks must arrive in ascending time order")
+            last_time = features["DateTime"].iloc[-1]
+            table = pa.Table.from_pandas(features, preserve_index=False)
+            if writer is None:
+                schema = table.schema.remove_metadata()
+                writer = open_writer(output, schema)
+            writer.write_table(table.select(schema.names).cast(schema))
+            rows += len(features)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def load_feature_table(path):
+    """
+    Open a feature table; Arrow IPC files are memory-mapped, so columns are not copied.
+    """
+    if path.endswith(".parquet"):
+        return pq.read_table(path, memory_map=True)
+    return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+
+def load_feature_matrix(path, columns=None):
+    """
+    Return (DateTime array, float32 matrix of shape (rows, features), feature names).
+    """
+    table = load_feature_table(path)
+    names = columns or [name for name in table.column_names if name != "DateTime"]
+    matrix = np.empty((table.num_rows, len(names)), dtype=np.float32)
+    for i, name in enumerate(names):
+        matrix[:, i] = table.column(name).to_numpy()
+    return table.column("DateTime").to_numpy(), matrix, names
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Merge taxi and weather data into a typed float32 feature table.")
+    taxi = parser.add_mutually_exclusive_group(required=True)
+    taxi.add_argument("--taxi-store", help="TaxiCheckpointStore SQLite file")
+    taxi.add_argument("--taxi-csv", help="Taxi (or already merged) CSV file")
+    weather = parser.add_mutually_exclusive_group()
+    weather.add_argument("--weather-dir", help="Parquet dataset written by get_weather_data")
+    weather.add_argument("--weather-csv", help="Hourly merged weather CSV (omit both if the taxi CSV is already merged)")
+    parser.add_argument("--station", default="S107", help="Station to use with --weather-dir")
+    parser.add_argument("--output", default="features.arrow", help=".arrow (memory-mappable) or .parquet")
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    add_trace_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    trace_from_args(args)
+    if args.taxi_store:
+        chunks = taxi_chunks_from_store(args.taxi_store, args.chunksize)
+    else:
+        chunks = taxi_chunks_from_csv(args.taxi_csv, args.chunksize)
+    if args.weather_dir:
+        lookup = weather_lookup_from_dataset(args.weather_dir, args.station)
+    elif args.weather_csv:
+        lookup = weather_lookup_from_csv(args.weather_csv)
+    else:
+        lookup = None
+    rows = build_feature_table(chunks, lookup, args.output)
+    print(f"{rows} rows saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+import asyncio
+import atexit
+import contextlib
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+
+# One flag checked by every timer; while it is False a span costs a function call and a
+# shared null context, and a counter a function call
+_enabled = False
+_recorder = None
+_NULL_SPAN = contextlib.nullcontext()
+
+
+class Recorder:
+    """
+    Collects timed spans and counters.
+
+    Every span updates its name's totals (calls, total and longest time) for the summary table and,
+    up to max_events, is kept as an event of the Chrome trace (chrome://tracing or ui.perfetto.dev).
+    Spans inside asyncio tasks, which overlap on one thread, become async events so that concurrent
+    requests show as separate bars; all others are complete events on their thread's track.
+    """
+
+    def __init__(self, max_events=1_000_000):
+        self.max_events = max_events
+        self.origin = time.perf_counter_ns()
+        self.pid = os.getpid()
+        self.events = []
+        self.dropped = 0
+        self.totals = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+        self._next_id = 0
+
+    def add_span(self, name, start_ns, end_ns, category="", args=None):
+        duration = end_ns - start_ns
+        with self.lock:
+            totals = self.totals.get(name)
+            if totals is None:
+                self.totals[name] = [1, duration, duration]
+            else:
+                totals[0] += 1
+                totals[1] += duration
+                totals[2] = max(totals[2], duration)
+            if len(self.events) >= self.max_events:
+                self.dropped += 1
+                return
+            task = _current_task()
+            if task is None:
+                self.events.append(("X", name, category, start_ns, duration, threading.get_ident(), args))
+            else:
+                self._next_id += 1
+                self.events.append(("b", name, category, start_ns, self._next_id, threading.get_ident(), args))
+                self.events.append(("e", name, category, end_ns, self._next_id, threading.get_ident(), None))
+
+    def count(self, name, value=1):
+        now = time.perf_counter_ns()
+        with self.lock:
+            total = self.counters.get(name, 0) + value
+            self.counters[name] = total
+            if len(self.events) < self.max_events:
+                self.events.append(("C", name, "", now, total, threading.get_ident(), None))
+
+    def trace_events(self):
+        """
+        The events in the Chrome trace event format (timestamps in microseconds since enable()).
+        """
+        events = []
+        for phase, name, category, ts, value, tid, args in self.events:
+            event = {"name": name, "cat": category or "default", "ph": phase, "ts": (ts - self.origin) / 1000,
+                     "pid": self.pid, "tid": tid}
+            if phase == "X":
+                event["dur"] = value / 1000
+            elif phase == "C":
+                event["args"] = {name: value}
+            else:
+                event["id"] = value
+            if args:
+                event["args"] = args
+            events.append(event)
+        return events
+
+    def write_trace(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.trace_events(), "displayTimeUnit": "ms",
+                       "otherData": {"counters": self.counters, "dropped_events": self.dropped}}, f)
+
+    def summary(self):
+        """
+        One row per span name, slowest total first: calls, total seconds, mean and max milliseconds and
+        the share of the wall time since enable() (nested spans are counted in their parents too).
+        Counters follow as rows with only a count.
+        """
+        import pandas as pd
+        wall = max(time.perf_counter_ns() - self.origin, 1)
+        rows = {}
+        for name, (calls, total, longest) in self.totals.items():
+            rows[name] = {"count": calls, "total s": total / 1e9, "mean ms": total / calls / 1e6,
+                          "max ms": longest / 1e6, "% wall": 100 * total / wall}
+        table = pd.DataFrame.from_dict(rows, orient="index", columns=["count", "total s", "mean ms", "max ms", "% wall"])
+        table = table.sort_values("total s", ascending=False)
+        if self.counters:
+            counters = pd.DataFrame({"count": pd.Series(self.counters)})
+            table = pd.concat([table, counters])
+        return table
+
+
+def _current_task():
+    try:
+        return asyncio.current_task()
+    except RuntimeError:  # No running event loop in this thread
+        return None
+
+
+def enable(max_events=1_000_000):
+    """
+    Start recording into a fresh Recorder and return it.
+    """
+    global _enabled, _recorder
+    _recorder = Recorder(max_events)
+    _enabled = True
+    return _recorder
+
+
+def disable():
+    """
+    Stop recording; the data recorded so far stays available through recorder().
+    """
+    global _enabled
+    _enabled = False
+    return _recorder
+
+
+def is_enabled():
+    return _enabled
+
+
+def recorder():
+    return _recorder
+
+
+class _Span:
+    __slots__ = ("name", "category", "args", "start")
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        _recorder.add_span(self.name, self.start, time.perf_counter_ns(), self.category, self.args)
+
+
+def span(name, category="", **args):
+    """
+    Time a block: `with span("merge.hourly_table", rows=len(df)):`. Keyword args are attached to
+    the trace event.
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, category, args or None)
+
+
+def timed(name=None, category=""):
+    """
+    Decorator that times every call of a function or coroutine function under `name`
+    (default: its qualified name).
+    """
+    def decorate(fn):
+        label = name or fn.__qualname__
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not _enabled:
+                    return await fn(*args, **kwargs)
+                start = time.perf_counter_ns()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    _recorder.add_span(label, start, time.perf_counter_ns(), category)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _recorder.add_span(label, start, time.perf_counter_ns(), category)
+        return wrapper
+    return decorate
+
+
+def count(name, value=1):
+    """
+    Add `value` to a counter; its running total is also drawn as a counter track in the trace.
+    """
+    if _enabled:
+        _recorder.count(name, value)
+
+
+def timed_iter(iterable, name, category=""):
+    """
+    Yield from `iterable`, timing each step under `name`, e.g. the time a training loop waits for
+    the next batch of its DataLoader. Returns the iterable itself while disabled.
+    """
+    if not _enabled:
+        return iterable
+    return _timed_iter(iter(iterable), name, category)
+
+
+def _timed_iter(iterator, name, category):
+    while True:
+        start = time.perf_counter_ns()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        _recorder.add_span(name, start, time.perf_counter_ns(), category)
+        yield item
+
+
+def print_summary(table=None):
+    table = recorder().summary() if table is None else table
+    if table.empty:
+        print("No spans or counters recorded")
+        return
+    print(table.to_string(float_format=lambda v: f"{v:.3f}", na_rep=""))
+    if recorder().dropped:
+        print(f"{recorder().dropped} events beyond max_events were left out of the trace")
+
+
+def add_trace_arguments(parser):
+    """
+    The instrumentation options shared by the pipeline scripts.
+    """
+    parser.add_argument("--trace", help="Record timings and write a Chrome trace (JSON) here; "
+                                        "a summary table is printed at exit")
+    parser.add_argument("--trace-max-events", type=int, default=1_000_000,
+                        help="Events kept for the trace; the summary counts every span")
+
+
+def trace_from_args(args):
+    """
+    With --trace, start recording and write the trace and print the summary when the process exits.
+    """
+    if not getattr(args, "trace", None):
+        return None
+    rec = enable(args.trace_max_events)
+
+    def finish():
+        disable()
+        rec.write_trace(args.trace)
+        print_summary()
+        print(f"Trace of {len(rec.events)} events saved to {args.trace}")
+
+    atexit.register(finish)
+    return rec
@@ -0,0 +1,377 @@
+import argparse
+import asyncio
+import datetime
+import os
+import sys
+import time
+from collections import defaultdict
+
+import numpy as np
+
+if __name__ == "__main__":
+    # Run as a script: make the repository's packages importable
+    REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+
+from data_retrieval_and_cleaning.api_client import TAXI_AVAILABILITY_URL, WEATHER_BASE_URL, AsyncAPIClient
+from data_retrieval_and_cleaning.TaxiAvailabilityScript import parse_taxi_response
+from data_retrieval_and_cleaning.WeatherAPIs.get_weather_data import filter_station_data
+from data_retrieval_and_cleaning.alignment import DEFAULT_AGGREGATIONS
+from data_retrieval_and_cleaning.instrumentation import add_trace_arguments, trace_from_args
+from data_retrieval_and_cleaning.taxi_geometry import DEFAULT_REGIONS
+from data_retrieval_and_cleaning.weather_store import VARIABLE_COLUMNS
+from forecasting.datasets import FEATURE_COLUMNS
+
+SGT = datetime.timezone(datetime.timedelta(hours=8))
+EPOCH = datetime.datetime(1970, 1, 1)
+
+WEATHER_ENDPOINTS = {
+    "air_temperature": "/air-temperature",
+    "relative_humidity": "/relative-humidity",
+    "rainfall": "/rainfall",
+}
+
+
+def local_time(timestamp):
+    """
+    Parse an ISO timestamp into a naive Singapore-time datetime (naive inputs are taken as local).
+    """
+    parsed = datetime.datetime.fromisoformat(timestamp)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(SGT).replace(tzinfo=None)
+    return parsed
+
+
+def hour_slot(moment):
+    """
+    Index of the hourly slot a local datetime falls into: the slot closing at H+1:00 holds
+    [H:00, H+1:00), as alignment.align_to_hour(method="floor"). Slots count hours since 1970.
+    """
+    return int((moment - EPOCH).total_seconds() // 3600) + 1
+
+
+def slot_label(slot):
+    """
+    The repo's DateTime label of a slot: one second before the hour that closes it (HH:59:59).
+    """
+    return EPOCH + datetime.timedelta(hours=slot, seconds=-1)
+
+
+def is_peak_period(label):
+    """
+    Singapore taxi peak periods: weekdays 06:00-09:30 and every evening 18:00-24:00.
+    An hourly slot counts as peak when the hour it covers starts inside one of them.
+    """
+    hour = label.hour
+    return (label.weekday() < 5 and 6 <= hour <= 9) or hour >= 18
+
+
+class FeatureRingBuffer:
+    """
+    Fixed-size buffer of the last `capacity` hourly feature rows (FEATURE_COLUMNS order).
+
+    Every row is written twice, at position i and i + capacity of a (2 * capacity, features)
+    array, so the newest n <= capacity rows are always one contiguous slice: latest(n) is a
+    read-only view that can go straight into torch.from_numpy or a forecaster, with no copy.
+    Appending overwrites the oldest row only, so a view of fewer than `capacity` rows stays valid
+    until `capacity - n` more hours have arrived.
+    """
+
+    def __init__(self, capacity=24 * 7, columns=FEATURE_COLUMNS, dtype=np.float32):
+        self.capacity = capacity
+        self.columns = list(columns)
+        self._rows = np.zeros((2 * capacity, len(self.columns)), dtype=dtype)
+        self._slots = np.zeros(2 * capacity, dtype=np.int64)
+        self._imputed = np.zeros(2 * capacity, dtype=bool)
+        self.count = 0  # Rows ever appended
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    @property
+    def last_slot(self):
+        return int(self._slots[(self.count - 1) % self.capacity]) if self.count else None
+
+    def append(self, slot, row, imputed=False):
+        if self.count and slot <= self.last_slot:
+            raise ValueError(f"Slot {slot} is not after the last buffered slot {self.last_slot}")
+        i = self.count % self.capacity
+        for position in (i, i + self.capacity):
+            self._rows[position] = row
+            self._slots[position] = slot
+            self._imputed[position] = imputed
+        # Publish the row only once both copies are written
+        self.count += 1
+
+    def extend(self, slots, rows):
+        for slot, row in zip(slots, rows):
+            self.append(int(slot), row)
+
+    def _window(self, array, n):
+        n = len(self) if n is None else n
+        if n > len(self):
+            raise ValueError(f"Only {len(self)} hours buffered, {n} requested")
+        end = (self.count - 1) % self.capacity + 1 + (self.capacity if self.count > self.capacity else 0)
+        view = array[end - n:end]
+        view.flags.writeable = False
+        return view
+
+    def latest(self, n=None):
+        """
+        Read-only (n, features) view of the newest n rows, oldest first.
+        """
+        return self._window(self._rows, n)
+
+    def slots(self, n=None):
+        return self._window(self._slots, n)
+
+    def imputed(self, n=None):
+        """
+        Which of the newest n rows were carried forward because the hour had no data.
+        """
+        return self._window(self._imputed, n)
+
+    def labels(self, n=None):
+        return [slot_label(int(slot)) for slot in self.slots(n)]
+
+
+class HourAccumulator:
+    """
+    Readings of the hourly slots that are still open: taxi polls are averaged and weather readings
+    are combined like alignment.hourly_table (temperature and humidity averaged, rainfall summed),
+    each reading counted once however often it is polled.
+    """
+
+    def __init__(self):
+        self.taxi = defaultdict(list)  # slot -> [(islandwide count, box count)]
+        self.weather = defaultdict(dict)  # slot -> {(column, timestamp): value}
+
+    def add_taxi(self, slot, islandwide, box):
+        self.taxi[slot].append((islandwide, box))
+
+    def add_weather(self, slot, column, timestamp, value):
+        self.weather[slot][(column, timestamp)] = value
+
+    def pop(self, slot):
+        """
+        Return ({feature: value} measured in the slot, or {} if nothing arrived) and forget it.
+        """
+        values = {}
+        polls = self.taxi.pop(slot, [])
+        if polls:
+            counts = np.asarray(polls, dtype=np.float64)
+            values["Taxi Available throughout SG"] = counts[:, 0].mean()
+            values["Average Taxi Availability"] = counts[:, 1].mean()
+        readings = defaultdict(list)
+        for (column, _), value in self.weather.pop(slot, {}).items():
+            if value is not None:
+                readings[column].append(float(value))
+        for column, column_values in readings.items():
+            how = DEFAULT_AGGREGATIONS.get(column, "mean")
+            values[column] = float(np.sum(column_values) if how == "sum" else np.mean(column_values))
+        return values
+
+    def open_slots(self):
+        return sorted(set(self.taxi) | set(self.weather))
+
+
+class LiveIngestDaemon:
+    """
+    Polls the latest taxi-availability snapshot and weather readings, filters them to one
+    region and station, and appends one feature row per closed hourly slot to a FeatureRingBuffer.
+
+    A slot closes `grace` seconds after its hour ends, leaving time for late weather readings.
+    Hours without any data (an outage, a restart) are carried forward from the previous row with
+    their own calendar features and marked as imputed, so the buffer never has holes. `clock`,
+    the URLs and the intervals are parameters so the daemon can run against a local fake server.
+    region is a (name, BoundingBox or polygon) pair; the default is the original S107 box.
+    """
+
+    def __init__(self, client, buffer, station_id="S107", region=None, taxi_url=TAXI_AVAILABILITY_URL,
+                 weather_base_url=WEATHER_BASE_URL, taxi_interval=60.0, weather_interval=300.0, grace=120.0,
+                 clock=time.time, on_hour=None):
+        self.client = client
+        self.buffer = buffer
+        self.station_id = station_id
+        self.region_name, region = region or next(iter(DEFAULT_REGIONS.items()))
+        self.regions = {self.region_name: region}
+        self.taxi_url = taxi_url
+        self.weather_base_url = weather_base_url
+        self.taxi_interval = taxi_interval
+        self.weather_interval = weather_interval
+        self.grace = grace
+        self.clock = clock
+        self.on_hour = on_hour or []
+        self.accumulator = HourAccumulator()
+        self.last_values = {}
+        self.stats = defaultdict(int)
+
+    def now(self):
+        return datetime.datetime.fromtimestamp(self.clock(), SGT).replace(tzinfo=None)
+
+    async def poll_taxi(self):
+        data = await self.client.get_json(self.taxi_url, use_cache=False)
+        parsed = parse_taxi_response(data, self.regions) if data is not None else None
+        if parsed is None:
+            self.stats["taxi_failures"] += 1
+            return False
+        islandwide, region_counts, _ = parsed
+        timestamp = data["features"][0].get("properties", {}).get("timestamp")
+        moment = local_time(timestamp) if timestamp else self.now()
+        self.accumulator.add_taxi(hour_slot(moment), islandwide, region_counts[self.region_name])
+        self.stats["taxi_polls"] += 1
+        return True
+
+    async def poll_weather(self):
+        async def poll(data_type, endpoint):
+            data = await self.client.get_json(self.weather_base_url + endpoint, use_cache=False)
+            if data is None:
+                self.stats["weather_failures"] += 1
+                return
+            for reading in filter_station_data(data, self.station_id):
+                self.accumulator.add_weather(hour_slot(local_time(reading["timestamp"])), VARIABLE_COLUMNS[data_type],
+                                             reading["timestamp"], reading["value"])
+            self.stats["weather_polls"] += 1
+        await asyncio.gather(*(poll(data_type, endpoint) for data_type, endpoint in WEATHER_ENDPOINTS.items()))
+
+    def _row(self, slot, values):
+        label = slot_label(slot)
+        merged = {**self.last_values, **values}
+        merged["peak_period"] = float(is_peak_period(label))
+        merged["IsWeekend"] = float(label.weekday() >= 5)
+        merged["Hour"] = float(label.hour + 1)
+        self.last_values = {k: v for k, v in merged.items() if k not in ("peak_period", "IsWeekend", "Hour")}
+        return np.asarray([merged.get(column, np.nan) for column in self.buffer.columns], dtype=self.buffer._rows.dtype)
+
+    def close_slots(self):
+        """
+        Append every slot whose hour (plus grace) has ended. Returns the number of rows added.
+        """
+        now = self.now() - datetime.timedelta(seconds=self.grace)
+        closable = hour_slot(now) - 1  # The slot `now` falls into is still open
+        open_slots = [slot for slot in self.accumulator.open_slots() if slot <= closable]
+        last = self.buffer.last_slot
+        if last is None:
+            if not open_slots:
+                return 0
+            first = open_slots[0]
+        else:
+            first = last + 1
+            # Readings of slots that were already closed arrived too late
+            for slot in self.accumulator.open_slots():
+                if slot <= last:
+                    self.accumulator.pop(slot)
+                    self.stats["late_slots"] += 1
+        # After a long outage only the hours that still fit in the buffer are worth filling
+        first = max(first, closable - self.buffer.capacity + 1)
+        added = 0
+        for slot in range(first, closable + 1):
+            values = self.accumulator.pop(slot)
+            missing = [c for c in ("Taxi Available throughout SG", "Average Taxi Availability", *VARIABLE_COLUMNS.values())
+                       if c not in values]
+            self.buffer.append(slot, self._row(slot, values), imputed=bool(missing))
+            self.stats["imputed_hours" if missing else "complete_hours"] += 1
+            added += 1
+            for callback in self.on_hour:
+                callback(self.buffer, slot)
+        return added
+
+    async def _every(self, interval, poll, stop):
+        while not stop.is_set():
+            await poll()
+            self.close_slots()
+            try:
+                await asyncio.wait_for(stop.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self, stop=None):
+        """
+        Poll until `stop` (an asyncio.Event) is set.
+        """
+        stop = stop or asyncio.Event()
+        await asyncio.gather(self._every(self.taxi_interval, self.poll_taxi, stop),
+                             self._every(self.weather_interval, self.poll_weather, stop))
+
+
+def load_seed(path, buffer):
+    """
+    Fill the buffer with the newest rows of a merged feature CSV (DateTime + FEATURE_COLUMNS,
+    e.g. merged_file_with_mean.csv), so forecasts can start before 24 live hours have arrived.
+    """
+    import pandas as pd
+    df = pd.read_csv(path, parse_dates=["DateTime"])
+    if "IsWeekend" not in df:
+        df["IsWeekend"] = (df["DateTime"].dt.weekday >= 5).astype(int)
+    if "Hour" not in df:
+        df["Hour"] = df["DateTime"].dt.hour + 1
+    df = df.sort_values("DateTime").drop_duplicates("DateTime").tail(buffer.capacity)
+    slots = [hour_slot(moment.to_pydatetime()) for moment in df["DateTime"]]
+    buffer.extend(slots, df[buffer.columns].to_numpy(dtype=np.float32))
+    return len(df)
+
+
+def forecast_printer(forecasters, seq_length=24):
+    """
+    on_hour callback: forecast the next hours from the newest window, read in place from the buffer.
+    """
+    def on_hour(buffer, slot):
+        if len(buffer) < seq_length:
+            print(f"{slot_label(slot)}: {len(buffer)}/{seq_length} hours buffered")
+            return
+        window = buffer.latest(seq_length)[None]
+        day_of_week = np.asarray([slot_label(slot).weekday()])
+        for name, forecaster in forecasters.items():
+            forecast = np.asarray(forecaster.predict(window, day_of_week))[0]
+            print(f"{slot_label(slot)} {name}: " + ", ".join(f"t+{i + 1} {v:.1f}" for i, v in enumerate(forecast)))
+    return on_hour
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Poll taxi availability and weather continuously into an in-memory "
+                                                 "ring buffer of hourly model features.")
+    parser.add_argument("--hours", type=int, default=24 * 7, help="Ring buffer capacity")
+    parser.add_argument("--station", default="S107")
+    parser.add_argument("--taxi-interval", type=float, default=60.0, help="Seconds between taxi polls")
+    parser.add_argument("--weather-interval", type=float, default=300.0, help="Seconds between weather polls")
+    parser.add_argument("--grace", type=float, default=120.0, help="Seconds to wait for late readings before closing an hour")
+    parser.add_argument("--seed", help="Merged feature CSV whose newest rows pre-fill the buffer")
+    parser.add_argument("--models", nargs="*", default=[], help="Forecast every closed hour with these models")
+    parser.add_argument("--model-dir", default="./final_models")
+    parser.add_argument("--taxi-url", default=TAXI_AVAILABILITY_URL)
+    parser.add_argument("--weather-url", default=WEATHER_BASE_URL)
+    add_trace_arguments(parser)
+    return parser.parse_args(argv)
+
+
+async def run(args):
+    buffer = FeatureRingBuffer(args.hours)
+    if args.seed:
+        print(f"{load_seed(args.seed, buffer)} hours loaded from {args.seed}")
+    callbacks = []
+    if args.models:
+        from forecasting.service import load_forecasters
+        callbacks.append(forecast_printer(load_forecasters(args.model_dir, names=args.models)))
+    async with AsyncAPIClient() as client:
+        daemon = LiveIngestDaemon(client, buffer, args.station, taxi_url=args.taxi_url,
+                                  weather_base_url=args.weather_url, taxi_interval=args.taxi_interval,
+                                  weather_interval=args.weather_interval, grace=args.grace, on_hour=callbacks)
+        try:
+            await daemon.run()
+        finally:
+            print(dict(daemon.stats))
+            client.print_report()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    trace_from_args(args)
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import datetime
+
+HOURLY_FORMAT = "%Y-%m-%dT%H:%M:%S"
+DAILY_FORMAT = "%Y-%m-%d"
+
+
+def plan_requests(since, until, granularity="day"):
+    """
+    Return the `date` parameters that cover [since, until] with as few requests as possible.
+
+    The v2 real-time weather API returns every reading of a day (paginated) when given a bare
+    date, so "day" needs one request chain per calendar day. "hour" reproduces the old
+    one-request-per-hour plan at HH:59:59, latest first.
+    """
+    if granularity == "day":
+        day = until.date()
+        dates = []
+        while day >= since.date():
+            dates.append(day.strftime(DAILY_FORMAT))
+            day -= datetime.timedelta(days=1)
+        return dates
+    if granularity == "hour":
+        time_point = until.replace(minute=59, second=59, microsecond=0)
+        first = since.replace(minute=59, second=59, microsecond=0)
+        dates = []
+        while time_point >= first:
+            dates.append(time_point.strftime(HOURLY_FORMAT))
+            time_point -= datetime.timedelta(hours=1)
+        return dates
+    raise ValueError(f"Unknown granularity {granularity!r}; expected 'day' or 'hour'")
+
+
+async def fetch_all_pages(client, endpoint, params, max_pages=500):
+    """
+    Fetch a request and every follow-up page via data.paginationToken.
+    Returns the list of page payloads, or None if any page failed.
+    """
+    pages = []
+    token = None
+    while len(pages) < max_pages:
+        query = dict(params)
+        if token:
+            query["paginationToken"] = token
+        data = await client.get_json(endpoint, query)
+        if data is None:
+            return None
+        pages.append(data)
+        token = (data.get("data") or {}).get("paginationToken")
+        if not token:
+            break
+    return pages
+
+
+def dedupe_readings(records):
+    """
+    Drop repeated readings, keyed by (stationId, timestamp); the first occurrence wins.
+    """
+    seen = set()
+    unique = []
+    for record in records:
+        key = (record["stationId"], record["timestamp"])
+        if key not in seen:
+            seen.add(key)
+            unique.append(record)
+    return unique
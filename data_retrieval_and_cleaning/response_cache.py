@@ -0,0 +1,235 @@
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+
+DEFAULT_CACHE_DIR = "api_cache"
+DEFAULT_MAX_BYTES = 5 * 1024 ** 3
+
+try:
+    import zstandard
+except ImportError:  # gzip is always available; zstd is only faster and smaller
+    zstandard = None
+
+# What reading a lost, truncated or corrupted blob raises
+_DAMAGED_BLOB_ERRORS = (OSError, EOFError, gzip.BadGzipFile, zlib.error)
+if zstandard is not None:
+    _DAMAGED_BLOB_ERRORS += (zstandard.ZstdError,)
+
+
+def _compress(body, codec):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(body)
+    return gzip.compress(body, compresslevel=6)
+
+
+def _decompress(blob, codec):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("This cache entry is zstd-compressed; install the zstandard package to read it")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return gzip.decompress(blob)
+
+
+def request_key(url, params=None):
+    """
+    Content address of a request: SHA-256 of the URL and its parameters in canonical (sorted) order,
+    so the same request always maps to the same entry whatever order the params were built in.
+    """
+    canonical = json.dumps([url, sorted((str(k), str(v)) for k, v in (params or {}).items())], separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk cache of raw API response bodies, keyed by (URL, params).
+
+    Each body is compressed (zstd when the zstandard package is installed, gzip otherwise) into
+    <directory>/objects/<key[:2]>/<key>; a SQLite index next to it tracks sizes and last access
+    times. Once the compressed total exceeds max_bytes the least recently used entries are
+    deleted. max_bytes=None never evicts.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, codec=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.codec = codec or ("zstd" if zstandard is not None else "gzip")
+        if self.codec == "zstd" and zstandard is None:
+            raise RuntimeError("codec='zstd' needs the zstandard package")
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(directory, "index.sqlite"))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                params TEXT NOT NULL,
+                codec TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                raw_size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (accessed_at)")
+        self.conn.commit()
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+
+    def flush(self):
+        """
+        Commit pending access-time updates.
+        """
+        self.conn.commit()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _path(self, key):
+        return os.path.join(self.directory, "objects", key[:2], key)
+
+    def get(self, url, params=None):
+        """
+        Return the cached raw body (bytes) of a request, or None on a miss.
+        """
+        key = request_key(url, params)
+        row = self.conn.execute("SELECT codec FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                body = _decompress(f.read(), row[0])
+        except _DAMAGED_BLOB_ERRORS:
+            # Blob lost, truncated (e.g. killed mid-write) or corrupted: drop the entry and fetch again
+            self._delete(key)
+            self.conn.commit()
+            self.misses += 1
+            return None
+        # Access times are committed with the next put or flush, not one transaction per hit
+        self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        self.hits += 1
+        return body
+
+    def get_json(self, url, params=None):
+        body = self.get(url, params)
+        return None if body is None else json.loads(body)
+
+    def put(self, url, params, body):
+        """
+        Store a raw response body (bytes) and evict least recently used entries if over budget.
+        """
+        key = request_key(url, params)
+        blob = _compress(body, self.codec)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename, so a reader never sees half a blob
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(blob)
+        os.replace(tmp_path, path)
+        previous = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, url, json.dumps(params or {}, sort_keys=True), self.codec, len(blob), len(body), now, now),
+        )
+        self.total_bytes += len(blob) - (previous[0] if previous else 0)
+        self.evict()
+        self.conn.commit()
+
+    def discard(self, url, params=None):
+        """
+        Forget one request, e.g. a response known to be incomplete, so the next get misses.
+        """
+        self._delete(request_key(url, params))
+        self.conn.commit()
+
+    def discard_matching(self, url, params):
+        """
+        Forget every request to url whose parameters include params, whatever its other parameters,
+        e.g. all pages (paginationToken) of one day. Returns the number of entries removed.
+        """
+        wanted = {str(k): str(v) for k, v in params.items()}
+        removed = 0
+        for key, stored in self.conn.execute("SELECT key, params FROM responses WHERE url = ?", (url,)).fetchall():
+            stored = {str(k): str(v) for k, v in json.loads(stored).items()}
+            if all(stored.get(k) == v for k, v in wanted.items()):
+                self._delete(key)
+                removed += 1
+        self.conn.commit()
+        return removed
+
+    def _delete(self, key):
+        row = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return
+        self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+        self.total_bytes -= row[0]
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def evict(self, max_bytes=None):
+        """
+        Delete least recently used entries until the cache fits max_bytes (default: the
+        configured budget). Returns the number of entries removed.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        if max_bytes is None or self.total_bytes <= max_bytes:
+            return 0
+        removed = 0
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            if self.total_bytes <= max_bytes:
+                break
+            self._delete(key)
+            removed += 1
+        return removed
+
+    def stats(self):
+        entries, size, raw_size = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(raw_size), 0) FROM responses").fetchone()
+        return {"entries": entries, "bytes": size, "raw_bytes": raw_size, "max_bytes": self.max_bytes,
+                "codec": self.codec, "hits": self.hits, "misses": self.misses}
+
+    def print_report(self):
+        stats = self.stats()
+        ratio = stats["raw_bytes"] / stats["bytes"] if stats["bytes"] else 0.0
+        print(f"Response cache {self.directory}: {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['entries']} entries, {stats['bytes'] / 1024 ** 2:.1f} MiB on disk "
+              f"({ratio:.1f}x {stats['codec']})")
+
+
+def add_cache_arguments(parser):
+    """
+    The response-cache options shared by the fetch scripts.
+    """
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="On-disk cache of raw API responses")
+    parser.add_argument("--cache-size-gb", type=float, default=DEFAULT_MAX_BYTES / 1024 ** 3,
+                        help="Evict least recently used responses beyond this size")
+    parser.add_argument("--no-cache", action="store_true", help="Neither read nor write the response cache")
+    parser.add_argument("--offline", action="store_true",
+                        help="Serve every request from the cache; uncached requests fail instead of hitting the API")
+
+
+def cache_from_args(args):
+    if args.no_cache:
+        if args.offline:
+            raise SystemExit("--offline needs the response cache; drop --no-cache")
+        return None
+    return ResponseCache(args.cache_dir, int(args.cache_size_gb * 1024 ** 3))
@@ -0,0 +1,146 @@
+import csv
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+
+# Bounds are in degrees; GeoJSON points are [longitude, latitude]
+BoundingBox = namedtuple("BoundingBox", ["north", "south", "east", "west"])
+
+# The box used for the original single-area dataset (Bedok / East Coast, next to station S107)
+DEFAULT_REGIONS = {
+    "Selected Box Area": BoundingBox(north=1.35106, south=1.32206, east=103.97839, west=103.92805),
+}
+
+
+def load_regions(path):
+    """
+    Load named regions from a JSON file. Each entry is either a bounding box
+    {"north": .., "south": .., "east": .., "west": ..} or a polygon {"polygon": [[lon, lat], ...]}.
+    """
+    with open(path) as f:
+        config = json.load(f)
+    regions = {}
+    for name, spec in config.items():
+        if "polygon" in spec:
+            regions[name] = np.asarray(spec["polygon"], dtype=np.float32)
+        else:
+            regions[name] = BoundingBox(spec["north"], spec["south"], spec["east"], spec["west"])
+    return regions
+
+
+def parse_coordinates(geometry):
+    """
+    Convert a GeoJSON MultiPoint geometry into an (n, 2) float32 array of [lon, lat].
+    """
+    coordinates = geometry.get("coordinates", [])
+    if not coordinates:
+        return np.empty((0, 2), dtype=np.float32)
+    return np.asarray(coordinates, dtype=np.float32).reshape(-1, 2)
+
+
+def _points_in_polygon(points, polygon):
+    """
+    Even-odd ray casting, looping over polygon edges and vectorised over points.
+    """
+    lon, lat = points[:, 0], points[:, 1]
+    inside = np.zeros(len(points), dtype=bool)
+    x1, y1 = polygon[-1]
+    for x2, y2 in polygon:
+        crosses = (y1 > lat) != (y2 > lat)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_at_lat = (x2 - x1) * (lat - y1) / (y2 - y1) + x1
+        inside ^= crosses & (lon < x_at_lat)
+        x1, y1 = x2, y2
+    return inside
+
+
+def region_masks(points, regions=DEFAULT_REGIONS):
+    """
+    Return {region name: boolean mask over points}. All bounding boxes are tested
+    in a single broadcast comparison; polygons are tested one after another.
+    """
+    masks = {}
+    box_names = [name for name, region in regions.items() if isinstance(region, BoundingBox)]
+    if box_names:
+        bounds = np.asarray([regions[name] for name in box_names], dtype=np.float32)  # (k, 4)
+        lon = points[:, 0:1]
+        lat = points[:, 1:2]
+        inside = (
+            (lon >= bounds[:, 3]) & (lon <= bounds[:, 2])
+            & (lat >= bounds[:, 1]) & (lat <= bounds[:, 0])
+        )  # (n, k)
+        for i, name in enumerate(box_names):
+            masks[name] = inside[:, i]
+    for name, region in regions.items():
+        if not isinstance(region, BoundingBox):
+            masks[name] = _points_in_polygon(points, region)
+    return masks
+
+
+def count_in_regions(points, regions=DEFAULT_REGIONS):
+    """
+    Return {region name: number of points inside the region}.
+    """
+    return {name: int(mask.sum()) for name, mask in region_masks(points, regions).items()}
+
+
+class CoordinateStore:
+    """
+    Append-only binary store of raw taxi positions, one variable-length block per snapshot.
+
+    points.f32 holds every [lon, lat] pair back to back as float32, and index.csv maps each
+    snapshot timestamp to its (start, count) rows, so the points can be memory-mapped and
+    sliced without parsing any text.
+    """
+
+    def __init__(self, directory="taxi_points"):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.points_path = os.path.join(directory, "points.f32")
+        self.index_path = os.path.join(directory, "index.csv")
+        if not os.path.exists(self.index_path):
+            with open(self.index_path, "w", newline="") as f:
+                csv.writer(f).writerow(["DateTime", "start", "count"])
+        # An interrupted append can leave points past the last indexed block, down to part of a
+        # point; drop them so the next block starts on a whole point where the index expects it
+        end = max((start + count for start, count in self.index().values()), default=0) * 2 * 4
+        if os.path.exists(self.points_path) and os.path.getsize(self.points_path) > end:
+            os.truncate(self.points_path, end)
+
+    def append(self, timestamp, points):
+        """
+        Append one snapshot. Points are flushed before the index row so a crash never
+        leaves an index entry pointing at missing data.
+        """
+        points = np.ascontiguousarray(points, dtype=np.float32).reshape(-1, 2)
+        with open(self.points_path, "ab") as f:
+            start = f.tell() // (2 * 4)
+            f.write(points.tobytes())
+        with open(self.index_path, "a", newline="") as f:
+            csv.writer(f).writerow([timestamp, start, len(points)])
+
+    def index(self):
+        """
+        Return {timestamp: (start, count)}; later entries win if a timestamp was re-fetched.
+        """
+        with open(self.index_path, newline="") as f:
+            reader = csv.reader(f)
+            next(reader)
+            return {row[0]: (int(row[1]), int(row[2])) for row in reader}
+
+    def points(self):
+        """
+        Memory-map every stored point as an (n, 2) float32 array.
+        """
+        if not os.path.exists(self.points_path) or os.path.getsize(self.points_path) == 0:
+            return np.empty((0, 2), dtype=np.float32)
+        return np.memmap(self.points_path, dtype=np.float32, mode="r").reshape(-1, 2)
+
+    def snapshot(self, timestamp):
+        """
+        Return the (count, 2) view of the points recorded for one timestamp.
+        """
+        start, count = self.index()[timestamp]
+        return self.points()[start:start + count]
@@ -0,0 +1,120 @@
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_retrieval_and_cleaning.alignment import hourly_table, to_local_time
+from data_retrieval_and_cleaning.taxi_geometry import BoundingBox
+
+# Endpoint result key -> column name used throughout the merged datasets
+VARIABLE_COLUMNS = {
+    "air_temperature": "temp_value",
+    "relative_humidity": "humidity_value",
+    "rainfall": "rainfall_value",
+}
+
+
+def update_station_registry(registry, api_data):
+    """
+    Record station metadata ({id: {"name", "latitude", "longitude"}}) carried in a v2 weather response.
+    """
+    for station in (api_data.get("data") or {}).get("stations", []):
+        location = station.get("location", {})
+        registry[station.get("id")] = {
+            "name": station.get("name"),
+            "latitude": location.get("latitude"),
+            "longitude": location.get("longitude"),
+        }
+    return registry
+
+
+def to_long_frame(results):
+    """
+    Turn {endpoint key: [reading dicts]} into one long table
+    (timestamp, stationId, variable, value) with naive SGT timestamps and float32 values.
+    """
+    frames = []
+    for data_type, readings in results.items():
+        if not readings:
+            continue
+        df = pd.DataFrame(readings, columns=["timestamp", "stationId", "value"])
+        frames.append(pd.DataFrame({
+            "timestamp": to_local_time(df["timestamp"]).to_numpy(),
+            "stationId": df["stationId"].astype(str),
+            "variable": VARIABLE_COLUMNS.get(data_type, data_type),
+            "value": pd.to_numeric(df["value"], errors="coerce").astype("float32"),
+        }))
+    if not frames:
+        return pd.DataFrame(columns=["timestamp", "stationId", "variable", "value"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def write_long_format(long_df, directory="weather_readings"):
+    """
+    Write the long table as a Parquet dataset partitioned by stationId
+    (directory/stationId=S107/...), so one station can be read without touching the others.
+    """
+    # Re-running a backfill replaces the partitions it writes instead of appending duplicates
+    long_df.to_parquet(directory, partition_cols=["stationId"], index=False,
+                       existing_data_behavior="delete_matching")
+
+
+# Leading underscore: pyarrow skips it when the whole dataset directory is read
+STATIONS_FILE = "_stations.csv"
+
+
+def write_station_metadata(registry, path=os.path.join("weather_readings", STATIONS_FILE)):
+    df = pd.DataFrame.from_dict(registry, orient="index")
+    df.index.name = "stationId"
+    df.to_csv(path)
+
+
+def read_station_metadata(path=os.path.join("weather_readings", STATIONS_FILE)):
+    return pd.read_csv(path, index_col="stationId")
+
+
+def read_station_weather(directory, station_id, method="floor", tolerance=None):
+    """
+    Read one station's partition and align it to a wide hourly table
+    (DateTime, temp_value, humidity_value, rainfall_value) on the HH:59:59 grid.
+    """
+    long_df = pd.read_parquet(os.path.join(directory, f"stationId={station_id}"))
+    long_df["stationId"] = station_id
+    wide = hourly_table(long_df, method=method, tolerance=tolerance)
+    return wide.drop(columns="stationId")
+
+
+def _region_centre(region):
+    if isinstance(region, BoundingBox):
+        return (region.north + region.south) / 2, (region.east + region.west) / 2
+    polygon = np.asarray(region, dtype=np.float64)
+    return polygon[:, 1].mean(), polygon[:, 0].mean()
+
+
+def nearest_stations(regions, stations):
+    """
+    Map each taxi region to the weather station closest to its centre.
+    `stations` is the DataFrame returned by read_station_metadata (or a subset of it).
+    """
+    lat = np.radians(stations["latitude"].to_numpy(dtype=np.float64))
+    lon = np.radians(stations["longitude"].to_numpy(dtype=np.float64))
+    mapping = {}
+    for name, region in regions.items():
+        centre_lat, centre_lon = (math.radians(v) for v in _region_centre(region))
+        # Equirectangular distance is plenty accurate at Singapore's scale
+        x = (lon - centre_lon) * math.cos(centre_lat)
+        y = lat - centre_lat
+        mapping[name] = stations.index[int(np.argmin(x * x + y * y))]
+    return mapping
+
+
+def weather_for_regions(directory, region_stations):
+    """
+    Return {region: wide hourly weather table of its assigned station}, reading each
+    station partition once even if several regions share it.
+    """
+    cache = {}
+    for station_id in set(region_stations.values()):
+        cache[station_id] = read_station_weather(directory, station_id)
+    return {region: cache[station_id] for region, station_id in region_stations.items()}
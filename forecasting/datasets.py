@@ -0,0 +1,222 @@
+import math
+import warnings
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+
+from data_retrieval_and_cleaning.instrumentation import timed
+
+# Column order of the model features (see the notebooks); the forecast target is column 5
+FEATURE_COLUMNS = [
+    "Taxi Available throughout SG",
+    "temp_value",
+    "humidity_value",
+    "rainfall_value",
+    "peak_period",
+    "Average Taxi Availability",
+    "IsWeekend",
+    "Hour",
+]
+TARGET_COLUMN = FEATURE_COLUMNS.index("Average Taxi Availability")
+
+
+def as_feature_tensor(features):
+    """
+    Wrap a (rows, features) array as a float32 torch tensor without copying when possible.
+    Accepts numpy arrays (including np.memmap), DataFrames and tensors; other dtypes are
+    converted to float32 once.
+    """
+    if isinstance(features, torch.Tensor):
+        return features.to(torch.float32).contiguous()
+    if hasattr(features, "to_numpy"):
+        features = features.to_numpy()
+    array = np.asarray(features)
+    if array.dtype != np.float32 or not array.flags.c_contiguous:
+        array = np.ascontiguousarray(array, dtype=np.float32)
+    with warnings.catch_warnings():
+        # Read-only memmaps are fine: windows are only ever read
+        warnings.simplefilter("ignore", UserWarning)
+        return torch.from_numpy(array)
+
+
+@timed("dataset.open_feature_array", "dataset")
+def open_feature_array(path, columns=None):
+    """
+    Open a feature array for windowing.
+    .npy files are memory-mapped read-only; .arrow/.parquet feature tables
+    (data_retrieval_and_cleaning/feature_table.py) are read into one contiguous float32 matrix.
+    """
+    if path.endswith(".npy"):
+        return np.load(path, mmap_mode="r")
+    from data_retrieval_and_cleaning.feature_table import load_feature_matrix
+    _, matrix, _ = load_feature_matrix(path, columns)
+    return matrix
+
+
+@timed("dataset.stack_series", "dataset")
+def stack_series(arrays, path=None, rows=None):
+    """
+    Stack per-series (rows, features) arrays, oldest row first, into one (series, rows, features)
+    float32 array. Every series keeps its last `rows` rows (default: as many as the shortest has),
+    so they all end at the same hour. With a .npy `path` the stack is written straight into a
+    memory-mapped file one series at a time and returned as that np.memmap.
+    """
+    rows = rows or min(len(a) for a in arrays)
+    if any(len(a) < rows for a in arrays):
+        raise ValueError(f"Every series needs at least {rows} rows")
+    shape = (len(arrays), rows, np.shape(arrays[0])[1])
+    if path is None:
+        stack = np.empty(shape, dtype=np.float32)
+    else:
+        stack = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=shape)
+    for i, array in enumerate(arrays):
+        stack[i] = array[len(array) - rows:]
+    return stack
+
+
+class SlidingWindowDataset(Dataset):
+    """
+    (input window, forecast target) pairs over one contiguous feature array.
+
+    Window i reads rows [s, s + seq_length) as input and the target column of rows
+    [s + seq_length, s + seq_length + pred_horizon) as target, with s = start + i * stride.
+    Both are exposed as `unfold` views of the same storage, so no window is materialised;
+    stride=1 costs no more memory than stride=seq_length.
+    """
+
+    @timed("dataset.SlidingWindowDataset", "dataset")
+    def __init__(self, features, seq_length=24, pred_horizon=3, stride=1,
+                 target_column=TARGET_COLUMN, start=0, stop=None):
+        self.data = as_feature_tensor(features)
+        self.seq_length = seq_length
+        self.pred_horizon = pred_horizon
+        self.stride = stride
+        self.target_column = target_column
+        self.start = start
+        self.stop = len(self.data) if stop is None else min(stop, len(self.data))
+
+        span = self.stop - self.start - seq_length - pred_horizon
+        self.num_windows = span // stride + 1 if span >= 0 else 0
+        if self.num_windows == 0:
+            self.inputs = self.data.new_empty((0, seq_length, self.data.shape[1]))
+            self.targets = self.data.new_empty((0, pred_horizon, 1))
+            return
+        rows = self.data[self.start:self.stop]
+        # (windows, features, seq_length) -> (windows, seq_length, features); still a view
+        self.inputs = rows.unfold(0, seq_length, stride).transpose(1, 2)[:self.num_windows]
+        # (windows, pred_horizon, 1), matching the shape create_sequences produced
+        self.targets = rows[seq_length:, target_column].unfold(0, pred_horizon, stride)[:self.num_windows].unsqueeze(-1)
+
+    def __len__(self):
+        return self.num_windows
+
+    def __getitem__(self, index):
+        return self.inputs[index], self.targets[index]
+
+    def window_start(self, index):
+        """
+        First row of window `index` in the underlying feature array.
+        """
+        return self.start + index * self.stride
+
+    def subset(self, first, last):
+        """
+        Return a dataset over windows [first, last) that shares this dataset's storage.
+        """
+        last = min(last, self.num_windows)
+        if last <= first:
+            return SlidingWindowDataset(self.data, self.seq_length, self.pred_horizon, self.stride,
+                                        self.target_column, self.start, self.start)
+        stop = self.window_start(last - 1) + self.seq_length + self.pred_horizon
+        return SlidingWindowDataset(self.data, self.seq_length, self.pred_horizon, self.stride,
+                                    self.target_column, self.window_start(first), stop)
+
+
+def chronological_split(dataset, fractions=(0.8, 0.1, 0.1)):
+    """
+    Split a SlidingWindowDataset (or a MultiSeriesWindowDataset, by time across all of its series)
+    into consecutive train/val/test datasets, sized like the notebooks (int(0.8 * n), int(0.1 * n),
+    remainder) with n the number of windows per series.
+
+    With overlapping windows (stride < pred_horizon) the first windows of each later split
+    would forecast rows already used as targets in the previous split, so those are skipped.
+    """
+    n = dataset.num_windows
+    sizes = [int(f * n) for f in fractions[:-1]]
+    sizes.append(n - sum(sizes))
+    gap = max(0, math.ceil(dataset.pred_horizon / dataset.stride) - 1)
+    splits = []
+    first = 0
+    for i, size in enumerate(sizes):
+        skip = gap if i > 0 else 0
+        splits.append(dataset.subset(first + skip, first + size))
+        first += size
+    return splits
+
+
+class MultiSeriesWindowDataset(Dataset):
+    """
+    Windows of many aligned series (e.g. one per region) over one (series, rows, features) array,
+    typically a read-only np.memmap from stack_series that every DataLoader worker shares.
+
+    Index i is window i // num_series of series i % num_series, so the series are interleaved
+    along the index and every batch, shuffled or not, mixes them. A batch of indices is gathered
+    with one indexing operation into inputs (batch, seq_length, features + 1), whose extra last
+    channel holds the series index read by models.GlobalForecaster, and targets (batch, pred_horizon, 1).
+    `inputs` and `targets` are the per-series unfold views (series, windows, ...).
+    """
+
+    @timed("dataset.MultiSeriesWindowDataset", "dataset")
+    def __init__(self, series, seq_length=24, pred_horizon=3, stride=1,
+                 target_column=TARGET_COLUMN, start=0, stop=None):
+        self.data = as_feature_tensor(series)
+        if self.data.dim() != 3:
+            raise ValueError(f"Expected a (series, rows, features) array, got shape {tuple(self.data.shape)}")
+        self.num_series = self.data.shape[0]
+        self.seq_length = seq_length
+        self.pred_horizon = pred_horizon
+        self.stride = stride
+        self.target_column = target_column
+        self.start = start
+        self.stop = self.data.shape[1] if stop is None else min(stop, self.data.shape[1])
+
+        span = self.stop - self.start - seq_length - pred_horizon
+        self.num_windows = span // stride + 1 if span >= 0 else 0
+        if self.num_windows == 0:
+            self.inputs = self.data.new_empty((self.num_series, 0, seq_length, self.data.shape[2]))
+            self.targets = self.data.new_empty((self.num_series, 0, pred_horizon, 1))
+            return
+        rows = self.data[:, self.start:self.stop]
+        self.inputs = rows.unfold(1, seq_length, stride).transpose(2, 3)[:, :self.num_windows]
+        self.targets = rows[:, seq_length:, target_column].unfold(1, pred_horizon, stride)[:, :self.num_windows].unsqueeze(-1)
+
+    def __len__(self):
+        return self.num_series * self.num_windows
+
+    def __getitem__(self, index):
+        index = torch.as_tensor(index)
+        window, series = index // self.num_series, index % self.num_series
+        windows = self.inputs[series, window]
+        inputs = windows.new_empty(windows.shape[:-1] + (windows.shape[-1] + 1,))
+        inputs[..., :-1] = windows
+        inputs[..., -1] = series.to(inputs.dtype).unsqueeze(-1)
+        return inputs, self.targets[series, window]
+
+    def window_start(self, index):
+        """
+        First row of window `index` (of every series) in the underlying array.
+        """
+        return self.start + index * self.stride
+
+    def subset(self, first, last):
+        """
+        Return a dataset over windows [first, last) of every series that shares this dataset's storage.
+        """
+        last = min(last, self.num_windows)
+        if last <= first:
+            return MultiSeriesWindowDataset(self.data, self.seq_length, self.pred_horizon, self.stride,
+                                            self.target_column, self.start, self.start)
+        stop = self.window_start(last - 1) + self.seq_length + self.pred_horizon
+        return MultiSeriesWindowDataset(self.data, self.seq_length, self.pred_horizon, self.stride,
+                                        self.target_column, self.window_start(first), stop)
@@ -0,0 +1,144 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import xgboost as xgb
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import KFold
+
+# Arrays shared with the fold workers, set once per process by _init_worker
+_shared = {}
+
+
+def rf_learner(random_state=23, n_jobs=-1, n_estimators=100, **params):
+    # Random forests handle a (rows, 3) target natively: one forest for t+1/t+2/t+3
+    return RandomForestRegressor(n_estimators=n_estimators, random_state=random_state, n_jobs=n_jobs, **params)
+
+
+def xgb_learner(random_state=23, n_jobs=-1, n_estimators=100, learning_rate=0.1,
+                multi_strategy="one_output_per_tree", **params):
+    """
+    One booster for all horizons. multi_strategy="multi_output_tree" grows vector-leaf trees
+    instead; it is slower on our feature table, so per-horizon trees stay the default.
+    """
+    return xgb.XGBRegressor(n_estimators=n_estimators, learning_rate=learning_rate, random_state=random_state,
+                            n_jobs=n_jobs, tree_method="hist", multi_strategy=multi_strategy, verbosity=0, **params)
+
+
+def thread_budget(n_workers):
+    """
+    Threads each fold may use so that n_workers folds together do not oversubscribe the cores.
+    """
+    return max(1, (os.cpu_count() or 1) // n_workers)
+
+
+def _init_worker(X, y):
+    _shared["X"] = X
+    _shared["y"] = y
+
+
+def _fit_learners(train_idx, random_state, n_jobs, rf_params, xgb_params):
+    X, y = _shared["X"], _shared["y"]
+    if train_idx is not None:
+        X, y = X[train_idx], y[train_idx]
+    rf_model = rf_learner(random_state, n_jobs, **rf_params).fit(X, y)
+    xgb_model = xgb_learner(random_state, n_jobs, **xgb_params).fit(X, y)
+    return rf_model, xgb_model
+
+
+def _fit_fold(fold, train_idx, val_idx, random_state, n_jobs, rf_params, xgb_params):
+    X = _shared["X"]
+    started = time.perf_counter()
+    rf_model, xgb_model = _fit_learners(train_idx, random_state, n_jobs, rf_params, xgb_params)
+    # Only the out-of-fold predictions leave the worker; the fold models are not kept
+    return {
+        "fold": fold,
+        "val_idx": val_idx,
+        "rf_preds": rf_model.predict(X[val_idx]),
+        "xgb_preds": xgb_model.predict(X[val_idx]),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def fit_base_learners(X, y, folds=None, n_workers=None, random_state=23, rf_params=None, xgb_params=None):
+    """
+    Fit the RF and XGB base learners on every fold for out-of-fold predictions, and once more on
+    all rows for the final learners, in parallel.
+
+    The fold models only produce the out-of-fold predictions the meta-learner is trained on. The
+    returned learners see every row, including the latest block that no time-ordered fold trains
+    on, as sklearn's StackingRegressor does; each OOF prediction, like a prediction of the final
+    learners on new data, comes from a single model that has not seen that row.
+
+    folds: (train_idx, val_idx) pairs; default KFold(5, shuffle=True) like 6. Ensemble.ipynb.
+    n_workers: fits run at once (default: one per fold plus the final fit, capped at the core
+    count); each learner gets thread_budget(n_workers) threads.
+    Returns (rf_model, xgb_model, oof_rf, oof_xgb); the out-of-fold predictions are NaN for rows
+    no fold validated.
+    """
+    X = np.ascontiguousarray(X)
+    y = np.ascontiguousarray(y)
+    if folds is None:
+        folds = KFold(n_splits=5, shuffle=True, random_state=random_state).split(X)
+    folds = list(folds)
+    n_workers = n_workers or min(len(folds) + 1, os.cpu_count() or 1)
+    n_jobs = thread_budget(n_workers)
+    rf_params = rf_params or {}
+    xgb_params = xgb_params or {}
+
+    oof_rf = np.full(y.shape, np.nan)
+    oof_xgb = np.full(y.shape, np.nan)
+    results = []
+    if n_workers == 1:
+        _init_worker(X, y)
+        for fold, (train_idx, val_idx) in enumerate(folds):
+            results.append(_fit_fold(fold, train_idx, val_idx, random_state, n_jobs, rf_params, xgb_params))
+        rf_model, xgb_model = _fit_learners(None, random_state, n_jobs, rf_params, xgb_params)
+    else:
+        with ProcessPoolExecutor(n_workers, initializer=_init_worker, initargs=(X, y)) as pool:
+            final = pool.submit(_fit_learners, None, random_state, n_jobs, rf_params, xgb_params)
+            futures = [pool.submit(_fit_fold, fold, train_idx, val_idx, random_state, n_jobs, rf_params, xgb_params)
+                       for fold, (train_idx, val_idx) in enumerate(folds)]
+            results = [future.result() for future in futures]
+            rf_model, xgb_model = final.result()
+
+    for result in results:
+        val_idx = result["val_idx"]
+        oof_rf[val_idx] = result["rf_preds"]
+        oof_xgb[val_idx] = result["xgb_preds"]
+        print(f"Fold {result['fold'] + 1}/{len(folds)} ({result['seconds']:.1f}s) "
+              f"RF MAE: {np.mean(np.abs(result['rf_preds'] - y[val_idx])):.4f}, "
+              f"XGB MAE: {np.mean(np.abs(result['xgb_preds'] - y[val_idx])):.4f}")
+    return rf_model, xgb_model, oof_rf, oof_xgb
+
+
+def fit_stacked_ensemble(X, y, folds=None, n_workers=None, random_state=23, rf_params=None, xgb_params=None,
+                         meta_params=None):
+    """
+    Fit the base learners (see fit_base_learners) and the XGB meta-learner on their out-of-fold predictions.
+    Returns (rf_model, xgb_model, meta), used as meta.predict(hstack([rf.predict(X), xgb.predict(X)])).
+    """
+    rf_model, xgb_model, oof_rf, oof_xgb = fit_base_learners(X, y, folds, n_workers, random_state,
+                                                             rf_params, xgb_params)
+    oof_meta_features = np.hstack([oof_rf, oof_xgb])
+    rows = ~np.isnan(oof_meta_features).any(axis=1)
+    meta = xgb_learner(random_state, thread_budget(1), **(meta_params or {}))
+    meta.fit(oof_meta_features[rows], np.asarray(y)[rows])
+    return rf_model, xgb_model, meta
+
+
+def add_boosting_rounds(model, X, y, rounds=50, **params):
+    """
+    Continue a fitted XGBRegressor with `rounds` more trees fitted to (X, y), starting from its
+    current predictions; the existing trees are kept as they are.
+    params override the learner's settings for the new rounds (e.g. a smaller learning_rate).
+    Returns a new model; the one passed in is not modified.
+    """
+    extended = xgb.XGBRegressor(**model.get_params())
+    extended.set_params(n_estimators=rounds, **params)
+    return extended.fit(X, y, xgb_model=model.get_booster())
+
+
+def stacked_predict(rf_model, xgb_model, meta, X):
+    return meta.predict(np.hstack([rf_model.predict(X), xgb_model.predict(X)]))
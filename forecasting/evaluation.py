@@ -0,0 +1,177 @@
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+
+from data_retrieval_and_cleaning.instrumentation import count, span
+from forecasting.models import BiLSTM_pt, BiSeq2Seq, GlobalForecaster, LSTM_pt, Seq2Seq, TransformerModel
+
+
+def lstm_forecast(model, inputs, horizon):
+    return model(inputs)[0]
+
+
+def seq2seq_forecast(model, inputs, horizon):
+    return model(inputs)
+
+
+def transformer_forecast(model, inputs, horizon):
+    # Autoregressive from the last input; the window is encoded once and the keys/values are cached
+    return model.forecast(inputs, horizon=horizon)
+
+
+def global_forecast(model, inputs, horizon):
+    # The wrapper takes the base model's call signature, so its forecast function applies as is
+    return forecast_function(model.base)(model, inputs, horizon)
+
+
+# Inference forward of every model class: (model, normalised windows, horizon) -> (batch, horizon)
+# normalised forecasts. Register further architectures here.
+FORECAST_FUNCTIONS = {
+    LSTM_pt: lstm_forecast,
+    BiLSTM_pt: lstm_forecast,
+    Seq2Seq: seq2seq_forecast,
+    BiSeq2Seq: seq2seq_forecast,
+    TransformerModel: transformer_forecast,
+    GlobalForecaster: global_forecast,
+}
+
+
+def forecast_function(model):
+    for cls in type(model).__mro__:
+        if cls in FORECAST_FUNCTIONS:
+            return FORECAST_FUNCTIONS[cls]
+    raise ValueError(f"No forecast function registered for {type(model).__name__}")
+
+
+@torch.no_grad()
+def predict_dataset(model, dataset, device="cpu", batch_size=4096, forward=None):
+    """
+    Forecast every window of a SlidingWindowDataset, in order, into one preallocated
+    (windows, horizon) tensor on `device`. Nothing is copied back to the host per batch.
+    """
+    forward = forward or forecast_function(model)
+    was_training = model.training
+    model.to(device).eval()
+    n, horizon = len(dataset), dataset.pred_horizon
+    predictions = torch.empty((n, horizon), device=device)
+    for start in range(0, n, batch_size):
+        with span("inference.predict_dataset", "inference"):
+            inputs = dataset.inputs[start:start + batch_size].to(device, non_blocking=True)
+            predictions[start:start + len(inputs)] = forward(model, inputs, horizon).reshape(len(inputs), horizon)
+        count("inference.windows", len(inputs))
+    model.train(was_training)
+    return predictions
+
+
+def forecast_metrics(predictions, targets):
+    """
+    Exact MAE, RMSE and MAPE (%) of (samples, horizon) forecasts, per horizon step and over all
+    steps. Targets of zero are left out of the MAPE.
+    """
+    predictions = np.asarray(predictions, dtype=np.float64)
+    targets = np.asarray(targets, dtype=np.float64)
+    errors = predictions - targets
+    abs_errors = np.abs(errors)
+    nonzero = targets != 0
+    relative = np.divide(abs_errors, np.abs(targets), out=np.zeros_like(abs_errors), where=nonzero)
+    return {
+        "mae": abs_errors.mean(axis=0),
+        "rmse": np.sqrt(np.square(errors).mean(axis=0)),
+        "mape": 100 * relative.sum(axis=0) / np.maximum(nonzero.sum(axis=0), 1),
+        "overall_mae": abs_errors.mean(),
+        "overall_rmse": np.sqrt(np.square(errors).mean()),
+        "overall_mape": 100 * relative.sum() / max(nonzero.sum(), 1),
+    }
+
+
+def evaluate_predictions(predictions, targets, loss=None, seconds=None):
+    """
+    Wrap forecasts made elsewhere (e.g. by the ensemble) in the result format of evaluate_model.
+    """
+    predictions = np.asarray(predictions)
+    targets = np.asarray(targets)
+    return {"predictions": predictions, "targets": targets, "metrics": forecast_metrics(predictions, targets),
+            "loss": loss, "seconds": seconds}
+
+
+def evaluate_model(model, dataset, normalizer=None, device="cpu", batch_size=4096, forward=None):
+    """
+    Run a model over the whole dataset (no windows dropped) and score it in the original units.
+
+    Returns a dict with the raw (windows, horizon) predictions and targets, the metrics of
+    forecast_metrics, the MSE on normalised values (the notebooks' test loss) and the wall time.
+    """
+    started = time.perf_counter()
+    predictions = predict_dataset(model, dataset, device, batch_size, forward)
+    targets = dataset.targets[..., 0].to(device)
+    loss = torch.mean(torch.square(predictions - targets))
+    if normalizer is not None:
+        predictions = normalizer.inverse_column(predictions, dataset.target_column)
+        targets = normalizer.inverse_column(targets, dataset.target_column)
+    # The only device-to-host copies of the evaluation
+    result = evaluate_predictions(predictions.cpu().numpy(), targets.cpu().numpy(), loss.item())
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+def evaluate_models(models, dataset, normalizer=None, device="cpu", batch_size=4096):
+    """
+    Evaluate {name: model} (or {name: (model, forward)}) on the same dataset.
+    Returns ({name: result}, metrics_table(results)).
+    """
+    results = {}
+    for name, model in models.items():
+        model, forward = model if isinstance(model, tuple) else (model, None)
+        results[name] = evaluate_model(model, dataset, normalizer, device, batch_size, forward)
+    return results, metrics_table(results)
+
+
+def metrics_table(results):
+    """
+    One row per model: overall MAE/RMSE/MAPE, the MAE of every horizon step, test loss and time.
+    """
+    rows = {}
+    for name, result in results.items():
+        metrics = result["metrics"]
+        row = {"MAE": metrics["overall_mae"], "RMSE": metrics["overall_rmse"], "MAPE %": metrics["overall_mape"]}
+        for step, mae in enumerate(metrics["mae"], start=1):
+            row[f"MAE t+{step}"] = mae
+        row["test loss"] = result["loss"]
+        row["seconds"] = result["seconds"]
+        row["windows"] = len(result["predictions"])
+        rows[name] = row
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+
+def print_metrics(name, result):
+    metrics = result["metrics"]
+    steps = ", ".join(f"t+{step} {mae:.4f}" for step, mae in enumerate(metrics["mae"], start=1))
+    print(f"{name}: MAE {metrics['overall_mae']:.4f} ({steps}), RMSE {metrics['overall_rmse']:.4f}, "
+          f"MAPE {metrics['overall_mape']:.2f}%")
+    if result["loss"] is not None:
+        print(f"{name}: test loss {result['loss']:.6f} over {len(result['predictions'])} windows")
+
+
+def plot_forecast(result, dataset, normalizer=None, index=0, title=None):
+    """
+    Plot the input history, target and forecast of one test window, in the original units.
+    """
+    import matplotlib.pyplot as plt
+    history = dataset.inputs[index, :, dataset.target_column]
+    if normalizer is not None:
+        history = normalizer.inverse_column(history, dataset.target_column)
+    history = history.cpu().numpy()
+    seq_length, horizon = len(history), dataset.pred_horizon
+    steps = range(seq_length, seq_length + horizon)
+    plt.figure(figsize=(12, 6))
+    plt.plot(range(seq_length), history, label="Input", color="blue")
+    plt.plot(steps, result["targets"][index], label="Target", color="green")
+    plt.plot(steps, result["predictions"][index], label="Predicted", color="red")
+    plt.title(title or f"Window {index} Predictions vs Targets")
+    plt.xlabel("Time Step")
+    plt.ylabel("Average Taxi Availability")
+    plt.legend()
+    plt.grid(True)
+    plt.show()
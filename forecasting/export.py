@@ -0,0 +1,208 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+if __name__ == "__main__":
+    # Run as a script: make the repository's packages importable
+    REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+
+from forecasting.datasets import FEATURE_COLUMNS, TARGET_COLUMN, SlidingWindowDataset, chronological_split, open_feature_array
+from forecasting.normalization import MinMaxNormalizer
+from forecasting.specs import MODEL_SPECS, SEQ_LENGTH
+
+EXPORTABLE = ("lstm", "ed_lstm", "bi_ed_lstm", "transformer")
+
+
+class ExportedForecaster(torch.nn.Module):
+    """
+    A notebook model with its normalizer folded in: raw (batch, seq_length, features) windows in,
+    raw (batch, horizon) forecasts out. This is the module that gets traced, so the artifact
+    needs neither the model classes nor the normalizer JSON to run.
+    """
+
+    def __init__(self, model, forward, normalizer, target_column=TARGET_COLUMN):
+        super().__init__()
+        self.model = model
+        self.forward_fn = forward
+        multiplier, offset = normalizer._params("transform", torch.zeros(0))
+        self.register_buffer("in_scale", multiplier.clone())
+        self.register_buffer("in_offset", offset.clone())
+        out_scale, out_offset = normalizer._params("inverse", torch.zeros(0))
+        self.register_buffer("out_scale", out_scale[target_column].clone())
+        self.register_buffer("out_offset", out_offset[target_column].clone())
+
+    def forward(self, windows):
+        x = torch.addcmul(self.in_offset, windows, self.in_scale)
+        output = self.forward_fn(self.model, x).reshape(windows.size(0), -1)
+        return torch.addcmul(self.out_offset, output, self.out_scale)
+
+
+def quantize(module):
+    """
+    Dynamic int8 quantization of the LSTM and Linear layers (weights int8, activations quantized
+    on the fly). Attention projections stay float, since the Transformer's cached decoding reads
+    their weights directly, and so do the Transformer encoder layers, whose fused inference path
+    needs float weights.
+    """
+    names = {name for name, layer in module.named_modules()
+             if type(layer) in (torch.nn.LSTM, torch.nn.Linear) and ".transformer.encoder." not in name}
+    return torch.ao.quantization.quantize_dynamic(module, names, dtype=torch.qint8)
+
+
+def build_exported(name, model_dir="./final_models"):
+    build, forward, weights, stats = MODEL_SPECS[name]
+    model = build()
+    model.load_state_dict(torch.load(os.path.join(model_dir, weights), map_location="cpu"))
+    normalizer = MinMaxNormalizer.load(os.path.join(model_dir, stats))
+    return ExportedForecaster(model.eval(), forward, normalizer).eval()
+
+
+def example_windows(batch_size=17, seq_length=SEQ_LENGTH):
+    return torch.rand(batch_size, seq_length, len(FEATURE_COLUMNS))
+
+
+def export_torchscript(module, path, example=None):
+    example = example if example is not None else example_windows()
+    with torch.no_grad():
+        traced = torch.jit.trace(module, example, check_trace=False)
+    traced = torch.jit.freeze(traced.eval())
+    torch.jit.save(traced, path)
+    return path
+
+
+def export_onnx(module, path, example=None):
+    """
+    Needs the optional onnx package. The fused fast path of the Transformer encoder layers, which
+    eval mode under no_grad selects, has no ONNX operator, so it is off while tracing.
+    """
+    example = example if example is not None else example_windows()
+    fastpath = torch.backends.mha.get_fastpath_enabled()
+    torch.backends.mha.set_fastpath_enabled(False)
+    try:
+        with torch.no_grad():
+            torch.onnx.export(module, (example,), path, input_names=["windows"], output_names=["forecast"],
+                              dynamic_axes={"windows": {0: "batch"}, "forecast": {0: "batch"}}, opset_version=17,
+                              dynamo=False)
+    finally:
+        torch.backends.mha.set_fastpath_enabled(fastpath)
+    return path
+
+
+def quantize_onnx(path, output):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(path, output, weight_type=QuantType.QInt8)
+    return output
+
+
+def load_artifact(path):
+    """
+    Return a callable mapping raw windows (numpy or tensor) to raw forecasts (numpy).
+    """
+    if path.endswith(".onnx"):
+        import onnxruntime
+        session = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+        return lambda windows: session.run(None, {"windows": np.asarray(windows, dtype=np.float32)})[0]
+    module = torch.jit.load(path, map_location="cpu")
+
+    def run(windows):
+        with torch.no_grad():
+            return module(torch.as_tensor(windows, dtype=torch.float32)).numpy()
+    return run
+
+
+def test_windows(features_path, seq_length=SEQ_LENGTH, pred_horizon=3, stride=24):
+    """
+    Raw (windows, targets) of the notebooks' test split.
+    """
+    data = np.array(open_feature_array(features_path), dtype=np.float32)
+    dataset = SlidingWindowDataset(data, seq_length, pred_horizon, stride)
+    _, _, test_dataset = chronological_split(dataset)
+    return test_dataset.inputs.numpy(), test_dataset.targets.numpy()[..., 0]
+
+
+def compare(reference, artifact, windows, targets, batch_size=17):
+    """
+    Test-split MAE of the float model and the artifact, their largest difference, and the mean
+    per-batch latency of each.
+    """
+    results = {}
+    for label, run in (("float", reference), ("exported", artifact)):
+        for _ in range(3):
+            run(windows[:batch_size])  # Warm-up: the TorchScript profiling executor optimises on the first calls
+        predictions, seconds = [], 0.0
+        for start in range(0, len(windows), batch_size):
+            batch = windows[start:start + batch_size]
+            started = time.perf_counter()
+            predictions.append(np.asarray(run(batch)))
+            seconds += time.perf_counter() - started
+        predictions = np.concatenate(predictions)
+        batches = max(1, -(-len(windows) // batch_size))
+        results[label] = (predictions, float(np.mean(np.abs(predictions - targets))), seconds / batches * 1000)
+    return {
+        "float_mae": results["float"][1],
+        "exported_mae": results["exported"][1],
+        "mae_delta": results["exported"][1] - results["float"][1],
+        "max_abs_diff": float(np.max(np.abs(results["exported"][0] - results["float"][0]))),
+        "float_batch_ms": results["float"][2],
+        "exported_batch_ms": results["exported"][2],
+    }
+
+
+def export(name, model_dir="./final_models", output_dir=None, fmt="torchscript", int8=False, features_path=None):
+    output_dir = output_dir or model_dir
+    os.makedirs(output_dir, exist_ok=True)
+    module = build_exported(name, model_dir)
+    suffix = ".int8" if int8 else ""
+    if fmt == "torchscript":
+        path = export_torchscript(quantize(module) if int8 else module,
+                                  os.path.join(output_dir, f"{name}{suffix}.torchscript.pt"))
+    else:
+        path = export_onnx(module, os.path.join(output_dir, f"{name}.onnx"))
+        if int8:
+            path = quantize_onnx(path, os.path.join(output_dir, f"{name}{suffix}.onnx"))
+    weights_size = os.path.getsize(os.path.join(model_dir, MODEL_SPECS[name][2]))
+    print(f"{name}: {path} ({os.path.getsize(path) / 1024:.0f} KiB, float weights {weights_size / 1024:.0f} KiB)")
+
+    started = time.perf_counter()
+    artifact = load_artifact(path)
+    print(f"  load time {(time.perf_counter() - started) * 1000:.0f} ms")
+    if features_path:
+        windows, targets = test_windows(features_path)
+
+        def reference(batch):
+            with torch.no_grad():
+                return module(torch.as_tensor(batch)).numpy()
+        report = compare(reference, artifact, windows, targets)
+        print(f"  test MAE float {report['float_mae']:.4f}, exported {report['exported_mae']:.4f} "
+              f"(delta {report['mae_delta']:+.4f}, max abs diff {report['max_abs_diff']:.4f})")
+        print(f"  per-batch latency float {report['float_batch_ms']:.2f} ms, exported {report['exported_batch_ms']:.2f} ms")
+    return path
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export trained models to self-contained TorchScript or ONNX artifacts.")
+    parser.add_argument("--models", nargs="+", choices=EXPORTABLE, default=list(EXPORTABLE))
+    parser.add_argument("--model-dir", default="./final_models")
+    parser.add_argument("--output-dir", help="Default: the model directory")
+    parser.add_argument("--format", choices=["torchscript", "onnx"], default="torchscript",
+                        help="onnx needs the onnx and onnxruntime packages")
+    parser.add_argument("--int8", action="store_true", help="Dynamically quantize LSTM and Linear layers to int8")
+    parser.add_argument("--features", help="Feature array (.npy, .arrow or .parquet) whose test split is used "
+                                           "to report the accuracy delta")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    for name in args.models:
+        export(name, args.model_dir, args.output_dir, args.format, args.int8, args.features)
+
+
+if __name__ == "__main__":
+    main()
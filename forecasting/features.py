@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from forecasting.datasets import FEATURE_COLUMNS, TARGET_COLUMN
+
+# Columns of merged_file_with_mean.csv the ensemble is not trained on: labels, raw points and the
+# box-area count, which a served window (FEATURE_COLUMNS only) does not carry
+ENSEMBLE_DROP_COLUMNS = ["stationId", "Coordinates[]", "Group", "Taxi Available in Selected Box Area"]
+
+# Calendar features of the notebooks, computed from the DateTime column
+CALENDAR_FEATURES = {
+    "IsWeekend": lambda t: (t.dt.weekday >= 5).astype(int),
+    "Hour": lambda t: t.dt.hour + 1,  # 1 to 24
+    "DayOfWeek": lambda t: t.dt.dayofweek,
+}
+
+
+def lag_matrix(values, lags):
+    """
+    Lagged copies of every column of a (rows, columns) array: column block k holds values[i - lags[k]].
+    Returns (rows, len(lags) * columns) ordered lag by lag, NaN where the lag reaches before row 0.
+
+    All lags are read from one sliding-window view over a NaN-padded copy of the data, so the
+    cost is a single output array regardless of how many lags are requested.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, None]
+    lags = np.asarray(lags, dtype=int)
+    max_lag = int(lags.max())
+    padded = np.concatenate([np.full((max_lag, values.shape[1]), np.nan), values])
+    # (rows, columns, max_lag + 1) view; position max_lag - lag is the value `lag` rows back
+    windows = sliding_window_view(padded, max_lag + 1, axis=0)
+    lagged = windows[:, :, max_lag - lags]  # (rows, columns, lags)
+    return lagged.transpose(0, 2, 1).reshape(len(values), -1)
+
+
+def rolling_matrix(values, window, stat="mean"):
+    """
+    Trailing rolling statistic over `window` rows, including the current row (like pandas
+    rolling(window)); the first window - 1 rows are NaN.
+    mean/std use running sums (O(rows) for any window); min/max reduce a sliding-window view.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, None]
+    out = np.full(values.shape, np.nan)
+    if len(values) < window:
+        return out
+    if stat in ("mean", "std"):
+        zeros = np.zeros((1, values.shape[1]))
+        cumsum = np.concatenate([zeros, np.cumsum(values, axis=0)])
+        mean = (cumsum[window:] - cumsum[:-window]) / window
+        if stat == "mean":
+            out[window - 1:] = mean
+        else:
+            cumsq = np.concatenate([zeros, np.cumsum(values ** 2, axis=0)])
+            var = (cumsq[window:] - cumsq[:-window]) / window - mean ** 2
+            # Sample standard deviation, as pandas computes it
+            out[window - 1:] = np.sqrt(np.maximum(var, 0) * window / max(window - 1, 1))
+    elif stat in ("min", "max"):
+        windows = sliding_window_view(values, window, axis=0)
+        out[window - 1:] = windows.min(axis=-1) if stat == "min" else windows.max(axis=-1)
+    else:
+        raise ValueError(f"Unknown rolling statistic {stat!r}")
+    return out
+
+
+def build_lag_features(df, lag_columns=None, lags=(1, 2, 3), rolling=None, calendar=CALENDAR_FEATURES,
+                       datetime_column="DateTime", target=FEATURE_COLUMNS[TARGET_COLUMN], horizon=3,
+                       dropna=True):
+    """
+    Tabular features and multi-step targets for the tree ensemble, built in one pass.
+
+    - Rows are sorted by datetime_column first, so lags look into the past and targets into the future.
+    - lag_columns x lags adds `<column>_lag<n>` columns (ordered lag by lag, like 6. Ensemble.ipynb).
+    - rolling: {column: [(window, stat), ...]} adds `<column>_roll<window>_<stat>` columns.
+    - calendar: {name: fn(datetime Series)} features; the datetime column itself is dropped.
+    - horizon adds target_t1 .. target_t<horizon> from the next rows of `target`.
+    Rows with an incomplete lag, rolling window or target are dropped unless dropna=False.
+    """
+    if datetime_column in df.columns:
+        df = df.sort_values(datetime_column, kind="stable").reset_index(drop=True)
+        times = pd.to_datetime(df[datetime_column])
+        calendar_columns = {name: fn(times).to_numpy() for name, fn in (calendar or {}).items()}
+        df = df.drop(columns=datetime_column)
+    else:
+        calendar_columns = {}
+
+    blocks = [df]
+    if calendar_columns:
+        base = df.drop(columns=[c for c in calendar_columns if c in df.columns])
+        blocks = [base, pd.DataFrame(calendar_columns, index=df.index)]
+
+    if lag_columns:
+        lag_columns = list(lag_columns)
+        names = [f"{column}_lag{lag}" for lag in lags for column in lag_columns]
+        blocks.append(pd.DataFrame(lag_matrix(df[lag_columns].to_numpy(), lags), columns=names, index=df.index))
+
+    for column, specs in (rolling or {}).items():
+        for window, stat in specs:
+            name = f"{column}_roll{window}_{stat}"
+            blocks.append(pd.DataFrame({name: rolling_matrix(df[column].to_numpy(), window, stat)[:, 0]}, index=df.index))
+
+    if horizon:
+        values = df[target].to_numpy(dtype=np.float64)
+        # Lead k is lag -k: read it from the same kind of view over a NaN-padded tail
+        padded = np.concatenate([values, np.full(horizon, np.nan)])
+        leads = sliding_window_view(padded, horizon + 1)[:, 1:]
+        blocks.append(pd.DataFrame(leads, columns=[f"target_t{k}" for k in range(1, horizon + 1)], index=df.index))
+
+    features = pd.concat(blocks, axis=1)
+    if dropna:
+        features = features.dropna().reset_index(drop=True)
+    return features
@@ -0,0 +1,245 @@
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import torch
+
+if __name__ == "__main__":
+    # Run as a script: make the repository's packages importable
+    REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+
+from data_retrieval_and_cleaning.instrumentation import add_trace_arguments, count, span, trace_from_args
+from forecasting.datasets import FEATURE_COLUMNS, MultiSeriesWindowDataset, chronological_split, open_feature_array, stack_series
+from forecasting.evaluation import evaluate_predictions, forecast_function, metrics_table
+from forecasting.models import GlobalForecaster
+from forecasting.normalization import MinMaxNormalizer
+from forecasting.sweep import build_model
+from forecasting.training import fit, make_loader
+
+
+def metadata_path(series_path):
+    """
+    The JSON file next to a series stack with its series names and per-series normalizers.
+    """
+    return os.path.splitext(series_path)[0] + ".json"
+
+
+def save_series_metadata(path, names, normalizers, windows=None):
+    """
+    windows: the seq_length, pred_horizon, stride and train_stop (first row after the training
+    split) the normalizers were fit with.
+    """
+    state = {
+        "series": list(names),
+        "columns": normalizers[0].columns,
+        "data_min": [n.data_min.tolist() for n in normalizers],
+        "data_max": [n.data_max.tolist() for n in normalizers],
+    }
+    if windows is not None:
+        state["windows"] = windows
+    with open(path, "w") as f:
+        json.dump(state, f, indent=1)
+
+
+def load_series_windows(path):
+    """
+    Return the window settings saved by prepare_series, or None for older metadata.
+    """
+    with open(path) as f:
+        return json.load(f).get("windows")
+
+
+def load_series_metadata(path):
+    """
+    Return (series names, one MinMaxNormalizer per series).
+    """
+    with open(path) as f:
+        state = json.load(f)
+    normalizers = []
+    for data_min, data_max in zip(state["data_min"], state["data_max"]):
+        normalizer = MinMaxNormalizer(state["columns"])
+        normalizer.data_min = np.asarray(data_min, dtype=np.float64)
+        normalizer.data_max = np.asarray(data_max, dtype=np.float64)
+        normalizers.append(normalizer)
+    return state["series"], normalizers
+
+
+def prepare_series(paths, output="series.npy", names=None, seq_length=24, pred_horizon=3, stride=1,
+                   columns=FEATURE_COLUMNS):
+    """
+    Stack one feature array per region (.npy, .arrow or .parquet, oldest row first, on the same
+    hourly grid) into a memory-mapped (series, rows, features) .npy and normalise it in place.
+
+    Every series is scaled with the min/max of its own training rows, as the single-series models
+    are, so regions of very different size share one model. Pass the seq_length, pred_horizon and
+    stride train_global will use: they decide where the training split ends. The names, statistics
+    and window settings are saved to metadata_path(output). Returns (stack, names, normalizers).
+    """
+    names = names or [os.path.splitext(os.path.basename(p))[0] for p in paths]
+    arrays = [open_feature_array(p, columns) for p in paths]
+    stack = stack_series(arrays, output)
+    del arrays
+    train_dataset, _, _ = chronological_split(MultiSeriesWindowDataset(stack, seq_length, pred_horizon, stride))
+    normalizers = []
+    for series in stack:
+        normalizer = MinMaxNormalizer(columns).fit(series[:train_dataset.stop])
+        normalizer.transform(series, out=series)
+        normalizers.append(normalizer)
+    stack.flush()
+    windows = {"seq_length": seq_length, "pred_horizon": pred_horizon, "stride": stride,
+               "train_stop": int(train_dataset.stop)}
+    save_series_metadata(metadata_path(output), names, normalizers, windows)
+    print(f"{len(names)} series of {stack.shape[1]} rows saved to {output}")
+    return stack, names, normalizers
+
+
+@torch.no_grad()
+def predict_global(model, dataset, device="cpu", batch_size=4096):
+    """
+    Forecast every window of every series; returns (predictions, targets), both
+    (num_series, windows, horizon) tensors on `device` in normalised units.
+    """
+    forward = forecast_function(model)
+    was_training = model.training
+    model.to(device).eval()
+    n, horizon = len(dataset), dataset.pred_horizon
+    predictions = torch.empty((n, horizon), device=device)
+    targets = torch.empty((n, horizon), device=device)
+    for start in range(0, n, batch_size):
+        with span("inference.predict_global", "inference"):
+            inputs, batch_targets = dataset[torch.arange(start, min(start + batch_size, n))]
+            inputs = inputs.to(device, non_blocking=True)
+            predictions[start:start + len(inputs)] = forward(model, inputs, horizon).reshape(len(inputs), horizon)
+            targets[start:start + len(inputs)] = batch_targets[..., 0].to(device, non_blocking=True)
+        count("inference.windows", len(inputs))
+    model.train(was_training)
+    # Index i is window i // num_series of series i % num_series
+    shape = (dataset.num_windows, dataset.num_series, horizon)
+    return predictions.view(shape).transpose(0, 1), targets.view(shape).transpose(0, 1)
+
+
+def evaluate_global(model, dataset, names, normalizers=None, device="cpu", batch_size=4096):
+    """
+    Score a GlobalForecaster per series in that series' original units.
+    Returns ({name: result}, metrics_table(results)) like evaluation.evaluate_models.
+    """
+    predictions, targets = predict_global(model, dataset, device, batch_size)
+    results = {}
+    for i, name in enumerate(names):
+        loss = torch.mean(torch.square(predictions[i] - targets[i])).item()
+        series_predictions, series_targets = predictions[i], targets[i]
+        if normalizers is not None:
+            series_predictions = normalizers[i].inverse_column(series_predictions, dataset.target_column)
+            series_targets = normalizers[i].inverse_column(series_targets, dataset.target_column)
+        results[name] = evaluate_predictions(series_predictions.cpu().numpy(), series_targets.cpu().numpy(), loss)
+    return results, metrics_table(results)
+
+
+def build_global_model(model_type, config, num_series, embedding_dim=8, num_features=len(FEATURE_COLUMNS)):
+    """
+    Return (GlobalForecaster, forward_fn, weight_decay): a sweep model built for the features
+    plus the region embedding.
+    """
+    base, forward_fn, weight_decay = build_model(model_type, config, input_size=num_features + embedding_dim)
+    return GlobalForecaster(base, num_series, embedding_dim), forward_fn, weight_decay
+
+
+def train_global(series_path, model_type="lstm", config=None, embedding_dim=8, num_epochs=50, learning_rate=1e-3,
+                 seq_length=24, pred_horizon=3, stride=1, batch_size=256, device="cpu", num_workers=0,
+                 output_dir="./final_models", patience=None):
+    """
+    Train one model on every series of a prepared stack and report per-series test metrics.
+    The stack is memory-mapped read-only, so DataLoader workers share its pages instead of copies.
+    """
+    config = dict(config or {})
+    config.setdefault("hidden_size", 128)
+    names, normalizers = load_series_metadata(metadata_path(series_path))
+    stack = open_feature_array(series_path)
+    dataset = MultiSeriesWindowDataset(stack, seq_length, pred_horizon, stride)
+    train_dataset, val_dataset, test_dataset = chronological_split(dataset)
+    windows = load_series_windows(metadata_path(series_path))
+    if windows is not None and windows["train_stop"] != train_dataset.stop:
+        raise ValueError(f"The training split ends at row {train_dataset.stop}, but {series_path} was normalised with "
+                         f"the statistics of rows before {windows['train_stop']} (seq_length={windows['seq_length']}, "
+                         f"pred_horizon={windows['pred_horizon']}, stride={windows['stride']}); "
+                         f"train with the same window settings or prepare the series again")
+    print(f"{dataset.num_series} series x {dataset.num_windows} windows: "
+          f"{len(train_dataset)} train, {len(val_dataset)} val, {len(test_dataset)} test")
+
+    model, forward_fn, weight_decay = build_global_model(model_type, config, dataset.num_series, embedding_dim,
+                                                         stack.shape[2])
+    train_loader = make_loader(train_dataset, batch_size, shuffle=True, num_workers=num_workers)
+    val_loader = make_loader(val_dataset, batch_size)
+    name = f"Global_{model_type}"
+    fit(model, train_loader, val_loader, num_epochs=num_epochs, learning_rate=learning_rate, device=device,
+        forward_fn=forward_fn, weight_decay=config.get("weight_decay", weight_decay), patience=patience,
+        checkpoint_path=os.path.join(output_dir, f"{name}.ckpt"), log_every=10)
+
+    results, table = evaluate_global(model, test_dataset, names, normalizers, device)
+    print(table.to_string(float_format=lambda v: f"{v:.4f}"))
+    os.makedirs(output_dir, exist_ok=True)
+    torch.save(model.state_dict(), os.path.join(output_dir, f"{name}.pth"))
+    save_series_metadata(os.path.join(output_dir, f"{name}_series.json"), names, normalizers, windows)
+    with open(os.path.join(output_dir, f"{name}.json"), "w") as f:
+        json.dump({"model_type": model_type, "config": config, "embedding_dim": embedding_dim,
+                   "num_series": dataset.num_series, "num_features": stack.shape[2]}, f, indent=1)
+    print(f"Model saved to {os.path.join(output_dir, name + '.pth')}")
+    return model, results
+
+
+def load_global_model(model_dir="./final_models", model_type="lstm", device="cpu"):
+    """
+    Return (model, series names, normalizers) saved by train_global.
+    """
+    name = f"Global_{model_type}"
+    with open(os.path.join(model_dir, f"{name}.json")) as f:
+        spec = json.load(f)
+    model, _, _ = build_global_model(spec["model_type"], spec["config"], spec["num_series"], spec["embedding_dim"],
+                                     spec["num_features"])
+    model.load_state_dict(torch.load(os.path.join(model_dir, f"{name}.pth"), map_location=device))
+    names, normalizers = load_series_metadata(os.path.join(model_dir, f"{name}_series.json"))
+    return model.to(device).eval(), names, normalizers
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train one forecasting model on many regions at once.")
+    parser.add_argument("--features", nargs="+", help="One feature array per region (.npy, .arrow or .parquet); "
+                                                      "stacked and normalised into --series first")
+    parser.add_argument("--names", nargs="+", help="Region names for --features (default: file names)")
+    parser.add_argument("--series", default="series.npy", help="Prepared (series, rows, features) stack")
+    parser.add_argument("--model", choices=["lstm", "seq2seq", "transformer"], default="lstm")
+    parser.add_argument("--config", help="JSON file with hyperparameters, e.g. the best config of a sweep")
+    parser.add_argument("--embedding-dim", type=int, default=8, help="Size of the learned region embedding")
+    parser.add_argument("--epochs", type=int, default=50)
+    parser.add_argument("--learning-rate", type=float, default=1e-3)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--seq-length", type=int, default=24)
+    parser.add_argument("--stride", type=int, default=1)
+    parser.add_argument("--patience", type=int)
+    parser.add_argument("--num-workers", type=int, default=0)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--output-dir", default="./final_models")
+    add_trace_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    trace_from_args(args)
+    if args.features:
+        prepare_series(args.features, args.series, args.names, seq_length=args.seq_length, stride=args.stride)
+    config = None
+    if args.config:
+        with open(args.config) as f:
+            config = json.load(f)
+    train_global(args.series, args.model, config, args.embedding_dim, args.epochs, args.learning_rate,
+                 seq_length=args.seq_length, stride=args.stride, batch_size=args.batch_size, device=args.device,
+                 num_workers=args.num_workers, output_dir=args.output_dir, patience=args.patience)
+
+
+if __name__ == "__main__":
+    main()
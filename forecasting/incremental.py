@@ -0,0 +1,316 @@
+import argparse
+import datetime
+import json
+import math
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import torch
+from torch.utils.data import Dataset
+
+if __name__ == "__main__":
+    # Run as a script: make the repository's packages importable
+    REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+
+from data_retrieval_and_cleaning.instrumentation import add_trace_arguments, trace_from_args
+from forecasting.datasets import FEATURE_COLUMNS, SlidingWindowDataset, chronological_split
+from forecasting.ensemble import add_boosting_rounds, stacked_predict
+from forecasting.evaluation import evaluate_model, evaluate_predictions
+from forecasting.features import ENSEMBLE_DROP_COLUMNS, build_lag_features
+from forecasting.normalization import MinMaxNormalizer
+from forecasting.specs import ENSEMBLE_FILES, MODEL_SPECS, PRED_HORIZON, SEQ_LENGTH
+from forecasting.training import (default_forward, fit, load_checkpoint, make_loader, save_checkpoint,
+                                  seq2seq_forward, shifted_teacher_forcing_forward)
+
+STATE_FILE = "incremental_state.json"
+
+# Training step and weight decay of every MODEL_SPECS model, as in its notebook
+TRAINING_SPECS = {
+    "lstm": (default_forward, 0.0),
+    "ed_lstm": (seq2seq_forward, 1e-5),
+    "bi_ed_lstm": (seq2seq_forward, 0.0),
+    "transformer": (shifted_teacher_forcing_forward, 0.0),
+}
+
+# Lag features of 6. Ensemble.ipynb
+ENSEMBLE_LAG_COLUMNS = ["Average Taxi Availability", "Taxi Available throughout SG", "temp_value", "humidity_value"]
+
+
+class WindowSelection(Dataset):
+    """
+    Chosen windows of a SlidingWindowDataset (new windows plus a replay sample), gathered once.
+    """
+
+    def __init__(self, dataset, indices):
+        indices = torch.as_tensor(indices, dtype=torch.long)
+        self.inputs = dataset.inputs[indices]
+        self.targets = dataset.targets[indices]
+        self.pred_horizon = dataset.pred_horizon
+        self.target_column = dataset.target_column
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def __getitem__(self, index):
+        return self.inputs[index], self.targets[index]
+
+
+def load_state(model_dir):
+    path = os.path.join(model_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(model_dir, state):
+    path = os.path.join(model_dir, STATE_FILE)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(state, f, indent=1)
+    os.replace(f"{path}.tmp", path)
+
+
+def read_merged_csv(path):
+    """
+    The merged taxi/weather CSV, oldest row first, with the notebooks' IsWeekend and Hour columns.
+    """
+    df = pd.read_csv(path)
+    df["DateTime"] = pd.to_datetime(df["DateTime"])
+    df = df.sort_values("DateTime", kind="stable", ignore_index=True)
+    df["IsWeekend"] = (df["DateTime"].dt.weekday >= 5).astype(int)
+    df["Hour"] = df["DateTime"].dt.hour + 1
+    return df
+
+
+def load_feature_rows(path):
+    """
+    Return (DateTime array, writable float32 (rows, features) array), oldest row first, from a
+    merged CSV or a feature table (.arrow/.parquet).
+    """
+    if path.endswith(".csv"):
+        df = read_merged_csv(path)
+        return df["DateTime"].to_numpy(), np.ascontiguousarray(df[FEATURE_COLUMNS].to_numpy(dtype=np.float32))
+    if path.endswith(".npy"):
+        raise ValueError(f"{path} has no DateTime column; use the merged CSV or a feature table")
+    from data_retrieval_and_cleaning.feature_table import load_feature_matrix
+    datetimes, matrix, _ = load_feature_matrix(path, FEATURE_COLUMNS)
+    order = np.argsort(datetimes, kind="stable")
+    return datetimes[order], np.ascontiguousarray(matrix[order])
+
+
+def rows_seen_until(datetimes, last_seen):
+    """
+    Number of rows up to and including the hour `last_seen` (an ISO string from the state file).
+    """
+    return int(np.searchsorted(datetimes, np.datetime64(last_seen), side="right"))
+
+
+def last_seen_hour(datetimes):
+    return str(np.datetime64(datetimes[-1], "s"))
+
+
+def split_new(n, first_new, holdout_fraction=0.2, gap=0, replay_ratio=1.0, generator=None):
+    """
+    Index sets of an incremental update over n time-ordered samples, of which [first_new, n) are new:
+    the last holdout_fraction of the new samples are held out, the rest are fine-tuned on together
+    with replay_ratio times as many samples drawn at random from before first_new. `gap` samples are
+    skipped before the held-out ones (and before the new ones for the replay) so that no target
+    overlaps. Returns (fit indices, held-out indices), or None when there is too little new data.
+    """
+    n_new = n - first_new
+    n_holdout = max(1, int(holdout_fraction * n_new))
+    fit_stop = n - n_holdout - gap
+    if fit_stop <= first_new:
+        return None
+    new = torch.arange(first_new, fit_stop)
+    old = max(0, first_new - gap)
+    n_replay = min(old, int(replay_ratio * len(new)))
+    replay = torch.randperm(old, generator=generator)[:n_replay]
+    return torch.cat([new, replay]), torch.arange(n - n_holdout, n)
+
+
+def promote_if_better(name, old_mae, new_mae, tolerance):
+    promote = new_mae <= old_mae * (1 + tolerance)
+    verdict = "promoted" if promote else "rejected, keeping the previous weights"
+    print(f"{name}: held-out MAE {old_mae:.4f} -> {new_mae:.4f}, {verdict}")
+    return promote
+
+
+def retrain_model(name, data_path, model_dir="./final_models", new_rows=None, num_epochs=5, learning_rate=1e-4,
+                  replay_ratio=1.0, holdout_fraction=0.2, tolerance=0.0, batch_size=17, device="cpu", seed=0,
+                  stride=SEQ_LENGTH):
+    """
+    Warm-start one of the MODEL_SPECS models on the rows that arrived since its last update.
+
+    The weights and Adam state come from <weights>.ckpt when an earlier run left one, otherwise
+    from the notebook's state_dict with a fresh optimizer; inputs are scaled with the saved
+    normalizer, not refitted. Windows start every `stride` rows, as in the notebooks; those whose
+    targets reach into the new rows are split into a fine-tuning part and a later held-out part
+    (see split_new). The fine-tuned weights replace
+    ./final_models/<weights> only if their held-out MAE is no worse than the current weights'
+    (within `tolerance`, relative). Returns the dict stored in the state file.
+    """
+    build, _, weights, stats = MODEL_SPECS[name]
+    forward_fn, weight_decay = TRAINING_SPECS[name]
+    weights_path = os.path.join(model_dir, weights)
+    checkpoint_path = os.path.splitext(weights_path)[0] + ".ckpt"
+    state = load_state(model_dir)
+
+    model = build().to(device)
+    optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate, weight_decay=weight_decay)
+    if os.path.exists(checkpoint_path):
+        load_checkpoint(checkpoint_path, model, optimizer, map_location=device)
+    else:
+        load_checkpoint(weights_path, model, map_location=device)
+    for group in optimizer.param_groups:
+        group["lr"] = learning_rate
+    normalizer = MinMaxNormalizer.load(os.path.join(model_dir, stats))
+
+    datetimes, data = load_feature_rows(data_path)
+    dataset = SlidingWindowDataset(data, SEQ_LENGTH, PRED_HORIZON, stride)
+    if new_rows is not None:
+        rows_seen = len(data) - new_rows
+    elif name in state:
+        rows_seen = rows_seen_until(datetimes, state[name]["last_seen"])
+    else:
+        # First update: the notebooks trained on the first 80% of the windows, oldest first
+        rows_seen = chronological_split(dataset)[0].stop
+    normalizer.transform(data, out=data)
+
+    # Window i forecasts rows [s + SEQ_LENGTH, s + SEQ_LENGTH + PRED_HORIZON) with s = i * stride
+    first_new = math.ceil(max(0, rows_seen - SEQ_LENGTH - PRED_HORIZON + 1) / stride)
+    gap = max(0, math.ceil(PRED_HORIZON / stride) - 1)
+    generator = torch.Generator().manual_seed(seed)
+    split = split_new(len(dataset), first_new, holdout_fraction, gap, replay_ratio, generator)
+    if split is None:
+        print(f"{name}: {len(data) - rows_seen} new rows are too few to update on")
+        return state.get(name)
+    fit_indices, holdout_indices = split
+    holdout = dataset.subset(int(holdout_indices[0]), len(dataset))
+    print(f"{name}: fine-tuning on {len(fit_indices)} windows ({len(data) - rows_seen} new rows), "
+          f"{len(holdout)} held out")
+
+    before = evaluate_model(model, holdout, normalizer, device)
+    torch.manual_seed(seed)
+    loader = make_loader(WindowSelection(dataset, fit_indices), batch_size, shuffle=True, generator=generator)
+    candidate_path = os.path.splitext(weights_path)[0] + ".candidate.ckpt"
+    fit(model, loader, num_epochs=num_epochs, device=device, forward_fn=forward_fn, optimizer=optimizer,
+        checkpoint_path=candidate_path, checkpoint_every=num_epochs, log_every=1)
+    after = evaluate_model(model, holdout, normalizer, device)
+
+    old_mae, new_mae = before["metrics"]["overall_mae"], after["metrics"]["overall_mae"]
+    if promote_if_better(name, old_mae, new_mae, tolerance):
+        save_checkpoint(weights_path, model.state_dict())
+        os.replace(candidate_path, checkpoint_path)
+        state[name] = {"last_seen": last_seen_hour(datetimes), "holdout_mae": new_mae,
+                       "updated": datetime.datetime.now().isoformat(timespec="seconds")}
+        save_state(model_dir, state)
+    else:
+        os.remove(candidate_path)
+    return state.get(name)
+
+
+def retrain_ensemble(data_path, model_dir="./final_models", new_rows=None, rounds=50, learning_rate=None,
+                     replay_ratio=1.0, holdout_fraction=0.2, tolerance=0.0, seed=0):
+    """
+    Add `rounds` boosting rounds to every saved XGB base learner on the rows that arrived since
+    the last update (plus a replay sample of older rows) instead of refitting the ensemble.
+    The random forest, meta-learner and feature scaler are kept. The extended learners replace
+    Ensemble_XGB.pth only if the stacked ensemble's held-out MAE does not regress.
+    """
+    import joblib
+    paths = [os.path.join(model_dir, f) for f in ENSEMBLE_FILES]
+    rf_model, xgb_model, meta = (joblib.load(p) for p in paths[:3])
+    scaler = MinMaxNormalizer.load(paths[3])
+    state = load_state(model_dir)
+
+    df = read_merged_csv(data_path).drop(columns=ENSEMBLE_DROP_COLUMNS, errors="ignore")
+    n_rows = len(df)
+    # Keep every row so that a sample's position is its row in the table
+    features = build_lag_features(df, ENSEMBLE_LAG_COLUMNS, lags=range(1, 4), horizon=PRED_HORIZON, dropna=False)
+    target_columns = [f"target_t{k}" for k in range(1, PRED_HORIZON + 1)]
+    rows = np.flatnonzero(features[scaler.columns + target_columns].notna().all(axis=1).to_numpy())
+    X = scaler.transform(features[scaler.columns].to_numpy(dtype=np.float64)[rows])
+    y = features[target_columns].to_numpy()[rows]
+
+    if new_rows is not None:
+        rows_seen = n_rows - new_rows
+    elif "ensemble" in state:
+        rows_seen = rows_seen_until(df["DateTime"].to_numpy(), state["ensemble"]["last_seen"])
+    else:
+        # First update: the notebook trained on the first 80% of the samples
+        rows_seen = rows[int(0.8 * len(rows))] + PRED_HORIZON
+    # Sample at row r forecasts rows r + 1 .. r + PRED_HORIZON
+    first_new = int(np.searchsorted(rows, rows_seen - PRED_HORIZON))
+    generator = torch.Generator().manual_seed(seed)
+    split = split_new(len(rows), first_new, holdout_fraction, PRED_HORIZON, replay_ratio, generator)
+    if split is None:
+        print(f"ensemble: {n_rows - rows_seen} new rows are too few to update on")
+        return state.get("ensemble")
+    fit_indices, holdout_indices = (i.numpy() for i in split)
+    print(f"ensemble: {rounds} more boosting rounds on {len(fit_indices)} rows "
+          f"({n_rows - rows_seen} new), {len(holdout_indices)} held out")
+
+    X_holdout, y_holdout = X[holdout_indices], y[holdout_indices]
+    before = evaluate_predictions(stacked_predict(rf_model, xgb_model, meta, X_holdout), y_holdout)
+    params = {"learning_rate": learning_rate} if learning_rate is not None else {}
+    extended = add_boosting_rounds(xgb_model, X[fit_indices], y[fit_indices], rounds, **params)
+    after = evaluate_predictions(stacked_predict(rf_model, extended, meta, X_holdout), y_holdout)
+
+    old_mae, new_mae = before["metrics"]["overall_mae"], after["metrics"]["overall_mae"]
+    if promote_if_better("ensemble", old_mae, new_mae, tolerance):
+        joblib.dump(extended, f"{paths[1]}.tmp")
+        os.replace(f"{paths[1]}.tmp", paths[1])
+        state["ensemble"] = {"last_seen": last_seen_hour(df["DateTime"].to_numpy()), "holdout_mae": new_mae,
+                             "updated": datetime.datetime.now().isoformat(timespec="seconds")}
+        save_state(model_dir, state)
+    return state.get("ensemble")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Update the saved models on newly ingested data instead of retraining them.")
+    parser.add_argument("--data", default="merged_file_with_mean.csv",
+                        help="Merged CSV with the whole history including the new rows (or a feature table; "
+                             "the ensemble needs the CSV)")
+    parser.add_argument("--models", nargs="+", default=list(MODEL_SPECS) + ["ensemble"],
+                        choices=list(MODEL_SPECS) + ["ensemble"])
+    parser.add_argument("--model-dir", default="./final_models")
+    parser.add_argument("--new-rows", type=int, help="Treat the last N rows as new (default: every hour after the "
+                                                     "last one seen, recorded in " + STATE_FILE + ")")
+    parser.add_argument("--epochs", type=int, default=5, help="Fine-tuning epochs of the neural models")
+    parser.add_argument("--learning-rate", type=float, default=1e-4, help="Fine-tuning learning rate")
+    parser.add_argument("--rounds", type=int, default=50, help="Boosting rounds added to every XGB base learner")
+    parser.add_argument("--xgb-learning-rate", type=float, help="Learning rate of the added rounds (default: the model's)")
+    parser.add_argument("--replay-ratio", type=float, default=1.0,
+                        help="Older samples replayed per new one, against forgetting")
+    parser.add_argument("--holdout-fraction", type=float, default=0.2, help="Latest share of the new samples held out")
+    parser.add_argument("--tolerance", type=float, default=0.0,
+                        help="Relative held-out MAE increase still accepted for promotion")
+    parser.add_argument("--stride", type=int, default=24,
+                        help="Rows between the starts of consecutive windows of the neural models, as in the notebooks")
+    parser.add_argument("--batch-size", type=int, default=17)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--seed", type=int, default=0)
+    add_trace_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    trace_from_args(args)
+    for name in args.models:
+        if name == "ensemble":
+            retrain_ensemble(args.data, args.model_dir, args.new_rows, args.rounds, args.xgb_learning_rate,
+                             args.replay_ratio, args.holdout_fraction, args.tolerance, args.seed)
+        else:
+            retrain_model(name, args.data, args.model_dir, args.new_rows, args.epochs, args.learning_rate,
+                          args.replay_ratio, args.holdout_fraction, args.tolerance, args.batch_size, args.device,
+                          args.seed, args.stride)
+
+
+if __name__ == "__main__":
+    main()
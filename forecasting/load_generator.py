@@ -0,0 +1,146 @@
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import aiohttp
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if __name__ == "__main__" and REPO_ROOT not in sys.path:
+    # Run as a script: make the repository's packages importable
+    sys.path.insert(0, REPO_ROOT)
+
+from forecasting.service import synthetic_windows
+
+
+def percentile(values, p):
+    return float(np.percentile(values, p)) if len(values) else 0.0
+
+
+async def wait_until_ready(session, url, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f"{url}/health") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.5)
+    raise TimeoutError(f"Forecast service at {url} did not come up within {timeout}s")
+
+
+async def run_load(url, model="lstm", requests=2000, concurrency=64, regions_per_request=1, seed=0):
+    """
+    Send `requests` forecast requests from `concurrency` concurrent clients and return the
+    latency percentiles and throughput seen by the clients.
+    """
+    windows = synthetic_windows(256, seed=seed)
+    rng = np.random.default_rng(seed)
+    payloads = []
+    for i in range(min(requests, 256)):
+        picks = rng.integers(0, len(windows), regions_per_request)
+        payloads.append({
+            "model": model,
+            "regions": [{"region": f"region-{j}", "window": windows[j].tolist(), "day_of_week": int(j % 7)}
+                        for j in picks],
+        })
+
+    latencies = []
+    failures = 0
+    counter = iter(range(requests))
+
+    async def client(session):
+        nonlocal failures
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                async with session.post(f"{url}/forecast", json=payloads[i % len(payloads)]) as response:
+                    await response.read()
+                    if response.status != 200:
+                        failures += 1
+                        continue
+            except aiohttp.ClientError:
+                failures += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await wait_until_ready(session, url)
+        started = time.perf_counter()
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        async with session.get(f"{url}/stats") as response:
+            server_stats = (await response.json()).get(model, {})
+
+    latencies_ms = np.asarray(latencies) * 1000
+    return {
+        "model": model,
+        "requests": len(latencies),
+        "failures": failures,
+        "concurrency": concurrency,
+        "seconds": elapsed,
+        "requests_per_s": len(latencies) / elapsed,
+        "forecasts_per_s": len(latencies) * regions_per_request / elapsed,
+        "p50_ms": percentile(latencies_ms, 50),
+        "p95_ms": percentile(latencies_ms, 95),
+        "p99_ms": percentile(latencies_ms, 99),
+        "mean_batch_size": server_stats.get("mean_batch_size", 0.0),
+    }
+
+
+def start_stand_in(port, max_batch_size, max_latency_ms, device="cpu"):
+    """
+    Launch forecasting/service.py with the stand-in models in a separate process.
+    """
+    command = [sys.executable, os.path.join(REPO_ROOT, "forecasting", "service.py"), "--stand-in",
+               "--port", str(port), "--device", device, "--max-batch-size", str(max_batch_size),
+               "--max-latency-ms", str(max_latency_ms)]
+    return subprocess.Popen(command)
+
+
+def print_report(result):
+    print(f"{result['model']}: {result['requests']} requests ({result['failures']} failed) "
+          f"at concurrency {result['concurrency']} in {result['seconds']:.2f}s")
+    print(f"  throughput: {result['requests_per_s']:.1f} requests/s, {result['forecasts_per_s']:.1f} forecasts/s")
+    print(f"  latency: p50 {result['p50_ms']:.2f} ms, p95 {result['p95_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms")
+    print(f"  mean server batch size: {result['mean_batch_size']:.1f}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Measure latency and throughput of the forecast service.")
+    parser.add_argument("--url", help="Running service to test (default: start a local stand-in)")
+    parser.add_argument("--port", type=int, default=8765, help="Port of the local stand-in")
+    parser.add_argument("--models", nargs="+", default=["lstm"])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--regions-per-request", type=int, default=1)
+    parser.add_argument("--max-batch-size", type=int, default=64, help="Stand-in batching setting")
+    parser.add_argument("--max-latency-ms", type=float, default=5.0, help="Stand-in batching setting")
+    parser.add_argument("--device", default="cpu", help="Stand-in device")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    server = None
+    url = args.url
+    if url is None:
+        server = start_stand_in(args.port, args.max_batch_size, args.max_latency_ms, args.device)
+        url = f"http://127.0.0.1:{args.port}"
+    try:
+        for model in args.models:
+            result = asyncio.run(run_load(url, model, args.requests, args.concurrency, args.regions_per_request))
+            print_report(result)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
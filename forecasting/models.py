@@ -0,0 +1,411 @@
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+
+class LSTM_pt(torch.nn.Module):
+    """
+    LSTM over the input window followed by a linear head on the last timestep.
+    The initial state is zeros, or a learned (layer_dim, 1, hidden_dim) parameter pair
+    with learn_initial_state=True; see forecasting/streaming.py for step-by-step use.
+    """
+
+    def __init__(self, input_dim, hidden_dim, layer_dim, output_dim, learn_initial_state=False):
+        super(LSTM_pt, self).__init__()
+        self.hidden_dim = hidden_dim
+        self.layer_dim = layer_dim
+
+        # LSTM layer
+        self.lstm = torch.nn.LSTM(input_dim, hidden_dim, layer_dim, batch_first=True)
+
+        # Fully connected layer
+        self.fc = torch.nn.Sequential(
+            torch.nn.Linear(hidden_dim, output_dim),
+        )
+
+        if learn_initial_state:
+            self.h0 = nn.Parameter(torch.zeros(layer_dim, 1, hidden_dim))
+            self.c0 = nn.Parameter(torch.zeros(layer_dim, 1, hidden_dim))
+        else:
+            self.register_parameter("h0", None)
+            self.register_parameter("c0", None)
+
+    def initial_state(self, batch_size, device=None, dtype=None):
+        if self.h0 is not None:
+            return (self.h0.expand(-1, batch_size, -1).contiguous(),
+                    self.c0.expand(-1, batch_size, -1).contiguous())
+        zeros = torch.zeros(self.layer_dim, batch_size, self.hidden_dim, device=device, dtype=dtype)
+        return zeros, zeros.clone()
+
+    def forward(self, x, h0=None, c0=None):
+        if h0 is None or c0 is None:
+            h0, c0 = self.initial_state(x.size(0), x.device, x.dtype)
+
+        # LSTM forward pass
+        out, (hn, cn) = self.lstm(x, (h0, c0))
+
+        # Pass only the last timestep's output to the FC layer
+        out = self.fc(out[:, -1, :])
+
+        return out, hn, cn
+
+
+class BiLSTM_pt(torch.nn.Module):
+    def __init__(self, input_dim, hidden_dim, layer_dim, output_dim):
+        super(BiLSTM_pt, self).__init__()
+        self.hidden_dim = hidden_dim
+        self.layer_dim = layer_dim
+        self.num_directions = 2  # Since it's bidirectional
+
+        # LSTM layer
+        self.lstm = torch.nn.LSTM(input_dim, hidden_dim, layer_dim, batch_first=True, bidirectional=True)
+
+        # Fully connected layer
+        self.fc = torch.nn.Linear(hidden_dim * 2, output_dim)
+
+    def forward(self, x, h0=None, c0=None):
+        if h0 is None or c0 is None:
+            h0 = torch.zeros(self.layer_dim * self.num_directions, x.size(0), self.hidden_dim, device=x.device, dtype=x.dtype)
+            c0 = torch.zeros_like(h0)
+
+        # LSTM forward pass
+        out, (hn, cn) = self.lstm(x, (h0, c0))
+
+        # Pass only the last timestep's output to the FC layer
+        out = self.fc(out[:, -1, :])
+
+        return out, hn, cn
+
+
+class EncoderLSTM(nn.Module):
+    def __init__(self, input_size, hidden_size):
+        super(EncoderLSTM, self).__init__()
+        self.hidden_size = hidden_size
+        self.lstm = nn.LSTM(input_size, hidden_size, batch_first=True)
+
+    def forward(self, inputs):
+        # Passing the input sequence through the LSTM
+        output, (hidden, cell) = self.lstm(inputs)
+        return hidden, cell
+
+
+class DecoderLSTM(nn.Module):
+    """
+    Three-step decoder of the ED-LSTM: each step feeds a projection of the previous step's
+    output back into the shared LSTM and carries its hidden state forward.
+    """
+
+    def __init__(self, input_size, hidden_size, dropout_rate=0.3):
+        super(DecoderLSTM, self).__init__()
+
+        self.lstm = nn.LSTM(input_size, hidden_size, batch_first=True)
+
+        self.linear1 = nn.Linear(hidden_size, 1)
+        self.linearsub1 = nn.Linear(hidden_size, input_size)
+
+        self.linear2 = nn.Linear(hidden_size, 1)
+        self.linearsub2 = nn.Linear(hidden_size, input_size)
+
+        self.linear3 = nn.Linear(hidden_size, 1)
+
+        self.dropout = nn.Dropout(p=dropout_rate)
+
+    def forward(self, x, hidden, target=None):
+        outputs = []
+        decoder_input = x
+
+        # First LSTM layer
+        y1, hidden1 = self.lstm(decoder_input, hidden)
+        y1 = self.dropout(y1)
+        linear_y1 = self.linear1(y1)
+        linear_y1 = linear_y1.mean(dim=1, keepdim=True)
+        linear_suby1 = self.linearsub1(y1)
+
+        # Second LSTM layer
+        y2, hidden2 = self.lstm(linear_suby1, hidden1)
+        y2 = self.dropout(y2)
+        linear_y2 = self.linear2(y2)
+        linear_suby2 = self.linearsub2(y2)
+        linear_y2 = linear_y2.mean(dim=1, keepdim=True)
+
+        y3, hidden3 = self.lstm(linear_suby2, hidden2)
+        y3 = self.dropout(y3)
+        linear_y3 = self.linear3(y3)
+        linear_y3 = linear_y3.mean(dim=1, keepdim=True)
+
+        outputs.append(linear_y1.squeeze(1))
+        outputs.append(linear_y2.squeeze(1))
+        outputs.append(linear_y3.squeeze(1))
+
+        final_output = torch.stack(outputs, dim=1)
+        return final_output
+
+
+class Seq2Seq(nn.Module):
+    """
+    Encoder-decoder LSTM (ED-LSTM). The decoder starts from the last input timestep.
+    """
+
+    def __init__(self, hidden_size, output_size, dropout_rate, input_size=8):
+        super(Seq2Seq, self).__init__()
+        self.output_length = output_size
+        self.encoder = EncoderLSTM(input_size, hidden_size)
+        self.decoder = DecoderLSTM(input_size, hidden_size, dropout_rate)
+
+    def forward(self, inputs, outputs=None):
+        # Encode the input sequence
+        hidden = self.encoder(inputs)
+
+        # Initialize decoder input with the last input timestep
+        decoder_input = inputs[:, -1:, :]
+        output = self.decoder(decoder_input, hidden, outputs)
+        return output
+
+
+class BiEncoderLSTM(torch.nn.Module):
+    def __init__(self, input_dim, hidden_dim):
+        super(BiEncoderLSTM, self).__init__()
+        self.hidden_dim = hidden_dim
+        self.num_directions = 2  # Since it's bidirectional
+
+        # LSTM layer
+        self.lstm = torch.nn.LSTM(input_dim, hidden_dim, batch_first=True, bidirectional=True)
+
+    def forward(self, inputs):
+        out, (hn, cn) = self.lstm(inputs)
+        # Sum the two directions into one decoder state
+        hn_dec = hn[0] + hn[1]
+        cn_dec = cn[0] + cn[1]
+
+        hn_dec = hn_dec.unsqueeze(0)
+        cn_dec = cn_dec.unsqueeze(0)
+
+        return hn_dec, cn_dec
+
+
+class BiDecoderLSTM(nn.Module):
+    """
+    Three-step decoder of the Bi-ED-LSTM: every step restarts from the encoder state.
+    """
+
+    def __init__(self, input_size, hidden_size):
+        super(BiDecoderLSTM, self).__init__()
+
+        self.lstm = nn.LSTM(input_size, hidden_size, batch_first=True)
+
+        self.linear1 = nn.Linear(hidden_size, 1)
+        self.linearsub1 = nn.Linear(hidden_size, input_size)
+
+        self.linear2 = nn.Linear(hidden_size, 1)
+        self.linearsub2 = nn.Linear(hidden_size, input_size)
+
+        self.linear3 = nn.Linear(hidden_size, 1)
+
+    def forward(self, x, hidden):
+        outputs = []
+        decoder_input = x
+
+        # First LSTM layer
+        y1, hidden1 = self.lstm(decoder_input, hidden)
+        linear_y1 = self.linear1(y1)
+        linear_y1 = linear_y1.mean(dim=1, keepdim=True)
+        linear_suby1 = self.linearsub1(y1)
+
+        # Second LSTM layer
+        y2, hidden2 = self.lstm(linear_suby1, hidden)
+        linear_y2 = self.linear2(y2)
+        linear_suby2 = self.linearsub2(y2)
+        linear_y2 = linear_y2.mean(dim=1, keepdim=True)
+
+        y3, hidden3 = self.lstm(linear_suby2, hidden)
+        linear_y3 = self.linear3(y3)
+        linear_y3 = linear_y3.mean(dim=1, keepdim=True)
+
+        outputs.append(linear_y1.squeeze(1))  # shape: [batch, 1]
+        outputs.append(linear_y2.squeeze(1))
+        outputs.append(linear_y3.squeeze(1))
+
+        final_output = torch.stack(outputs, dim=1)  # [batch, 3, 1]
+        return final_output
+
+
+class BiSeq2Seq(nn.Module):
+    """
+    Bidirectional-encoder ED-LSTM (Bi-ED-LSTM). The decoder reads the whole input window.
+    """
+
+    def __init__(self, hidden_size, output_size, input_size):
+        super(BiSeq2Seq, self).__init__()
+        self.output_length = output_size
+        self.encoder = BiEncoderLSTM(input_size, hidden_size)
+        self.decoder = BiDecoderLSTM(input_size, hidden_size)
+
+    def forward(self, inputs, outputs=None):
+        hidden = self.encoder(inputs)
+        output = self.decoder(inputs, hidden)
+        return output
+
+
+class TransformerModel(nn.Module):
+    """
+    Encoder-decoder Transformer forecaster.
+
+    Training uses forward(src, tgt); inference should use forecast(), which encodes the input
+    window once and then decodes one step at a time with encode()/decode_step(), reusing the
+    encoder memory and caching the decoder self-attention keys and values.
+    """
+
+    def __init__(self, input_size, output_size, num_heads, num_layers, hidden_dim, dropout=0.1):
+        super(TransformerModel, self).__init__()
+
+        self.num_heads = num_heads
+        self.embedding = nn.Linear(input_size, hidden_dim)
+        self.decoder_embedding = nn.Linear(1, hidden_dim)
+        self.encoder_positional_encoding = nn.Parameter(torch.rand(1, 100, hidden_dim))
+        self.decoder_positional_encoding = nn.Parameter(torch.rand(1, 100, hidden_dim))  # max_seq_len=100
+
+        self.transformer = nn.Transformer(
+            d_model=hidden_dim,
+            nhead=num_heads,
+            num_encoder_layers=num_layers,
+            num_decoder_layers=num_layers,
+            dim_feedforward=hidden_dim * 2,
+            dropout=dropout,
+            batch_first=True
+        )
+
+        self.fc_out = nn.Linear(hidden_dim, output_size)
+
+    def forward(self, src, tgt=None, causal=False):
+        """
+        causal=True masks each decoder position from the later ones, which is what decode_step
+        computes incrementally.
+        """
+        src = self.embedding(src) + self.encoder_positional_encoding[:, :src.size(1), :]
+
+        if tgt is not None:
+            tgt_input = self.decoder_embedding(tgt) + self.decoder_positional_encoding[:, :tgt.size(1), :]
+        else:
+            tgt_input = src
+
+        tgt_mask = None
+        if causal:
+            tgt_mask = nn.Transformer.generate_square_subsequent_mask(tgt_input.size(1), device=src.device, dtype=src.dtype)
+        output = self.transformer(src, tgt_input, tgt_mask=tgt_mask, tgt_is_causal=causal)
+        output = self.fc_out(output)
+        return output
+
+    def _split_heads(self, x):
+        # (batch, length, hidden) -> (batch, heads, length, head_dim)
+        batch, length, hidden = x.shape
+        return x.view(batch, length, self.num_heads, hidden // self.num_heads).transpose(1, 2)
+
+    def _merge_heads(self, x):
+        batch, heads, length, head_dim = x.shape
+        return x.transpose(1, 2).reshape(batch, length, heads * head_dim)
+
+    def encode(self, src, max_steps=None):
+        """
+        Run the encoder once and return the decoding state for decode_step: the cross-attention
+        keys/values of every decoder layer (computed from the memory once) and empty
+        self-attention caches for up to max_steps decoder tokens.
+        """
+        max_steps = max_steps or self.decoder_positional_encoding.size(1)
+        memory = self.transformer.encoder(self.embedding(src) + self.encoder_positional_encoding[:, :src.size(1), :])
+        hidden = memory.size(-1)
+        head_dim = hidden // self.num_heads
+        cross, cache = [], []
+        for layer in self.transformer.decoder.layers:
+            attention = layer.multihead_attn
+            _, w_k, w_v = attention.in_proj_weight.chunk(3)
+            _, b_k, b_v = attention.in_proj_bias.chunk(3)
+            cross.append((self._split_heads(F.linear(memory, w_k, b_k)), self._split_heads(F.linear(memory, w_v, b_v))))
+            shape = (src.size(0), self.num_heads, max_steps, head_dim)
+            cache.append((memory.new_empty(shape), memory.new_empty(shape)))
+        return {"cross": cross, "cache": cache, "step": 0}
+
+    def _attend(self, attention, x, keys, values):
+        w_q = attention.in_proj_weight[:x.size(-1)]
+        b_q = attention.in_proj_bias[:x.size(-1)]
+        query = self._split_heads(F.linear(x, w_q, b_q))
+        context = F.scaled_dot_product_attention(query, keys, values)
+        return attention.out_proj(self._merge_heads(context))
+
+    def decode_step(self, state, tgt):
+        """
+        Decode one token (tgt: (batch, 1, 1)) and return its output (batch, 1, output_size).
+        The token attends to itself and every earlier token through the cache in `state`,
+        so each step costs O(steps so far) instead of re-running the whole prefix.
+        """
+        step = state["step"]
+        if step >= state["cache"][0][0].size(2):
+            raise ValueError(f"decode_step called more than max_steps={step} times")
+        x = self.decoder_embedding(tgt) + self.decoder_positional_encoding[:, step:step + 1, :]
+        for layer, (cross_k, cross_v), (cache_k, cache_v) in zip(self.transformer.decoder.layers, state["cross"], state["cache"]):
+            attention = layer.self_attn
+            inputs = layer.norm1(x) if layer.norm_first else x
+            q, k, v = F.linear(inputs, attention.in_proj_weight, attention.in_proj_bias).chunk(3, dim=-1)
+            cache_k[:, :, step:step + 1] = self._split_heads(k)
+            cache_v[:, :, step:step + 1] = self._split_heads(v)
+            context = F.scaled_dot_product_attention(self._split_heads(q), cache_k[:, :, :step + 1], cache_v[:, :, :step + 1])
+            self_out = layer.dropout1(attention.out_proj(self._merge_heads(context)))
+            if layer.norm_first:
+                x = x + self_out
+                x = x + layer.dropout2(self._attend(layer.multihead_attn, layer.norm2(x), cross_k, cross_v))
+                x = x + self._feed_forward(layer, layer.norm3(x))
+            else:
+                x = layer.norm1(x + self_out)
+                x = layer.norm2(x + layer.dropout2(self._attend(layer.multihead_attn, x, cross_k, cross_v)))
+                x = layer.norm3(x + self._feed_forward(layer, x))
+        if self.transformer.decoder.norm is not None:
+            x = self.transformer.decoder.norm(x)
+        state["step"] = step + 1
+        return self.fc_out(x)
+
+    @staticmethod
+    def _feed_forward(layer, x):
+        return layer.dropout3(layer.linear2(layer.dropout(layer.activation(layer.linear1(x)))))
+
+    def forecast(self, src, horizon=3, start=None, target_column=5):
+        """
+        Autoregressively forecast `horizon` steps for a batch of input windows.
+        The first decoder token is `start` (batch, 1, 1), by default the last observed target value.
+        Returns (batch, horizon, output_size).
+        """
+        if start is None:
+            start = src[:, -1:, target_column:target_column + 1]
+        state = self.encode(src, max_steps=horizon)
+        token = start
+        outputs = []
+        for _ in range(horizon):
+            token = self.decode_step(state, token)
+            outputs.append(token)
+        return torch.cat(outputs, dim=1)
+
+
+class GlobalForecaster(nn.Module):
+    """
+    One model for many series: wraps any of the models above (built with input_size =
+    features + embedding_dim) and learns an embedding per series.
+
+    Inputs carry the series index as an extra last channel (see datasets.MultiSeriesWindowDataset);
+    it is replaced by that series' embedding at every timestep before the base model runs, so the
+    feature columns, and TransformerModel's target_column, keep their positions.
+    """
+
+    def __init__(self, base, num_series, embedding_dim=8):
+        super(GlobalForecaster, self).__init__()
+        self.base = base
+        self.num_series = num_series
+        self.embedding = nn.Embedding(num_series, embedding_dim)
+
+    def embed(self, x):
+        series = x[:, 0, -1].long()
+        embedding = self.embedding(series).to(x.dtype).unsqueeze(1).expand(-1, x.size(1), -1)
+        return torch.cat([x[..., :-1], embedding], dim=-1)
+
+    def forward(self, x, *args, **kwargs):
+        return self.base(self.embed(x), *args, **kwargs)
+
+    def forecast(self, x, *args, **kwargs):
+        return self.base.forecast(self.embed(x), *args, **kwargs)
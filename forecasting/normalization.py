@@ -0,0 +1,148 @@
+import json
+import os
+
+import numpy as np
+import torch
+
+
+class MinMaxNormalizer:
+    """
+    Per-column min-max scaling to [0, 1] that can be fitted chunk by chunk.
+
+    Fit it on the training range only and save it next to the model weights; inference
+    then loads the statistics from that file instead of recomputing them from the full
+    dataset. transform/inverse_transform work on numpy arrays, DataFrames and torch
+    tensors (on any device) and broadcast over the last (feature) axis.
+    """
+
+    def __init__(self, columns=None):
+        self.columns = list(columns) if columns is not None else None
+        self.data_min = None
+        self.data_max = None
+        self._cache = {}
+
+    def partial_fit(self, chunk):
+        """
+        Update the running minimum and maximum with one chunk of rows (NaNs are ignored).
+        """
+        if hasattr(chunk, "columns"):
+            if self.columns is None:
+                self.columns = list(chunk.columns)
+            chunk = chunk[self.columns].to_numpy()
+        elif isinstance(chunk, torch.Tensor):
+            chunk = chunk.detach().cpu().numpy()
+        values = np.asarray(chunk, dtype=np.float64).reshape(-1, np.shape(chunk)[-1])
+        if len(values) == 0:
+            return self
+        chunk_min = np.nanmin(values, axis=0)
+        chunk_max = np.nanmax(values, axis=0)
+        if self.data_min is None:
+            self.data_min, self.data_max = chunk_min, chunk_max
+        else:
+            self.data_min = np.fmin(self.data_min, chunk_min)
+            self.data_max = np.fmax(self.data_max, chunk_max)
+        self._cache.clear()
+        return self
+
+    def fit(self, data, chunksize=65_536):
+        """
+        Fit from scratch on `data` (array, memmap, DataFrame or tensor), reading it in chunks of rows.
+        """
+        self.data_min = None
+        self.data_max = None
+        for start in range(0, len(data), chunksize):
+            self.partial_fit(data[start:start + chunksize])
+        return self
+
+    @property
+    def data_range(self):
+        data_range = self.data_max - self.data_min
+        # Constant columns map to 0 instead of dividing by zero
+        return np.where(data_range == 0, 1.0, data_range)
+
+    def column_index(self, column):
+        return column if isinstance(column, (int, np.integer)) else self.columns.index(column)
+
+    def _params(self, kind, like):
+        """
+        Return the (multiplier, offset) pair for `kind`, as arrays/tensors matching `like`.
+        transform:         x * (1 / range) + (-min / range)
+        inverse_transform: x * range + min
+        """
+        is_tensor = isinstance(like, torch.Tensor)
+        key = (kind, str(like.device) if is_tensor else "numpy", like.dtype)
+        if key not in self._cache:
+            if self.data_min is None:
+                raise RuntimeError("MinMaxNormalizer has not been fitted")
+            if kind == "transform":
+                multiplier = 1.0 / self.data_range
+                offset = -self.data_min * multiplier
+            else:
+                multiplier = self.data_range
+                offset = self.data_min
+            if is_tensor:
+                params = (torch.as_tensor(multiplier, dtype=like.dtype, device=like.device),
+                          torch.as_tensor(offset, dtype=like.dtype, device=like.device))
+            else:
+                params = (multiplier.astype(like.dtype), offset.astype(like.dtype))
+            self._cache[key] = params
+        return self._cache[key]
+
+    def _apply(self, kind, x, out=None, column=None):
+        if hasattr(x, "columns"):
+            values = self._apply(kind, x[self.columns].to_numpy(dtype=np.float32))
+            return type(x)(values, columns=self.columns, index=x.index)
+        if not isinstance(x, torch.Tensor):
+            x = np.asarray(x)
+            if x.dtype.kind != "f":
+                x = x.astype(np.float32)
+        multiplier, offset = self._params(kind, x)
+        if column is not None:
+            index = self.column_index(column)
+            multiplier, offset = multiplier[index], offset[index]
+        if isinstance(x, torch.Tensor):
+            # One fused multiply-add kernel
+            return torch.addcmul(offset, x, multiplier, out=out) if out is not None else torch.addcmul(offset, x, multiplier)
+        out = np.multiply(x, multiplier, out=out)
+        return np.add(out, offset, out=out)
+
+    def transform(self, x, out=None):
+        """
+        Scale every column of x to [0, 1] of the fitted range. Pass out=x to scale in place.
+        """
+        return self._apply("transform", x, out)
+
+    def inverse_transform(self, x, out=None):
+        """
+        Map normalised values of every column back to the original units.
+        """
+        return self._apply("inverse", x, out)
+
+    def inverse_column(self, x, column, out=None):
+        """
+        Map normalised values of one column (name or index), e.g. model outputs, back to the original units.
+        """
+        return self._apply("inverse", x, out, column=column)
+
+    def save(self, path):
+        """
+        Write the statistics as JSON, typically next to the model weights.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({
+                "columns": self.columns,
+                "data_min": self.data_min.tolist(),
+                "data_max": self.data_max.tolist(),
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            state = json.load(f)
+        normalizer = cls(state["columns"])
+        normalizer.data_min = np.asarray(state["data_min"], dtype=np.float64)
+        normalizer.data_max = np.asarray(state["data_max"], dtype=np.float64)
+        return normalizer
@@ -0,0 +1,408 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+from aiohttp import web
+
+if __name__ == "__main__":
+    # Run as a script: make the repository's packages importable
+    REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+
+from data_retrieval_and_cleaning.instrumentation import add_trace_arguments, count, timed, trace_from_args
+from forecasting.datasets import FEATURE_COLUMNS, TARGET_COLUMN
+from forecasting.normalization import MinMaxNormalizer
+from forecasting.specs import ENSEMBLE_FILES, MODEL_SPECS, PRED_HORIZON, SEQ_LENGTH
+
+# Rough ranges of the raw features, used to fit the stand-in normalizer and to draw synthetic windows
+STAND_IN_RANGES = {
+    "Taxi Available throughout SG": (1000.0, 3500.0),
+    "temp_value": (23.0, 34.0),
+    "humidity_value": (50.0, 100.0),
+    "rainfall_value": (0.0, 5.0),
+    "peak_period": (0.0, 1.0),
+    "Average Taxi Availability": (0.0, 60.0),
+    "IsWeekend": (0.0, 1.0),
+    "Hour": (1.0, 24.0),
+}
+
+
+class TorchForecaster:
+    """
+    Batched inference for one of the notebook models.
+    predict takes raw (batch, seq_length, features) windows and returns raw (batch, horizon) forecasts.
+    """
+
+    def __init__(self, model, forward, normalizer, device="cpu", target_column=TARGET_COLUMN):
+        self.model = model.to(device).eval()
+        self.forward = forward
+        self.normalizer = normalizer
+        self.device = torch.device(device)
+        self.target_column = target_column
+
+    @timed(category="inference")
+    @torch.no_grad()
+    def predict(self, windows, day_of_week=None):
+        x = torch.as_tensor(windows, dtype=torch.float32).to(self.device)
+        x = self.normalizer.transform(x)
+        output = self.forward(self.model, x).reshape(len(x), -1)
+        return self.normalizer.inverse_column(output, self.target_column).cpu().numpy()
+
+
+class ScriptedForecaster:
+    """
+    A TorchScript artifact written by forecasting/export.py; its normalizer is part of the graph.
+    """
+
+    def __init__(self, path, device="cpu"):
+        self.device = torch.device(device)
+        self.module = torch.jit.load(path, map_location=self.device)
+
+    @timed(category="inference")
+    @torch.no_grad()
+    def predict(self, windows, day_of_week=None):
+        return self.module(torch.as_tensor(windows, dtype=torch.float32).to(self.device)).cpu().numpy()
+
+
+def ensemble_features(windows, columns, day_of_week=None):
+    """
+    Build the stacked ensemble's feature rows (see 6. Ensemble.ipynb) from raw windows:
+    the last row of every window, DayOfWeek, and `<column>_lag<n>` taken n rows earlier.
+    """
+    rows = np.empty((len(windows), len(columns)), dtype=np.float64)
+    for i, column in enumerate(columns):
+        if column in FEATURE_COLUMNS:
+            rows[:, i] = windows[:, -1, FEATURE_COLUMNS.index(column)]
+        elif column == "DayOfWeek":
+            if day_of_week is None:
+                raise ValueError("The ensemble needs day_of_week for every window")
+            rows[:, i] = day_of_week
+        elif "_lag" in column:
+            name, lag = column.rsplit("_lag", 1)
+            rows[:, i] = windows[:, -1 - int(lag), FEATURE_COLUMNS.index(name)]
+        else:
+            raise ValueError(f"Cannot derive ensemble feature {column!r} from a window; "
+                             f"retrain the ensemble with 6. Ensemble.ipynb")
+    return rows
+
+
+class EnsembleForecaster:
+    """
+    RF + XGB base learners stacked under the meta-learner; its targets were never normalised.
+    """
+
+    requires_day_of_week = True
+
+    def __init__(self, rf_model, xgb_model, meta_model, scaler):
+        self.rf_model = rf_model
+        self.xgb_model = xgb_model
+        self.meta_model = meta_model
+        self.scaler = scaler
+        # Fail when the ensemble is loaded, not on every request, if it was trained on a column windows lack
+        ensemble_features(np.zeros((1, SEQ_LENGTH, len(FEATURE_COLUMNS))), scaler.columns, np.zeros(1))
+
+    @timed(category="inference")
+    def predict(self, windows, day_of_week=None):
+        features = self.scaler.transform(ensemble_features(np.asarray(windows), self.scaler.columns, day_of_week))
+        meta_input = np.hstack([self.rf_model.predict(features), self.xgb_model.predict(features)])
+        return self.meta_model.predict(meta_input)
+
+
+def load_forecasters(model_dir="./final_models", device="cpu", names=None, artifacts=None):
+    """
+    Load every available model once; models whose files are missing are skipped with a message.
+    artifacts="torchscript" or "int8" loads the neural models from their exported TorchScript
+    files (<name>.torchscript.pt / <name>.int8.torchscript.pt) instead of the state_dicts.
+    """
+    names = names or list(MODEL_SPECS) + ["ensemble"]
+    forecasters = {}
+    for name in names:
+        if name == "ensemble":
+            paths = [os.path.join(model_dir, f) for f in ENSEMBLE_FILES]
+            missing = [p for p in paths if not os.path.exists(p)]
+            if missing:
+                print(f"Skipping ensemble: {', '.join(missing)} not found")
+                continue
+            import joblib
+            rf_model, xgb_model, meta_model = (joblib.load(p) for p in paths[:3])
+            try:
+                forecasters[name] = EnsembleForecaster(rf_model, xgb_model, meta_model, MinMaxNormalizer.load(paths[3]))
+            except ValueError as e:
+                print(f"Skipping ensemble: {e}")
+            continue
+        if artifacts:
+            suffix = ".int8" if artifacts == "int8" else ""
+            path = os.path.join(model_dir, f"{name}{suffix}.torchscript.pt")
+            if not os.path.exists(path):
+                print(f"Skipping {name}: {path} not found")
+                continue
+            forecasters[name] = ScriptedForecaster(path, device)
+            continue
+        build, forward, weights, stats = MODEL_SPECS[name]
+        paths = [os.path.join(model_dir, weights), os.path.join(model_dir, stats)]
+        missing = [p for p in paths if not os.path.exists(p)]
+        if missing:
+            print(f"Skipping {name}: {', '.join(missing)} not found")
+            continue
+        model = build()
+        model.load_state_dict(torch.load(paths[0], map_location=device))
+        forecasters[name] = TorchForecaster(model, forward, MinMaxNormalizer.load(paths[1]), device)
+    return forecasters
+
+
+def stand_in_normalizer():
+    normalizer = MinMaxNormalizer(FEATURE_COLUMNS)
+    normalizer.data_min = np.array([STAND_IN_RANGES[c][0] for c in FEATURE_COLUMNS])
+    normalizer.data_max = np.array([STAND_IN_RANGES[c][1] for c in FEATURE_COLUMNS])
+    return normalizer
+
+
+def synthetic_windows(n, seq_length=SEQ_LENGTH, seed=None):
+    """
+    Random raw windows within STAND_IN_RANGES, for load tests and the stand-in models.
+    """
+    rng = np.random.default_rng(seed)
+    low = np.array([STAND_IN_RANGES[c][0] for c in FEATURE_COLUMNS], dtype=np.float32)
+    high = np.array([STAND_IN_RANGES[c][1] for c in FEATURE_COLUMNS], dtype=np.float32)
+    return (low + (high - low) * rng.random((n, seq_length, len(FEATURE_COLUMNS)), dtype=np.float32))
+
+
+def stand_in_forecasters(device="cpu", seed=0):
+    """
+    Untrained models with the notebook architectures (and a small ensemble fitted on synthetic
+    windows), so the service and its load tests run without ./final_models.
+    """
+    torch.manual_seed(seed)
+    normalizer = stand_in_normalizer()
+    forecasters = {}
+    for name, (build, forward, _, _) in MODEL_SPECS.items():
+        forecasters[name] = TorchForecaster(build(), forward, normalizer, device)
+
+    from forecasting.ensemble import rf_learner, xgb_learner
+    lag_features = ["Average Taxi Availability", "Taxi Available throughout SG", "temp_value", "humidity_value"]
+    columns = FEATURE_COLUMNS + ["DayOfWeek"] + [f"{c}_lag{lag}" for lag in range(1, 4) for c in lag_features]
+    windows = synthetic_windows(512, seed=seed)
+    day_of_week = np.random.default_rng(seed).integers(0, 7, len(windows))
+    features = ensemble_features(windows, columns, day_of_week)
+    targets = windows[:, -PRED_HORIZON:, TARGET_COLUMN]
+    scaler = MinMaxNormalizer(columns).fit(features)
+    scaled = scaler.transform(features)
+    rf_model = rf_learner(seed, n_estimators=10).fit(scaled, targets)
+    xgb_model = xgb_learner(seed, n_estimators=10).fit(scaled, targets)
+    meta_input = np.hstack([rf_model.predict(scaled), xgb_model.predict(scaled)])
+    meta_model = xgb_learner(seed, n_estimators=10).fit(meta_input, targets)
+    forecasters["ensemble"] = EnsembleForecaster(rf_model, xgb_model, meta_model, scaler)
+    return forecasters
+
+
+class MicroBatcher:
+    """
+    Groups concurrent forecast requests for one model into a single predict call.
+
+    A batch is closed when it holds max_batch_size windows or when its first request has waited
+    max_latency seconds, whichever comes first. predict runs on a worker thread so the event loop
+    keeps accepting requests while a batch is being computed.
+    """
+
+    def __init__(self, forecaster, max_batch_size=64, max_latency=0.005):
+        self.forecaster = forecaster
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.queue = asyncio.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.task = None
+        self.requests = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        self.executor.shutdown(wait=False)
+
+    async def submit(self, window, day_of_week=None):
+        """
+        Queue one raw window and wait for its (horizon,) forecast.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((window, day_of_week, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Drain whatever else is already queued, up to the batch size
+        while len(batch) < self.max_batch_size and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            batch = [item for item in batch if not item[2].cancelled()]
+            if not batch:
+                continue
+            windows = np.stack([item[0] for item in batch])
+            days = [item[1] for item in batch]
+            day_of_week = None if any(d is None for d in days) else np.asarray(days)
+            started = time.perf_counter()
+            try:
+                forecasts = await loop.run_in_executor(self.executor, self.forecaster.predict, windows, day_of_week)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finally:
+                self.busy_seconds += time.perf_counter() - started
+                self.requests += len(batch)
+                self.batches += 1
+                count("service.requests", len(batch))
+                count("service.batches")
+            for (_, _, future), forecast in zip(batch, forecasts):
+                if not future.done():
+                    future.set_result(forecast)
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "busy_seconds": self.busy_seconds,
+        }
+
+
+class ForecastService:
+    """
+    aiohttp application serving every loaded model behind its own MicroBatcher.
+
+    POST /forecast  {"model": "lstm", "regions": [{"region": "S107", "window": [[...8 values] x 24],
+                     "day_of_week": 4}, ...]}
+                 -> {"model": "lstm", "forecasts": [{"region": "S107", "forecast": [t+1, t+2, t+3]}, ...]}
+    Windows are oldest hour first; windows and forecasts are in the original units. day_of_week
+    (0 = Monday) is only needed by the ensemble, which rejects regions without it. Each region is batched on its own, so concurrent requests share forward passes.
+    GET /models, GET /stats and GET /health report the service state.
+    """
+
+    def __init__(self, forecasters, max_batch_size=64, max_latency=0.005, seq_length=SEQ_LENGTH):
+        self.batchers = {name: MicroBatcher(f, max_batch_size, max_latency) for name, f in forecasters.items()}
+        # A batch shares one day_of_week array, so a request without it is rejected before batching
+        self.requires_day_of_week = {name for name, f in forecasters.items()
+                                     if getattr(f, "requires_day_of_week", False)}
+        self.seq_length = seq_length
+
+    async def _startup(self, app):
+        for batcher in self.batchers.values():
+            batcher.start()
+
+    async def _cleanup(self, app):
+        for batcher in self.batchers.values():
+            await batcher.close()
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post("/forecast", self.forecast)
+        app.router.add_get("/models", self.models)
+        app.router.add_get("/stats", self.stats)
+        app.router.add_get("/health", self.health)
+        app.on_startup.append(self._startup)
+        app.on_cleanup.append(self._cleanup)
+        return app
+
+    def _parse_window(self, item):
+        window = np.asarray(item["window"], dtype=np.float32)
+        if window.shape != (self.seq_length, len(FEATURE_COLUMNS)):
+            raise ValueError(f"window must be {self.seq_length} x {len(FEATURE_COLUMNS)}, got {window.shape}")
+        return window
+
+    async def forecast(self, request):
+        try:
+            body = await request.json()
+            name = body.get("model", "lstm")
+            batcher = self.batchers[name]
+            items = body["regions"]
+            windows = [self._parse_window(item) for item in items]
+            if name in self.requires_day_of_week and any(item.get("day_of_week") is None for item in items):
+                raise ValueError(f"{name} needs day_of_week for every region")
+        except KeyError as e:
+            raise web.HTTPBadRequest(text=f"Unknown or missing {e}")
+        except ValueError as e:
+            raise web.HTTPBadRequest(text=str(e))
+        try:
+            forecasts = await asyncio.gather(*(batcher.submit(w, item.get("day_of_week"))
+                                               for w, item in zip(windows, items)))
+        except ValueError as e:
+            raise web.HTTPBadRequest(text=str(e))
+        return web.json_response({
+            "model": body.get("model", "lstm"),
+            "forecasts": [{"region": item.get("region"), "forecast": np.asarray(f, dtype=float).tolist()}
+                          for item, f in zip(items, forecasts)],
+        })
+
+    async def models(self, request):
+        return web.json_response({"models": list(self.batchers), "features": FEATURE_COLUMNS,
+                                  "seq_length": self.seq_length})
+
+    async def stats(self, request):
+        return web.json_response({name: b.stats() for name, b in self.batchers.items()})
+
+    async def health(self, request):
+        return web.json_response({"status": "ok"})
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve batched taxi availability forecasts over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--model-dir", default="./final_models")
+    parser.add_argument("--models", nargs="+", choices=list(MODEL_SPECS) + ["ensemble"], help="Default: all available")
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--artifacts", choices=["torchscript", "int8"],
+                        help="Serve the exported TorchScript models (see forecasting/export.py)")
+    parser.add_argument("--stand-in", action="store_true", help="Serve untrained stand-in models instead of ./final_models")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-latency-ms", type=float, default=5.0, help="Longest a request waits for its batch to fill")
+    add_trace_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    trace_from_args(args)
+    if args.stand_in:
+        forecasters = stand_in_forecasters(args.device)
+        if args.models:
+            forecasters = {name: forecasters[name] for name in args.models}
+    else:
+        forecasters = load_forecasters(args.model_dir, args.device, args.models, args.artifacts)
+    if not forecasters:
+        sys.exit("No models to serve")
+    print(f"Serving {', '.join(forecasters)} on http://{args.host}:{args.port}")
+    service = ForecastService(forecasters, args.max_batch_size, args.max_latency_ms / 1000)
+    web.run_app(service.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
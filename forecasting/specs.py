@@ -0,0 +1,29 @@
+from forecasting.models import BiSeq2Seq, LSTM_pt, Seq2Seq, TransformerModel
+
+SEQ_LENGTH = 24
+PRED_HORIZON = 3
+
+
+def lstm_forward(model, x):
+    return model(x)[0]
+
+
+def seq2seq_forward(model, x):
+    return model(x)
+
+
+def transformer_forward(model, x):
+    return model.forecast(x, horizon=PRED_HORIZON)
+
+
+# name: (architecture, forward, weights, normalizer), with the hyperparameters of the notebooks
+MODEL_SPECS = {
+    "lstm": (lambda: LSTM_pt(8, 128, 1, 3), lstm_forward, "LSTM.pth", "LSTM.normalizer.json"),
+    "ed_lstm": (lambda: Seq2Seq(hidden_size=256, output_size=3, dropout_rate=0), seq2seq_forward,
+                "ED_LSTM.pth", "ED_LSTM.normalizer.json"),
+    "bi_ed_lstm": (lambda: BiSeq2Seq(hidden_size=256, output_size=3, input_size=8), seq2seq_forward,
+                   "Bi-ED-LSTM.pth", "Bi-ED-LSTM.normalizer.json"),
+    "transformer": (lambda: TransformerModel(8, 1, 8, 1, hidden_dim=64), transformer_forward,
+                    "transformer.pth", "transformer.normalizer.json"),
+}
+ENSEMBLE_FILES = ("Ensemble_RF.pth", "Ensemble_XGB.pth", "Ensemble_Meta.pth", "Ensemble_scaler.json")
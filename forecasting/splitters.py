@@ -0,0 +1,78 @@
+import numpy as np
+
+
+def time_ordered_split(n, fractions=(0.8, 0.1, 0.1), gap=0):
+    """
+    Consecutive index ranges for a train/val/test split of n time-ordered rows, sized like the
+    notebooks (int(0.8 * n), int(0.1 * n), remainder). The first `gap` rows of every later part
+    are dropped so that multi-step targets of one part never overlap the next.
+    """
+    sizes = [int(f * n) for f in fractions[:-1]]
+    sizes.append(n - sum(sizes))
+    parts = []
+    first = 0
+    for i, size in enumerate(sizes):
+        skip = min(gap, size) if i > 0 else 0
+        parts.append(np.arange(first + skip, first + size))
+        first += size
+    return parts
+
+
+class ExpandingWindowSplit:
+    """
+    Time-series cross-validation: fold k trains on every row before its validation block.
+
+        train [0, end_k - gap)  |  gap  |  validate [end_k, end_k + test_size)
+
+    The validation blocks tile the last n_splits * test_size rows. max_train_size turns the
+    expanding window into a sliding one. Compatible with sklearn's splitter interface.
+    """
+
+    def __init__(self, n_splits=5, test_size=None, gap=0, max_train_size=None):
+        self.n_splits = n_splits
+        self.test_size = test_size
+        self.gap = gap
+        self.max_train_size = max_train_size
+
+    def get_n_splits(self, X=None, y=None, groups=None):
+        return self.n_splits
+
+    def split(self, X, y=None, groups=None):
+        n = len(X)
+        test_size = self.test_size or n // (self.n_splits + 1)
+        first_test = n - self.n_splits * test_size
+        if first_test - self.gap <= 0:
+            raise ValueError(f"{n} rows are too few for {self.n_splits} folds of {test_size} rows with gap {self.gap}")
+        for k in range(self.n_splits):
+            test_start = first_test + k * test_size
+            train_end = test_start - self.gap
+            train_start = 0 if self.max_train_size is None else max(0, train_end - self.max_train_size)
+            yield np.arange(train_start, train_end), np.arange(test_start, test_start + test_size)
+
+
+class BlockedTimeSeriesSplit:
+    """
+    Cuts the rows into n_splits contiguous blocks and splits each block in time:
+
+        train [block start, cut)  |  gap  |  validate [cut + gap, block end)
+
+    Unlike ExpandingWindowSplit every fold has the same amount of data and no fold trains on
+    another fold's rows, at the price of each model seeing only its own block.
+    """
+
+    def __init__(self, n_splits=5, train_fraction=0.8, gap=0):
+        self.n_splits = n_splits
+        self.train_fraction = train_fraction
+        self.gap = gap
+
+    def get_n_splits(self, X=None, y=None, groups=None):
+        return self.n_splits
+
+    def split(self, X, y=None, groups=None):
+        n = len(X)
+        bounds = np.linspace(0, n, self.n_splits + 1).astype(int)
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            cut = start + int(self.train_fraction * (stop - start))
+            if cut <= start or cut + self.gap >= stop:
+                raise ValueError(f"Block [{start}, {stop}) is too small for gap {self.gap}")
+            yield np.arange(start, cut), np.arange(cut + self.gap, stop)
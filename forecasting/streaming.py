@@ -0,0 +1,145 @@
+import torch
+
+
+class StreamingLSTMPredictor:
+    """
+    Keep one (h, c) LSTM state per series and advance it one hourly observation at a time.
+
+    Each update costs a single LSTM step for every series in the call, batched together,
+    instead of re-running the full seq_length window. States live in preallocated
+    (layers, capacity, hidden) tensors indexed by a per-series slot, so one process can
+    hold thousands of series.
+
+    A series warmed up on its last seq_length observations forecasts exactly what LSTM_pt
+    produces on that window; after further updates the state carries the longer history.
+    """
+
+    def __init__(self, model, normalizer=None, target_column=5, device="cpu", capacity=1024):
+        if getattr(model.lstm, "bidirectional", False):
+            raise TypeError("Bidirectional LSTMs need the whole window and cannot be streamed")
+        self.model = model.to(device).eval()
+        self.normalizer = normalizer
+        self.target_column = target_column
+        self.device = torch.device(device)
+        self.slots = {}
+        self.free_slots = []
+        parameter = next(model.parameters())
+        shape = (model.layer_dim, capacity, model.hidden_dim)
+        self.h = torch.zeros(shape, device=self.device, dtype=parameter.dtype)
+        self.c = torch.zeros(shape, device=self.device, dtype=parameter.dtype)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, series_id):
+        return series_id in self.slots
+
+    def _grow(self, capacity):
+        for name in ("h", "c"):
+            old = getattr(self, name)
+            new = old.new_zeros((old.size(0), capacity, old.size(2)))
+            new[:, :old.size(1)] = old
+            setattr(self, name, new)
+
+    def _slot_indices(self, series_ids):
+        """
+        Return the state slots of the given series, allocating (and initialising) new ones.
+        """
+        indices = []
+        new = []
+        for series_id in series_ids:
+            slot = self.slots.get(series_id)
+            if slot is None:
+                if self.free_slots:
+                    slot = self.free_slots.pop()
+                else:
+                    slot = len(self.slots)
+                    if slot >= self.h.size(1):
+                        self._grow(2 * self.h.size(1))
+                self.slots[series_id] = slot
+                new.append(slot)
+            indices.append(slot)
+        if new:
+            index = torch.tensor(new, device=self.device)
+            h0, c0 = self.model.initial_state(len(new), self.device, self.h.dtype)
+            self.h[:, index] = h0
+            self.c[:, index] = c0
+        return torch.tensor(indices, device=self.device)
+
+    def _prepare(self, observations):
+        x = torch.as_tensor(observations, dtype=self.h.dtype, device=self.device)
+        if self.normalizer is not None:
+            x = self.normalizer.transform(x)
+        return x
+
+    def _forecast(self, output):
+        forecast = self.model.fc(output)
+        if self.normalizer is not None:
+            forecast = self.normalizer.inverse_column(forecast, self.target_column)
+        return forecast
+
+    @torch.no_grad()
+    def update(self, series_ids, observations):
+        """
+        Advance each series by one observation and return the next forecasts.
+        observations: (len(series_ids), features), in original units when a normalizer is set.
+        Returns (len(series_ids), output_dim), denormalised when a normalizer is set.
+        """
+        if len(set(series_ids)) != len(series_ids):
+            raise ValueError("Each series can only be advanced once per update")
+        index = self._slot_indices(series_ids)
+        x = self._prepare(observations).unsqueeze(1)
+        output, (h, c) = self.model.lstm(x, (self.h[:, index], self.c[:, index]))
+        self.h[:, index] = h
+        self.c[:, index] = c
+        return self._forecast(output[:, -1])
+
+    @torch.no_grad()
+    def warm_up(self, series_ids, windows):
+        """
+        Reset the given series and run them over history windows (len(series_ids), steps, features),
+        returning the forecasts after the last step.
+        """
+        self.reset(series_ids)
+        index = self._slot_indices(series_ids)
+        x = self._prepare(windows)
+        output, (h, c) = self.model.lstm(x, (self.h[:, index], self.c[:, index]))
+        self.h[:, index] = h
+        self.c[:, index] = c
+        return self._forecast(output[:, -1])
+
+    def reset(self, series_ids):
+        """
+        Forget the state of the given series; their slots are reused by new series.
+        """
+        for series_id in series_ids:
+            slot = self.slots.pop(series_id, None)
+            if slot is not None:
+                self.free_slots.append(slot)
+
+    def snapshot(self, series_ids=None):
+        """
+        Return {series_id: (h, c)} copies on the CPU, for all series or the given ones.
+        """
+        series_ids = list(self.slots) if series_ids is None else series_ids
+        index = torch.tensor([self.slots[s] for s in series_ids], device=self.device, dtype=torch.long)
+        h = self.h[:, index].cpu()
+        c = self.c[:, index].cpu()
+        return {series_id: (h[:, i].clone(), c[:, i].clone()) for i, series_id in enumerate(series_ids)}
+
+    def restore(self, snapshot):
+        """
+        Load states produced by snapshot(), replacing those of series already present.
+        """
+        if not snapshot:
+            return
+        series_ids = list(snapshot)
+        index = self._slot_indices(series_ids)
+        self.h[:, index] = torch.stack([snapshot[s][0] for s in series_ids], dim=1).to(self.h)
+        self.c[:, index] = torch.stack([snapshot[s][1] for s in series_ids], dim=1).to(self.c)
+
+    def save(self, path):
+        torch.save(self.snapshot(), path)
+
+    def load(self, path):
+        self.restore(torch.load(path))
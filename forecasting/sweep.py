@@ -0,0 +1,251 @@
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import torch
+
+if __name__ == "__main__":
+    # Run as a script: make the repository's packages importable
+    REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+
+from forecasting.datasets import SlidingWindowDataset, chronological_split, open_feature_array
+from forecasting.models import LSTM_pt, Seq2Seq, TransformerModel
+from forecasting.normalization import MinMaxNormalizer
+from forecasting.training import default_forward, fit, make_loader, seq2seq_forward, shifted_teacher_forcing_forward
+
+# Search spaces of the former wandb sweeps (same format as sweep_config["parameters"]);
+# num_epochs is no longer searched: the scheduler decides how long each trial trains
+SEARCH_SPACES = {
+    "lstm": {
+        "learning_rate": {"min": 1e-3, "max": 0.01},
+        "hidden_size": {"values": [64, 128, 256]},
+    },
+    "seq2seq": {
+        "learning_rate": {"min": 1e-3, "max": 0.01},
+        "hidden_size": {"values": [64, 128, 256]},
+        "dropout_rate": {"values": [0.2, 0.5, 0.8]},
+    },
+    "transformer": {
+        "learning_rate": {"min": 1e-3, "max": 0.01},
+        "hidden_size": {"values": [64, 128, 256]},
+        "num_layers": {"values": [1, 2, 3]},
+    },
+}
+
+
+def build_model(model_type, config, input_size=8):
+    """
+    Return (model, forward_fn, weight_decay) for a sweep configuration.
+    """
+    if model_type == "lstm":
+        return LSTM_pt(input_size, config["hidden_size"], config.get("num_layers", 1), 3), default_forward, 1e-5
+    if model_type == "seq2seq":
+        model = Seq2Seq(hidden_size=config["hidden_size"], output_size=3, dropout_rate=config.get("dropout_rate", 0.0),
+                        input_size=input_size)
+        return model, seq2seq_forward, 1e-5
+    if model_type == "transformer":
+        model = TransformerModel(input_size, 1, config.get("num_heads", 8), config.get("num_layers", 1),
+                                 hidden_dim=config["hidden_size"])
+        return model, shifted_teacher_forcing_forward, 0.0
+    raise ValueError(f"Unknown model type {model_type!r}")
+
+
+def sample_config(space, rng):
+    config = {}
+    for name, spec in space.items():
+        if "values" in spec:
+            config[name] = rng.choice(spec["values"])
+        elif "value" in spec:
+            config[name] = spec["value"]
+        elif spec.get("distribution") == "log_uniform_values":
+            config[name] = math.exp(rng.uniform(math.log(spec["min"]), math.log(spec["max"])))
+        elif isinstance(spec["min"], int) and isinstance(spec["max"], int):
+            config[name] = rng.randint(spec["min"], spec["max"])
+        else:
+            config[name] = rng.uniform(spec["min"], spec["max"])
+    return config
+
+
+def rung_epochs(min_epochs, max_epochs, eta):
+    """
+    Epoch budgets of the ASHA rungs: min_epochs * eta^k, capped by (and ending at) max_epochs.
+    """
+    rungs = []
+    epochs = min_epochs
+    while epochs < max_epochs:
+        rungs.append(epochs)
+        epochs *= eta
+    rungs.append(max_epochs)
+    return rungs
+
+
+class ASHA:
+    """
+    Asynchronous successive halving (Li et al., 2018).
+
+    Whenever a worker frees up, the highest rung with a result in its top 1/eta that has not
+    been promoted yet sends that trial on to the next rung; otherwise a new trial starts at rung 0.
+    No worker ever waits for a rung to fill up, and trials that stay outside the top 1/eta of
+    their rung are never resumed.
+    """
+
+    def __init__(self, n_rungs, eta=3):
+        self.eta = eta
+        self.results = [dict() for _ in range(n_rungs)]  # rung -> {trial: loss}
+        self.promoted = [set() for _ in range(n_rungs)]
+
+    def report(self, trial, rung, loss):
+        self.results[rung][trial] = loss
+
+    def next_promotion(self):
+        for rung in reversed(range(len(self.results) - 1)):
+            finished = sorted(self.results[rung].items(), key=lambda item: item[1])
+            for trial, _ in finished[:len(finished) // self.eta]:
+                if trial not in self.promoted[rung]:
+                    self.promoted[rung].add(trial)
+                    return trial, rung + 1
+        return None
+
+
+# Per-process training data, built once by _init_worker
+_worker = {}
+
+
+def _init_worker(features_path, seq_length, pred_horizon, stride, batch_size, device, threads):
+    torch.set_num_threads(threads)
+    data = np.array(open_feature_array(features_path), dtype=np.float32)
+    dataset = SlidingWindowDataset(data, seq_length, pred_horizon, stride)
+    train_dataset, val_dataset, _ = chronological_split(dataset)
+    # Statistics from the training rows only, as in the notebooks; the windows are views of `data`
+    normalizer = MinMaxNormalizer().fit(data[:train_dataset.stop])
+    normalizer.transform(data, out=data)
+    _worker["train_loader"] = make_loader(train_dataset, batch_size, shuffle=True)
+    _worker["val_loader"] = make_loader(val_dataset, batch_size)
+    _worker["device"] = device
+
+
+def _run_trial(model_type, trial, config, epochs, checkpoint_path, seed, fresh):
+    """
+    Train (or resume) one trial up to `epochs` epochs and return its best validation loss.
+    """
+    if fresh and os.path.exists(checkpoint_path):
+        # Left over from an earlier sweep in the same directory
+        os.remove(checkpoint_path)
+    torch.manual_seed(seed + trial)
+    model, forward_fn, weight_decay = build_model(model_type, config)
+    started = time.perf_counter()
+    _, val_graph = fit(model, _worker["train_loader"], _worker["val_loader"], num_epochs=epochs,
+                       learning_rate=config["learning_rate"], device=_worker["device"], forward_fn=forward_fn,
+                       weight_decay=config.get("weight_decay", weight_decay), checkpoint_path=checkpoint_path,
+                       checkpoint_every=epochs, resume=True, log_every=10 ** 9)
+    return min(val_graph), time.perf_counter() - started
+
+
+def run_sweep(features_path, model_type="lstm", space=None, n_trials=30, workers=None, min_epochs=10,
+              max_epochs=300, eta=3, seq_length=24, pred_horizon=3, stride=24, batch_size=17, device="cpu",
+              output_dir="sweeps", seed=0):
+    """
+    Run an ASHA sweep over n_trials sampled configurations in a pool of worker processes.
+
+    Every finished rung is appended to <output_dir>/<model_type>.jsonl; trial checkpoints are kept
+    in <output_dir>/<model_type>/ so promoted trials continue where they stopped.
+    Returns the best record of the highest rung reached.
+    """
+    space = space or SEARCH_SPACES[model_type]
+    workers = workers or max(1, os.cpu_count() or 1)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    rungs = rung_epochs(min_epochs, max_epochs, eta)
+    scheduler = ASHA(len(rungs), eta)
+    rng = random.Random(seed)
+    configs = {}
+    checkpoint_dir = os.path.join(output_dir, model_type)
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    results_path = os.path.join(output_dir, f"{model_type}.jsonl")
+    print(f"ASHA over {n_trials} trials, rungs at {rungs} epochs, {workers} workers x {threads} threads")
+
+    context = multiprocessing.get_context("spawn")
+    init_args = (features_path, seq_length, pred_horizon, stride, batch_size, device, threads)
+    records = []
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=init_args) as pool, \
+            open(results_path, "a") as results:
+        running = {}
+
+        def submit(trial, rung):
+            checkpoint_path = os.path.join(checkpoint_dir, f"trial_{trial}.pt")
+            future = pool.submit(_run_trial, model_type, trial, configs[trial], rungs[rung], checkpoint_path, seed,
+                                 rung == 0)
+            running[future] = (trial, rung)
+
+        def fill():
+            while len(running) < workers:
+                promotion = scheduler.next_promotion()
+                if promotion is not None:
+                    submit(*promotion)
+                elif len(configs) < n_trials:
+                    trial = len(configs)
+                    configs[trial] = sample_config(space, rng)
+                    submit(trial, 0)
+                else:
+                    return
+
+        fill()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                trial, rung = running.pop(future)
+                loss, seconds = future.result()
+                scheduler.report(trial, rung, loss)
+                record = {"trial": trial, "rung": rung, "epochs": rungs[rung], "val_loss": loss,
+                          "seconds": seconds, "config": configs[trial]}
+                records.append(record)
+                results.write(json.dumps(record) + "\n")
+                results.flush()
+                print(f"Trial {trial} rung {rung} ({rungs[rung]} epochs): val loss {loss:.6f} in {seconds:.0f}s")
+            fill()
+
+    top_rung = max(r["rung"] for r in records)
+    best = min((r for r in records if r["rung"] == top_rung), key=lambda r: r["val_loss"])
+    print(f"Best: trial {best['trial']} {best['config']} val loss {best['val_loss']:.6f} after {best['epochs']} epochs")
+    return best
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Local hyperparameter sweep with asynchronous successive halving.")
+    parser.add_argument("--features", required=True, help="Feature array (.npy, .arrow or .parquet)")
+    parser.add_argument("--model", choices=list(SEARCH_SPACES), default="lstm")
+    parser.add_argument("--space", help="JSON file with a search space in the wandb sweep 'parameters' format")
+    parser.add_argument("--trials", type=int, default=30)
+    parser.add_argument("--workers", type=int, help="Parallel trials (default: one per core)")
+    parser.add_argument("--min-epochs", type=int, default=10, help="Epochs of the first rung")
+    parser.add_argument("--max-epochs", type=int, default=300, help="Epochs of the last rung")
+    parser.add_argument("--eta", type=int, default=3, help="Keep the top 1/eta of each rung")
+    parser.add_argument("--stride", type=int, default=24)
+    parser.add_argument("--batch-size", type=int, default=17)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--output-dir", default="sweeps")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    space = None
+    if args.space:
+        with open(args.space) as f:
+            space = json.load(f)
+    run_sweep(args.features, args.model, space, args.trials, args.workers, args.min_epochs, args.max_epochs,
+              args.eta, stride=args.stride, batch_size=args.batch_size, device=args.device,
+              output_dir=args.output_dir, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+import contextlib
+import os
+
+import torch
+from torch.utils.data import BatchSampler, DataLoader, RandomSampler, SequentialSampler
+
+from data_retrieval_and_cleaning.instrumentation import is_enabled, span, timed, timed_iter
+
+
+def make_loader(dataset, batch_size=64, shuffle=False, drop_last=False, num_workers=0,
+                pin_memory=False, generator=None):
+    """
+    DataLoader with sensible defaults for the window datasets.
+
+    SlidingWindowDataset batches are gathered with one indexing operation per batch instead of
+    one __getitem__ call per window plus a stack. Worker processes are kept alive between epochs.
+    """
+    sampler = RandomSampler(dataset, generator=generator) if shuffle else SequentialSampler(dataset)
+    worker_options = {
+        "num_workers": num_workers,
+        "pin_memory": pin_memory,
+        "persistent_workers": num_workers > 0,
+    }
+    if hasattr(dataset, "inputs") and hasattr(dataset, "targets"):
+        # batch_size=None: the dataset receives the whole list of indices from the BatchSampler
+        return DataLoader(dataset, sampler=BatchSampler(sampler, batch_size, drop_last), batch_size=None,
+                          **worker_options)
+    return DataLoader(dataset, batch_size=batch_size, sampler=sampler, drop_last=drop_last, **worker_options)
+
+
+def default_forward(model, inputs, targets):
+    """
+    Run the model on a batch and shape its prediction like the targets (batch, pred_horizon, 1).
+    LSTM_pt/BiLSTM_pt return (out, hn, cn); only the output is used.
+    """
+    output = model(inputs)
+    if isinstance(output, tuple):
+        output = output[0]
+    return output.reshape(targets.shape)
+
+
+def seq2seq_forward(model, inputs, targets):
+    return model(inputs, targets)
+
+
+def teacher_forcing_forward(model, inputs, targets):
+    """
+    TransformerModel training step: the decoder is fed the target sequence itself.
+    """
+    return model(inputs, tgt=targets)
+
+
+def shifted_teacher_forcing_forward(model, inputs, targets, target_column=5):
+    """
+    TransformerModel training step that matches TransformerModel.forecast: the decoder is fed
+    the last observed value followed by the targets shifted by one step, under a causal mask.
+    """
+    start = inputs[:, -1:, target_column:target_column + 1]
+    decoder_input = torch.cat([start, targets[:, :-1]], dim=1)
+    return model(inputs, tgt=decoder_input, causal=True)
+
+
+def save_checkpoint(path, state):
+    """
+    Write a checkpoint atomically so an interrupted save never corrupts the previous one.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    torch.save(state, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path, model, optimizer=None, map_location=None):
+    """
+    Restore model (and optimizer) state saved by fit(); returns the whole checkpoint dict.
+    Plain state_dict files such as ./final_models/LSTM.pth are accepted as well.
+    """
+    checkpoint = torch.load(path, map_location=map_location)
+    if "model" not in checkpoint:
+        model.load_state_dict(checkpoint)
+        return {"model": checkpoint}
+    model.load_state_dict(checkpoint["model"])
+    if optimizer is not None and checkpoint.get("optimizer") is not None:
+        optimizer.load_state_dict(checkpoint["optimizer"])
+    return checkpoint
+
+
+def _autocast(device, amp):
+    if not amp:
+        return contextlib.nullcontext()
+    # bf16 needs no loss scaling, so the same path serves CPU and GPU
+    return torch.autocast(device_type=torch.device(device).type, dtype=torch.bfloat16)
+
+
+def _optimizer_step(model, optimizer, max_grad_norm=None, window=1, accumulation_steps=1, sync_cuda=False):
+    """
+    Clip and apply the gradients accumulated over `window` batches, then clear them.
+    Each batch loss was divided by accumulation_steps, so a shorter (last) window is rescaled
+    to the mean over its own batches before clipping.
+    """
+    with span("train.optimizer", "train"):
+        if window != accumulation_steps:
+            for parameter in model.parameters():
+                if parameter.grad is not None:
+                    parameter.grad.mul_(accumulation_steps / window)
+        if max_grad_norm is not None:
+            torch.nn.utils.clip_grad_norm_(model.parameters(), max_grad_norm)
+        optimizer.step()
+        optimizer.zero_grad(set_to_none=True)
+        if sync_cuda:
+            torch.cuda.synchronize()
+
+
+@timed("train.evaluate", "train")
+def evaluate(model, loader, device="cpu", forward_fn=default_forward, criterion=None, amp=False):
+    """
+    Average loss over a loader; the sum stays on the device and is read back once.
+    """
+    criterion = criterion or torch.nn.MSELoss()
+    was_training = model.training
+    model.eval()
+    total = torch.zeros((), device=device)
+    batches = 0
+    with torch.no_grad():
+        for inputs, targets in loader:
+            inputs = inputs.to(device, non_blocking=True)
+            targets = targets.to(device, non_blocking=True)
+            with _autocast(device, amp):
+                prediction = forward_fn(model, inputs, targets)
+            total += criterion(prediction.float(), targets)
+            batches += 1
+    model.train(was_training)
+    return total.item() / max(batches, 1)
+
+
+def fit(model, train_loader, val_loader=None, num_epochs=50, learning_rate=1e-3, device="cpu",
+        forward_fn=default_forward, criterion=None, optimizer=None, weight_decay=0.0,
+        accumulation_steps=1, amp=False, compile=False, max_grad_norm=None, val_every=1,
+        patience=None, min_delta=0.0, checkpoint_path=None, checkpoint_every=1, resume=False,
+        log_every=50):
+    """
+    Train a forecasting model and return (loss_graph, val_graph) like the notebook loops.
+
+    - forward_fn(model, inputs, targets) returns predictions shaped like targets
+      (default_forward for LSTM_pt/BiLSTM_pt, seq2seq_forward, shifted_teacher_forcing_forward).
+    - amp: bf16 autocast (CPU or GPU). compile: wrap the model with torch.compile.
+    - accumulation_steps: gradients of that many batches are averaged before each optimizer step
+      (a last, shorter window is averaged over its own batches).
+    - Losses are accumulated on the device and synchronised once per epoch.
+    - With instrumentation enabled every step is timed as train.data_load, train.to_device,
+      train.forward, train.backward and train.optimizer (CUDA is synchronised after each phase
+      so the times are not just kernel launches).
+    - patience: stop after that many validations without an improvement of min_delta;
+      the best weights are restored at the end.
+    - checkpoint_path: model, optimizer and history are saved every checkpoint_every epochs;
+      with resume=True an existing checkpoint is loaded and training continues after its epoch.
+    """
+    model.to(device)
+    criterion = criterion or torch.nn.MSELoss()
+    optimizer = optimizer or torch.optim.Adam(model.parameters(), lr=learning_rate, weight_decay=weight_decay)
+    step_model = torch.compile(model) if compile else model
+
+    loss_graph, val_graph = [], []
+    start_epoch = 0
+    best_val = float("inf")
+    best_state = None
+    bad_validations = 0
+    if resume and checkpoint_path and os.path.exists(checkpoint_path):
+        checkpoint = load_checkpoint(checkpoint_path, model, optimizer, map_location=device)
+        start_epoch = checkpoint.get("epoch", 0)
+        loss_graph = checkpoint.get("loss_graph", [])
+        val_graph = checkpoint.get("val_graph", [])
+        best_val = checkpoint.get("best_val", best_val)
+        best_state = checkpoint.get("best_state")
+        bad_validations = checkpoint.get("bad_validations", 0)
+        print(f"Resuming from {checkpoint_path} at epoch {start_epoch + 1}")
+
+    model.train()
+    avg_val_loss = None
+    sync_cuda = is_enabled() and torch.device(device).type == "cuda"
+    for epoch in range(start_epoch, num_epochs):
+        epoch_loss = torch.zeros((), device=device)
+        batches = 0
+        optimizer.zero_grad(set_to_none=True)
+        for batch_idx, (inputs, targets) in enumerate(timed_iter(train_loader, "train.data_load", "train")):
+            with span("train.to_device", "train"):
+                inputs = inputs.to(device, non_blocking=True)
+                targets = targets.to(device, non_blocking=True)
+            with span("train.forward", "train"):
+                with _autocast(device, amp):
+                    prediction = forward_fn(step_model, inputs, targets)
+                loss = criterion(prediction.float(), targets)
+                if sync_cuda:
+                    torch.cuda.synchronize()
+            with span("train.backward", "train"):
+                (loss / accumulation_steps).backward()
+                if sync_cuda:
+                    torch.cuda.synchronize()
+            if (batch_idx + 1) % accumulation_steps == 0:
+                _optimizer_step(model, optimizer, max_grad_norm, accumulation_steps, accumulation_steps, sync_cuda)
+            epoch_loss += loss.detach()
+            batches += 1
+        if batches % accumulation_steps:
+            # Flush the gradients of a last partial accumulation window
+            _optimizer_step(model, optimizer, max_grad_norm, batches % accumulation_steps, accumulation_steps,
+                            sync_cuda)
+
+        avg_loss = epoch_loss.item() / max(batches, 1)
+        loss_graph.append(avg_loss)
+
+        stop = False
+        if val_loader is not None and ((epoch + 1) % val_every == 0 or epoch == num_epochs - 1):
+            avg_val_loss = evaluate(step_model, val_loader, device, forward_fn, criterion, amp)
+            val_graph.append(avg_val_loss)
+            if avg_val_loss < best_val - min_delta:
+                best_val = avg_val_loss
+                best_state = {k: v.detach().clone() for k, v in model.state_dict().items()}
+                bad_validations = 0
+            else:
+                bad_validations += 1
+                stop = patience is not None and bad_validations >= patience
+
+        if epoch % log_every == 0 or epoch == num_epochs - 1 or stop:
+            val_text = f", Val Loss: {avg_val_loss:.6f}" if avg_val_loss is not None else ""
+            print(f"Epoch {epoch + 1}/{num_epochs}, Loss: {avg_loss:.6f}{val_text}")
+
+        if checkpoint_path and ((epoch + 1) % checkpoint_every == 0 or epoch == num_epochs - 1 or stop):
+            save_checkpoint(checkpoint_path, {
+                "epoch": epoch + 1,
+                "model": model.state_dict(),
+                "optimizer": optimizer.state_dict(),
+                "loss_graph": loss_graph,
+                "val_graph": val_graph,
+                "best_val": best_val,
+                "best_state": best_state,
+                "bad_validations": bad_validations,
+            })
+
+        if stop:
+            print(f"Early stopping at epoch {epoch + 1}: no improvement for {patience} validations")
+            break
+
+    if patience is not None and best_state is not None:
+        model.load_state_dict(best_state)
+    return loss_graph, val_graph
@@ -0,0 +1,70 @@
+import asyncio
+import json
+import os
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from data_retrieval_and_cleaning.api_client import AsyncAPIClient
+from data_retrieval_and_cleaning.response_cache import ResponseCache, request_key, zstandard
+
+
+def fetch_all(bodies, requests, cache=None, corrupted=(), damaged=()):
+    """
+    Serve `bodies` in turn from /data and run get_json for every params dict in `requests` at once,
+    after storing an unparseable cache entry for every params dict in `corrupted` and a cache entry
+    whose compressed blob has 20 bytes overwritten in the middle for every params dict in `damaged`.
+    Returns (results, number of requests the server answered, URL of /data).
+    """
+    served = []
+
+    async def handler(request):
+        served.append(request.query.get("date"))
+        return web.Response(body=bodies[min(len(served), len(bodies)) - 1], content_type="application/json")
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/data", handler)
+        async with TestServer(app) as server:
+            base_url = str(server.make_url(""))
+            for params in corrupted:
+                cache.put(base_url + "/data", params, b'{"items": [')
+            for params in damaged:
+                cache.put(base_url + "/data", params, json.dumps({"items": list(range(2000))}).encode())
+                with open(cache._path(request_key(base_url + "/data", params)), "r+b") as f:
+                    size = f.seek(0, os.SEEK_END)
+                    f.seek(size // 2)
+                    f.write(bytes(range(20)))
+            async with AsyncAPIClient(base_url, rate=100, burst=100, backoff_base=0.01, cache=cache) as client:
+                results = await asyncio.gather(*(client.get_json("/data", params) for params in requests))
+            return results, base_url + "/data"
+
+    results, url = asyncio.run(run())
+    return results, len(served), url
+
+
+def test_invalid_json_body_is_retried():
+    bodies = [b"<html>502 Bad Gateway</html>", b'{"items": [1', b'{"items": [1, 2]}']
+    results, served, _ = fetch_all(bodies, [{"date": "2025-02-21"}])
+    assert results == [{"items": [1, 2]}]
+    assert served == 3
+
+
+@pytest.mark.parametrize("codec", ["gzip", pytest.param("zstd", marks=pytest.mark.skipif(
+    zstandard is None, reason="zstandard is not installed"))])
+def test_corrupted_cache_entry_is_discarded_and_fetched_again(tmp_path, codec):
+    cache = ResponseCache(str(tmp_path), codec=codec)
+    unparseable, damaged = {"date": "2025-02-21"}, {"date": "2025-02-19"}
+    results, served, url = fetch_all([b'{"items": [3]}'], [unparseable, {"date": "2025-02-20"}, damaged], cache,
+                                     [unparseable], [damaged])
+    assert results == [{"items": [3]}] * 3
+    assert served == 3
+    assert cache.get_json(url, unparseable) == {"items": [3]}
+    assert cache.get_json(url, damaged) == {"items": [3]}
+    cache.close()
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from forecasting.ensemble import fit_base_learners, rf_learner, xgb_learner
+from forecasting.splitters import ExpandingWindowSplit
+
+
+def test_final_base_learners_are_refit_on_every_row():
+    rng = np.random.default_rng(0)
+    X = rng.random((300, 4))
+    y = np.stack([X @ rng.random(4) for _ in range(3)], axis=1)
+    folds = list(ExpandingWindowSplit(n_splits=3, gap=3).split(X))
+    rf_model, xgb_model, oof_rf, oof_xgb = fit_base_learners(X, y, folds, n_workers=2, rf_params={"n_estimators": 10},
+                                                             xgb_params={"n_estimators": 10})
+
+    # No fold trains on the last validation block, but the final learners do
+    assert folds[-1][0][-1] < len(X) - 1
+    np.testing.assert_allclose(rf_model.predict(X), rf_learner(n_estimators=10).fit(X, y).predict(X))
+    np.testing.assert_allclose(xgb_model.predict(X), xgb_learner(n_estimators=10).fit(X, y).predict(X), rtol=1e-5)
+
+    # The meta-learner's training rows are those some fold validated, each predicted by one fold model
+    validated = np.concatenate([val_idx for _, val_idx in folds])
+    assert not np.isnan(oof_rf[validated]).any() and not np.isnan(oof_xgb[validated]).any()
+    assert np.isnan(oof_rf[:validated.min()]).all()
@@ -0,0 +1,47 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+import torch
+
+from forecasting.export import EXPORTABLE, build_exported, export, load_artifact
+from forecasting.service import stand_in_normalizer, synthetic_windows
+from forecasting.specs import MODEL_SPECS
+
+
+@pytest.fixture(scope="module")
+def model_dir(tmp_path_factory):
+    """
+    Untrained notebook architectures saved like ./final_models.
+    """
+    directory = tmp_path_factory.mktemp("final_models")
+    torch.manual_seed(0)
+    for name in EXPORTABLE:
+        build, _, weights, stats = MODEL_SPECS[name]
+        torch.save(build().state_dict(), directory / weights)
+        stand_in_normalizer().save(str(directory / stats))
+    return str(directory)
+
+
+@pytest.mark.parametrize("fmt", ["torchscript", "onnx"])
+@pytest.mark.parametrize("name", EXPORTABLE)
+def test_exported_artifact_matches_the_model(model_dir, tmp_path, name, fmt):
+    if fmt == "onnx":
+        pytest.importorskip("onnx")
+        pytest.importorskip("onnxruntime")
+    windows = synthetic_windows(17, seed=1)
+    with torch.no_grad():
+        expected = build_exported(name, model_dir)(torch.as_tensor(windows)).numpy()
+
+    path = export(name, model_dir, str(tmp_path), fmt)
+    np.testing.assert_allclose(load_artifact(path)(windows), expected, rtol=1e-4, atol=1e-3)
+
+    # The int8 artifacts load and forecast every window of a batch of another size
+    quantized = load_artifact(export(name, model_dir, str(tmp_path), fmt, int8=True))(windows[:5])
+    assert quantized.shape == (5, expected.shape[1]) and np.isfinite(quantized).all()
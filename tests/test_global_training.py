@@ -0,0 +1,43 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from forecasting.datasets import FEATURE_COLUMNS, MultiSeriesWindowDataset, chronological_split
+from forecasting.global_training import main, metadata_path, load_series_windows, prepare_series
+
+
+def region_arrays(tmp_path, count=2, rows=400):
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(count):
+        path = str(tmp_path / f"region{i}.npy")
+        np.save(path, rng.random((rows, len(FEATURE_COLUMNS)), dtype=np.float32) * (i + 1))
+        paths.append(path)
+    return paths
+
+
+def test_series_are_normalised_with_the_training_split_they_are_trained_on(tmp_path):
+    paths = region_arrays(tmp_path)
+    series = str(tmp_path / "series.npy")
+    main(["--features", *paths, "--series", series, "--epochs", "1", "--seq-length", "12", "--stride", "2",
+          "--output-dir", str(tmp_path / "models")])
+
+    train, _, _ = chronological_split(MultiSeriesWindowDataset(np.load(series), 12, 3, 2))
+    assert load_series_windows(metadata_path(series))["train_stop"] == train.stop
+    # Every series' training rows span exactly [0, 1] after scaling with their own statistics
+    stack = np.load(series)
+    np.testing.assert_allclose(stack[:, :train.stop].min(axis=1), 0, atol=1e-6)
+    np.testing.assert_allclose(stack[:, :train.stop].max(axis=1), 1, atol=1e-6)
+
+
+def test_training_with_other_window_settings_is_rejected(tmp_path):
+    series = str(tmp_path / "series.npy")
+    prepare_series(region_arrays(tmp_path), series, stride=24)
+    with pytest.raises(ValueError, match="prepare the series again"):
+        main(["--series", series, "--epochs", "1", "--output-dir", str(tmp_path / "models")])
@@ -0,0 +1,118 @@
+import asyncio
+import datetime
+import os
+import sys
+
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from data_retrieval_and_cleaning.api_client import AsyncAPIClient
+from data_retrieval_and_cleaning.live_ingest import SGT, FeatureRingBuffer, LiveIngestDaemon
+from forecasting.datasets import FEATURE_COLUMNS
+
+INSIDE_BOX = [103.95, 1.34]
+OUTSIDE_BOX = [103.80, 1.30]
+
+
+def fake_api(state):
+    """
+    The taxi-availability and weather "latest" endpoints, answering from `state`:
+    taxi (islandwide count, taxis in the box) and {endpoint: [(timestamp, S107 value)]}.
+    """
+    async def taxi(request):
+        islandwide, in_box = state["taxi"]
+        return web.json_response({"type": "FeatureCollection", "features": [{
+            "type": "Feature",
+            "geometry": {"type": "MultiPoint", "coordinates": [INSIDE_BOX] * in_box + [OUTSIDE_BOX] * 5},
+            "properties": {"timestamp": state["now"]().isoformat(timespec="seconds"), "taxi_count": islandwide},
+        }]})
+
+    def weather(endpoint):
+        async def handler(request):
+            readings = [{"timestamp": timestamp, "data": [{"stationId": "S107", "value": value},
+                                                          {"stationId": "S109", "value": -1.0}]}
+                        for timestamp, value in state["weather"][endpoint]]
+            return web.json_response({"code": 0, "data": {"stations": [], "readings": readings}})
+        return handler
+
+    app = web.Application()
+    app.router.add_get("/taxi", taxi)
+    for endpoint in ("/air-temperature", "/relative-humidity", "/rainfall"):
+        app.router.add_get("/weather" + endpoint, weather(endpoint))
+    return app
+
+
+def test_daemon_builds_hourly_rows_from_a_fake_api():
+    clock = {"t": datetime.datetime(2025, 3, 3, 8, 0, 30, tzinfo=SGT).timestamp()}  # A Monday
+
+    def now():
+        return datetime.datetime.fromtimestamp(clock["t"], SGT)
+
+    def set_time(hour, minute, second=30):
+        clock["t"] = datetime.datetime(2025, 3, 3, hour, minute, second, tzinfo=SGT).timestamp()
+
+    def reading_time(hour, minute):
+        return datetime.datetime(2025, 3, 3, hour, minute, tzinfo=SGT).isoformat(timespec="seconds")
+
+    state = {"now": now}
+    buffer = FeatureRingBuffer(24)
+
+    async def run():
+        async with TestServer(fake_api(state)) as server:
+            base_url = str(server.make_url(""))
+            async with AsyncAPIClient(rate=1000, burst=1000, backoff_base=0.01) as client:
+                daemon = LiveIngestDaemon(client, buffer, taxi_url=base_url + "/taxi",
+                                          weather_base_url=base_url + "/weather", clock=lambda: clock["t"])
+
+                async def poll(hour, minute, taxi, temperature, humidity, rainfall, extra_rainfall=()):
+                    set_time(hour, minute)
+                    state["taxi"] = taxi
+                    state["weather"] = {"/air-temperature": [(reading_time(hour, minute), temperature)],
+                                        "/relative-humidity": [(reading_time(hour, minute), humidity)],
+                                        "/rainfall": [(reading_time(hour, minute), rainfall), *extra_rainfall]}
+                    await daemon.poll_taxi()
+                    await daemon.poll_weather()
+                    return daemon.close_slots()
+
+                # 08:00-09:00: four polls; rainfall readings are 5-minute totals, so they add up
+                for k, minute in enumerate((0, 15, 30, 45)):
+                    assert await poll(8, minute, (1000 + 10 * k, k + 1), 27.0 + k, 80.0, 0.2 + 0.1 * k) == 0
+                # No data at all from 09:00 to 10:00, and 08:00-09:00 closes only after the grace period
+                assert await poll(10, 0, (2000, 3), 30.0, 70.0, 0.0) == 1
+                # A reading of the already closed 08:00 hour arrives late and is dropped
+                late = [(reading_time(8, 55), 9.0)]
+                assert await poll(10, 15, (2000, 3), 30.0, 70.0, 0.0, late) == 1
+                set_time(11, 2, 1)
+                assert daemon.close_slots() == 1
+                return dict(daemon.stats)
+
+    stats = asyncio.run(run())
+
+    assert buffer.labels() == [datetime.datetime(2025, 3, 3, hour, 59, 59) for hour in (8, 9, 10)]
+    assert buffer.imputed().tolist() == [False, True, False]
+    rows = [dict(zip(FEATURE_COLUMNS, row)) for row in buffer.latest().tolist()]
+    expected = {
+        "Taxi Available throughout SG": 1015.0, "temp_value": 28.5, "humidity_value": 80.0, "rainfall_value": 1.4,
+        "peak_period": 1.0, "Average Taxi Availability": 2.5, "IsWeekend": 0.0, "Hour": 9.0,
+    }
+    np.testing.assert_allclose([rows[0][c] for c in FEATURE_COLUMNS], [expected[c] for c in FEATURE_COLUMNS],
+                               rtol=1e-6)
+    # The empty hour carries the measurements forward with its own calendar features
+    expected.update({"Hour": 10.0})
+    np.testing.assert_allclose([rows[1][c] for c in FEATURE_COLUMNS], [expected[c] for c in FEATURE_COLUMNS],
+                               rtol=1e-6)
+    expected = {
+        "Taxi Available throughout SG": 2000.0, "temp_value": 30.0, "humidity_value": 70.0, "rainfall_value": 0.0,
+        "peak_period": 0.0, "Average Taxi Availability": 3.0, "IsWeekend": 0.0, "Hour": 11.0,
+    }
+    np.testing.assert_allclose([rows[2][c] for c in FEATURE_COLUMNS], [expected[c] for c in FEATURE_COLUMNS],
+                               rtol=1e-6)
+    assert stats["late_slots"] == 1
+    assert stats["imputed_hours"] == 1 and stats["complete_hours"] == 2
+    assert stats["taxi_polls"] == 6 and stats["weather_polls"] == 18
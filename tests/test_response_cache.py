@@ -0,0 +1,27 @@
+import os
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from data_retrieval_and_cleaning.response_cache import ResponseCache
+
+URL = "https://api-open.data.gov.sg/v2/real-time/api/rainfall"
+
+
+def test_discard_matching_drops_every_page_of_a_day(tmp_path):
+    with ResponseCache(str(tmp_path)) as cache:
+        day_pages = [{"date": "2025-02-21"}, {"date": "2025-02-21", "paginationToken": "b2Zmc2V0PTI1MDA="},
+                     {"paginationToken": "b2Zmc2V0PTUwMDA=", "date": "2025-02-21"}]
+        kept = [(URL, {"date": "2025-02-20"}), (URL, {"date": "2025-02-20", "paginationToken": "b2Zmc2V0PTI1MDA="}),
+                (URL.replace("rainfall", "air-temperature"), {"date": "2025-02-21"})]
+        for params in day_pages:
+            cache.put(URL, params, b'{"data": {}}')
+        for url, params in kept:
+            cache.put(url, params, b'{"data": {}}')
+
+        assert cache.discard_matching(URL, {"date": "2025-02-21"}) == 3
+        assert all(cache.get(URL, params) is None for params in day_pages)
+        assert all(cache.get(url, params) is not None for url, params in kept)
+        assert cache.stats()["entries"] == len(kept)
@@ -0,0 +1,131 @@
+import asyncio
+import os
+import sys
+
+import numpy as np
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+import torch
+from aiohttp.test_utils import TestClient, TestServer
+
+from benchmarks.fixtures import feature_frame
+from data_retrieval_and_cleaning.live_ingest import FeatureRingBuffer, load_seed
+from forecasting.datasets import FEATURE_COLUMNS, SlidingWindowDataset
+from forecasting.ensemble import rf_learner, xgb_learner
+from forecasting.evaluation import evaluate_model
+from forecasting.features import ENSEMBLE_DROP_COLUMNS, build_lag_features
+from forecasting.normalization import MinMaxNormalizer
+from forecasting.service import (EnsembleForecaster, ForecastService, TorchForecaster, stand_in_forecasters,
+                                 synthetic_windows)
+from forecasting.specs import MODEL_SPECS
+from forecasting.streaming import StreamingLSTMPredictor
+
+
+def post_concurrently(service, bodies):
+    """
+    POST every body to /forecast at once, so they share micro-batches; returns (status, payload) pairs.
+    """
+    async def run():
+        async with TestClient(TestServer(service.app())) as client:
+            responses = await asyncio.gather(*(client.post("/forecast", json=body) for body in bodies))
+            return [(r.status, await r.json() if r.status == 200 else await r.text()) for r in responses]
+    return asyncio.run(run())
+
+
+def test_ensemble_rejects_only_requests_without_day_of_week():
+    forecasters = stand_in_forecasters()
+    service = ForecastService({"ensemble": forecasters["ensemble"], "lstm": forecasters["lstm"]},
+                              max_latency=0.05)
+    windows = synthetic_windows(4, seed=1).tolist()
+    bodies = [
+        {"model": "ensemble", "regions": [{"region": "a", "window": windows[0], "day_of_week": 2}]},
+        {"model": "ensemble", "regions": [{"region": "b", "window": windows[1]}]},
+        {"model": "ensemble", "regions": [{"region": "c", "window": windows[2], "day_of_week": 5}]},
+        # Models that ignore day_of_week accept either kind
+        {"model": "lstm", "regions": [{"region": "d", "window": windows[3]}]},
+        {"model": "lstm", "regions": [{"region": "e", "window": windows[0], "day_of_week": 2}]},
+    ]
+    responses = post_concurrently(service, bodies)
+
+    assert [status for status, _ in responses] == [200, 400, 200, 200, 200]
+    assert "day_of_week" in responses[1][1]
+    for status, payload in responses:
+        if status == 200:
+            assert np.shape(payload["forecasts"][0]["forecast"]) == (3,)
+    # The rejected request did not take the valid ensemble requests down with it
+    expected = forecasters["ensemble"].predict(np.asarray([windows[0], windows[2]]), np.asarray([2, 5]))
+    np.testing.assert_allclose([responses[0][1]["forecasts"][0]["forecast"],
+                                responses[2][1]["forecasts"][0]["forecast"]], expected, rtol=1e-5)
+
+
+def test_served_and_live_forecasts_match_evaluate_model(tmp_path):
+    # A merged CSV as the pipeline writes it (newest first); training and evaluation read it oldest first
+    history = feature_frame(0.05)
+    rows = np.ascontiguousarray(history.sort_values("DateTime")[FEATURE_COLUMNS].to_numpy(dtype=np.float32))
+    normalizer = MinMaxNormalizer(FEATURE_COLUMNS).fit(rows)
+    dataset = SlidingWindowDataset(normalizer.transform(rows.copy()), seq_length=24, pred_horizon=3)
+    last = len(dataset) - 1
+
+    # The live buffer seeded with every hour before the last window's targets holds that window
+    history.iloc[3:].to_csv(tmp_path / "merged.csv", index=False)
+    buffer = FeatureRingBuffer(48)
+    load_seed(str(tmp_path / "merged.csv"), buffer)
+    window = buffer.latest(24)
+    np.testing.assert_array_equal(window, rows[last:last + 24])
+
+    torch.manual_seed(0)
+    models = {name: build() for name, (build, _, _, _) in MODEL_SPECS.items()}
+    service = ForecastService({name: TorchForecaster(model, MODEL_SPECS[name][1], normalizer)
+                               for name, model in models.items()})
+    bodies = [{"model": name, "regions": [{"region": "S107", "window": window.tolist()}]} for name in models]
+    responses = post_concurrently(service, bodies)
+
+    for name, (status, payload) in zip(models, responses):
+        expected = evaluate_model(models[name], dataset.subset(last, last + 1), normalizer)["predictions"][0]
+        assert status == 200
+        np.testing.assert_allclose(payload["forecasts"][0]["forecast"], expected, rtol=1e-4, atol=1e-3)
+
+    streaming = StreamingLSTMPredictor(models["lstm"], normalizer)
+    expected = evaluate_model(models["lstm"], dataset.subset(last, last + 1), normalizer)["predictions"][0]
+    np.testing.assert_allclose(streaming.warm_up(["S107"], window[None])[0].numpy(), expected, rtol=1e-4, atol=1e-3)
+
+
+def test_ensemble_trained_like_the_notebook_is_served():
+    # merged_file_with_mean.csv's columns, prepared and split as in 6. Ensemble.ipynb
+    history = feature_frame(0.05)
+    history["Taxi Available in Selected Box Area"] = history["Average Taxi Availability"].round()
+    history["stationId"] = "S107"
+    lag_features = ["Average Taxi Availability", "Taxi Available throughout SG", "temp_value", "humidity_value"]
+    df = build_lag_features(history.drop(columns=ENSEMBLE_DROP_COLUMNS, errors="ignore"), lag_features,
+                            lags=range(1, 4), horizon=3)
+    target_cols = ["target_t1", "target_t2", "target_t3"]
+    X, y = df.drop(columns=target_cols).values, df[target_cols].values
+    scaler = MinMaxNormalizer(df.drop(columns=target_cols).columns).fit(X)
+    rf_model = rf_learner(n_estimators=10).fit(scaler.transform(X), y)
+    xgb_model = xgb_learner(n_estimators=10).fit(scaler.transform(X), y)
+    meta_input = np.hstack([rf_model.predict(scaler.transform(X)), xgb_model.predict(scaler.transform(X))])
+    meta = xgb_learner(n_estimators=10).fit(meta_input, y)
+    forecaster = EnsembleForecaster(rf_model, xgb_model, meta, scaler)
+
+    # The feature row of the last hour with complete targets, from the window that ends at that hour
+    ordered = history.sort_values("DateTime", ignore_index=True)
+    last = len(ordered) - 4
+    window = ordered[FEATURE_COLUMNS].to_numpy(dtype=np.float32)[last - 23:last + 1]
+    day_of_week = int(ordered["DateTime"][last].dayofweek)
+    service = ForecastService({"ensemble": forecaster})
+    body = {"model": "ensemble", "regions": [{"region": "S107", "window": window.tolist(), "day_of_week": day_of_week}]}
+    [(status, payload)] = post_concurrently(service, [body])
+
+    assert status == 200
+    row = scaler.transform(X[-1:])
+    expected = meta.predict(np.hstack([rf_model.predict(row), xgb_model.predict(row)]))[0]
+    np.testing.assert_allclose(payload["forecasts"][0]["forecast"], expected, rtol=1e-5)
+
+    # An ensemble trained with the box-area count cannot be served from windows
+    with pytest.raises(ValueError, match="Taxi Available in Selected Box Area"):
+        EnsembleForecaster(rf_model, xgb_model, meta,
+                           MinMaxNormalizer(["Taxi Available in Selected Box Area"] + scaler.columns))
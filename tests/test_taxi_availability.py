@@ -0,0 +1,37 @@
+import asyncio
+import json
+import os
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from data_retrieval_and_cleaning import TaxiAvailabilityScript
+from data_retrieval_and_cleaning.checkpoint_store import TaxiCheckpointStore
+
+
+def test_refetch_hours_outside_the_range_are_fetched_again(tmp_path, monkeypatch):
+    store_path = str(tmp_path / "store.sqlite")
+    stored = ["2025-02-21T22:59:59", "2025-02-21T23:59:59", "2025-02-01T05:59:59"]
+    with TaxiCheckpointStore(store_path) as store:
+        for ts in stored:
+            store.record(ts, 100, {"S107": 5})
+    with open(tmp_path / "refetch.json", "w") as f:
+        json.dump({"taxi": ["2025-02-21T23:59:59", "2025-02-01T05:59:59"]}, f)
+
+    fetched = []
+
+    async def fetch_into_store(client, timestamps, store, regions, point_store=None):
+        fetched.extend(timestamps)
+        return 0
+    monkeypatch.setattr(TaxiAvailabilityScript, "fetch_into_store", fetch_into_store)
+
+    args = TaxiAvailabilityScript.parse_args(["--since", "2025-02-21T22:00", "--until", "2025-02-21T23:00",
+                                              "--store", store_path, "--output", str(tmp_path / "taxi.csv"),
+                                              "--refetch", str(tmp_path / "refetch.json"), "--no-points",
+                                              "--cache-dir", str(tmp_path / "cache")])
+    asyncio.run(TaxiAvailabilityScript.run(args))
+
+    # The invalidated hour in range and the one outside --since/--until are both fetched; the stored hour is not
+    assert fetched == ["2025-02-21T23:59:59", "2025-02-01T05:59:59"]
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from data_retrieval_and_cleaning.taxi_geometry import CoordinateStore
+
+
+def test_reopened_store_drops_points_of_an_interrupted_append(tmp_path):
+    first = np.arange(6, dtype=np.float32).reshape(3, 2)
+    second = np.arange(10, 14, dtype=np.float32).reshape(2, 2)
+    store = CoordinateStore(str(tmp_path))
+    store.append("2025-02-21T22:59:59", first)
+    # A crash while writing the next block: one and a half points and no index row
+    with open(store.points_path, "ab") as f:
+        f.write(np.zeros(3, dtype=np.float32).tobytes())
+
+    store = CoordinateStore(str(tmp_path))
+    store.append("2025-02-21T23:59:59", second)
+
+    np.testing.assert_array_equal(store.snapshot("2025-02-21T22:59:59"), first)
+    np.testing.assert_array_equal(store.snapshot("2025-02-21T23:59:59"), second)
+    assert store.points().shape == (5, 2)
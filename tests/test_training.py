@@ -0,0 +1,33 @@
+import os
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+import torch
+
+from forecasting.training import fit
+
+
+def test_last_partial_accumulation_window_is_averaged_and_clipped():
+    torch.manual_seed(0)
+    batches = [(torch.randn(4, 3), torch.randn(4, 1) * 10) for _ in range(5)]
+    model = torch.nn.Linear(3, 1)
+    reference = torch.nn.Linear(3, 1)
+    reference.load_state_dict(model.state_dict())
+
+    fit(model, batches, num_epochs=1, device="cpu", forward_fn=lambda m, x, y: m(x),
+        optimizer=torch.optim.SGD(model.parameters(), lr=0.1), accumulation_steps=3, max_grad_norm=0.5)
+
+    # One step on the mean loss of batches 0-2, then one on the mean loss of batches 3-4, both clipped
+    optimizer = torch.optim.SGD(reference.parameters(), lr=0.1)
+    for window in (batches[:3], batches[3:]):
+        loss = sum(torch.nn.functional.mse_loss(reference(x), y) for x, y in window) / len(window)
+        loss.backward()
+        torch.nn.utils.clip_grad_norm_(reference.parameters(), 0.5)
+        optimizer.step()
+        optimizer.zero_grad()
+
+    for parameter, expected in zip(model.parameters(), reference.parameters()):
+        torch.testing.assert_close(parameter, expected)